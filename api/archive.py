@@ -0,0 +1,148 @@
+"""Disk-spooled upload handling shared by the routers that accept logs and ZIPs.
+
+Uploads are copied to temporary files in fixed-size chunks, and ZIP members are
+read straight from the spooled archive when a parser asks for them. The request
+handler therefore only holds ``LogSource`` references. Peak memory is bounded by
+the largest single log being parsed (times the number of parse workers), not by
+the size or member count of the upload; see benchmarks/bench_archive.py.
+"""
+import io
+import mmap
+import os
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from typing import Iterator, NamedTuple
+
+from fastapi import UploadFile
+
+from .metrics import count, span
+from .offload import run_blocking
+
+SPOOL_DIR = os.getenv("NETTOOLS_SPOOL_DIR") or None
+COPY_CHUNK = 1024 * 1024
+LOG_EXTS = (".log", ".txt")
+
+
+class LogSource(NamedTuple):
+    filename: str  # basename used for output / filename IP fallback
+    path: str  # spooled file on disk
+    member: str | None = None  # member name when path is a ZIP archive
+    size: int = 0  # uncompressed size, used to balance parse work
+    in_place: bool = False  # a server file read where it lies, not a spooled copy
+
+    def open(self):
+        if self.member is None:
+            return open(self.path, "rb")
+        # the archive is opened per member and closed with it: nothing keeps a
+        # handle on a spooled file once the request's spool removes it
+        zf = zipfile.ZipFile(self.path)
+        try:
+            return zf.open(self.member)
+        finally:
+            # the member keeps the file open until it is closed itself
+            zf.close()
+
+    def read_text(self) -> str:
+        with self.open() as fh:
+            return fh.read().decode("utf-8", errors="ignore")
+
+    @contextmanager
+    def buffer(self):
+        """The raw bytes, undecoded: a read-only mmap of a plain file (paged in
+        as scanned, never copied), or the inflated bytes of a ZIP member."""
+        if self.member is None:
+            with open(self.path, "rb") as fh:
+                if os.fstat(fh.fileno()).st_size:
+                    with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        yield mm
+                    return
+            yield b""
+            return
+        with self.open() as fh:
+            yield fh.read()
+
+    def iter_lines(self) -> Iterator[str]:
+        with self.open() as fh:
+            yield from io.TextIOWrapper(fh, encoding="utf-8", errors="ignore")
+
+
+def _has_ext(name: str, exts: tuple[str, ...] | None) -> bool:
+    return exts is None or name.lower().endswith(exts)
+
+
+def zip_sources(path: str, exts: tuple[str, ...] | None = LOG_EXTS, in_place: bool = False) -> list[LogSource]:
+    sources: list[LogSource] = []
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not _has_ext(info.filename, exts):
+                continue
+            sources.append(LogSource(info.filename.split("/")[-1], path, info.filename, info.file_size, in_place))
+    return sources
+
+
+class UploadSpool:
+    """Temporary on-disk copies of the uploads of one request.
+
+    Use as ``async with UploadSpool() as spool:``; files are removed on exit.
+    """
+
+    def __init__(self):
+        self.paths: list[str] = []
+
+    def new_path(self) -> str:
+        """An empty spool file for output written by the caller (removed on close)."""
+        fd, path = tempfile.mkstemp(prefix="nettools-", dir=SPOOL_DIR)
+        os.close(fd)
+        self.paths.append(path)
+        return path
+
+    async def add(self, upload: UploadFile) -> str:
+        fd, path = tempfile.mkstemp(prefix="nettools-", dir=SPOOL_DIR)
+        self.paths.append(path)
+        with span("spool"), os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                await run_blocking(out.write, chunk)
+        return path
+
+    async def sources(
+        self,
+        files: list[UploadFile] | None = None,
+        zips: list[UploadFile] | None = None,
+        exts: tuple[str, ...] | None = LOG_EXTS,
+        skip_bad_zip: bool = False,
+    ) -> list[LogSource]:
+        sources: list[LogSource] = []
+        for f in files or []:
+            fname = f.filename or ""
+            if not _has_ext(fname, exts):
+                continue
+            path = await self.add(f)
+            sources.append(LogSource(fname, path, None, os.path.getsize(path)))
+        for z in zips or []:
+            path = await self.add(z)
+            try:
+                with span("unzip"):
+                    sources.extend(await run_blocking(zip_sources, path, LOG_EXTS))
+            except zipfile.BadZipFile:
+                if not skip_bad_zip:
+                    raise
+        count(files=len(sources), bytes=sum(src.size for src in sources))
+        return sources
+
+    def close(self) -> None:
+        for path in self.paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self.paths.clear()
+
+    async def __aenter__(self) -> "UploadSpool":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,452 @@
+"""Live collection of device output over SSH, parsed in place of an upload.
+
+POST /collect runs a command set (``show version``/``show lldp neighbors``
+and friends, see COMMAND_SETS) on every listed device. At most
+NETTOOLS_COLLECT_WORKERS devices are worked on at once, on a thread pool of
+their own so slow devices never hold the shared blocking pool. Each device
+gets a connect timeout, a per-command timeout and an overall deadline. Its
+commands run as exec channels on one SSH connection. After a clean run the
+connection stays in an idle pool for NETTOOLS_COLLECT_IDLE seconds, so the
+next collection from the same devices skips the TCP and key exchange.
+Connections are pooled per host, port, user and password hash.
+
+Each device's output is written to a spool file shaped like a captured log
+(``# <command>`` before each output). The spool files go to the same
+cached, pooled parsers as uploads (``_extract_items`` / ``_lldp_rows``).
+The response carries session tokens, so /extract/any/excel and
+/lldp/hostname/excel can export the result without another run.
+
+Host keys are trusted on first use: the first key a host presents is recorded
+in NETTOOLS_COLLECT_TOFU_HOSTS (a known_hosts file, kept across restarts) and
+later connections presenting another key are refused. By default the file
+lives in NETTOOLS_STATE_DIR (~/.nettools) and is kept private (see state); a
+file or directory someone else owns or can write to is refused. Set
+NETTOOLS_COLLECT_KNOWN_HOSTS to a known_hosts file to refuse unknown hosts
+instead.
+benchmarks/ssh_stub.py serves synthetic EXOS/VOSS devices for trying this out.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import NamedTuple
+
+import paramiko
+from fastapi import APIRouter, Form, Request
+
+from .archive import LogSource, UploadSpool
+from .extract_model_serial_hostname import OUTPUT_COLUMNS, _excel_sheets, _extract_items
+from .jobs import submit_job
+from .lldp_hostname import LLDP_COLUMNS, _compile_patterns, _excel_rows, _lldp_rows, _preview_records
+from .metrics import count, span
+from .offload import run_blocking
+from .sessions import store
+from .state import open_private, state_path
+from .xlsx_stream import XLSX_MEDIA_TYPE, stream_xlsx
+
+router = APIRouter()
+
+COLLECT_WORKERS = int(os.getenv("NETTOOLS_COLLECT_WORKERS", "32"))
+MAX_DEVICES = int(os.getenv("NETTOOLS_COLLECT_MAX_DEVICES", "2000"))
+CONNECT_TIMEOUT = float(os.getenv("NETTOOLS_COLLECT_CONNECT_TIMEOUT", "10"))
+COMMAND_TIMEOUT = float(os.getenv("NETTOOLS_COLLECT_COMMAND_TIMEOUT", "30"))
+DEVICE_TIMEOUT = float(os.getenv("NETTOOLS_COLLECT_DEVICE_TIMEOUT", "120"))
+# output kept per device; a runaway command is cut off there
+MAX_OUTPUT_BYTES = int(os.getenv("NETTOOLS_COLLECT_MAX_MB", "64")) * 1024 * 1024
+IDLE_SECONDS = float(os.getenv("NETTOOLS_COLLECT_IDLE", "300"))
+MAX_IDLE = int(os.getenv("NETTOOLS_COLLECT_MAX_IDLE", "256"))
+KNOWN_HOSTS = os.getenv("NETTOOLS_COLLECT_KNOWN_HOSTS") or None
+TOFU_HOSTS = os.getenv("NETTOOLS_COLLECT_TOFU_HOSTS") or state_path("collect-known-hosts")
+RECV_CHUNK = 64 * 1024
+
+COMMAND_SETS = {
+    "exos": ["show version", "show switch", "show lldp neighbors"],
+    "voss": ["show sys-info", "show software", "show lldp neighbor"],
+}
+
+NO_HOSTS = {"error": "접속할 장비(IP 또는 호스트명)를 입력하세요."}
+NO_COMMANDS = {"error": "실행할 명령어를 입력하세요."}
+TOO_MANY_DEVICES = {"error": f"장비는 한 번에 최대 {MAX_DEVICES}대까지 수집할 수 있습니다."}
+
+_SPLIT_RE = re.compile(r"[\s,;]+")
+_PORT_RE = re.compile(r"^(.+):(\d{1,5})$")
+
+
+class Target(NamedTuple):
+    host: str
+    port: int = 22
+
+
+def parse_targets(text: str, default_port: int = 22) -> list[Target]:
+    """``host`` or ``host:port`` tokens; ``#`` starts a comment, duplicates are dropped."""
+    targets: dict[Target, None] = {}
+    for line in (text or "").splitlines():
+        for token in _SPLIT_RE.split(line.split("#", 1)[0].strip()):
+            if not token:
+                continue
+            m = _PORT_RE.match(token)
+            if m and ":" not in m.group(1):
+                targets[Target(m.group(1), int(m.group(2)))] = None
+            else:
+                targets[Target(token.strip("[]"), default_port)] = None
+    return list(targets)
+
+
+class CollectTimeout(Exception):
+    pass
+
+
+class TrustOnFirstUse(paramiko.MissingHostKeyPolicy):
+    """Records the first key each host presents; a changed key is then refused.
+
+    Keys live in one known_hosts file shared by every connection. paramiko
+    itself raises BadHostKeyException when a recorded host shows another key.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._keys = paramiko.HostKeys()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_name(target: Target) -> str:
+        # the name paramiko looks keys up by
+        return target.host if target.port == 22 else f"[{target.host}]:{target.port}"
+
+    def prepare(self, client: paramiko.SSHClient, target: Target) -> None:
+        with self._lock:
+            if not self._loaded:
+                os.close(open_private(self.path))
+                self._keys.load(self.path)
+                self._loaded = True
+            known = self._keys.lookup(self.host_name(target))
+        for key_type, key in (known or {}).items():
+            client.get_host_keys().add(self.host_name(target), key_type, key)
+        client.set_missing_host_key_policy(self)
+
+    def missing_host_key(self, client, hostname, key) -> None:
+        with self._lock:
+            known = (self._keys.lookup(hostname) or {}).get(key.get_name())
+            if known is not None:
+                # recorded by a concurrent connection after this one started
+                if known != key:
+                    raise paramiko.BadHostKeyException(hostname, key, known)
+                return
+            with os.fdopen(open_private(self.path), "a", encoding="utf-8") as fh:
+                fh.write(f"{hostname} {key.get_name()} {key.get_base64()}\n")
+            self._keys.add(hostname, key.get_name(), key)
+
+
+trusted_keys = TrustOnFirstUse(TOFU_HOSTS)
+
+
+class ConnectionPool:
+    """Authenticated SSH clients kept open between collections."""
+
+    def __init__(self, idle_seconds: float, max_idle: int):
+        self.idle_seconds = idle_seconds
+        self.max_idle = max_idle
+        self._idle: dict[tuple, list[tuple[paramiko.SSHClient, float]]] = {}
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reuses = 0
+
+    @staticmethod
+    def key(target: Target, username: str, password: str) -> tuple:
+        # a connection authenticated with other credentials is never handed out
+        return target.host, target.port, username, hashlib.sha256(password.encode()).hexdigest()
+
+    @staticmethod
+    def _alive(client: paramiko.SSHClient) -> bool:
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def acquire(self, target: Target, username: str, password: str, timeout: float) -> tuple[paramiko.SSHClient, bool]:
+        key = self.key(target, username, password)
+        now = time.monotonic()
+        with self._lock:
+            stack = self._idle.get(key, [])
+            while stack:
+                client, since = stack.pop()
+                if now - since < self.idle_seconds and self._alive(client):
+                    self.reuses += 1
+                    return client, True
+                client.close()
+        client = paramiko.SSHClient()
+        if KNOWN_HOSTS:
+            client.load_host_keys(KNOWN_HOSTS)
+            client.set_missing_host_key_policy(paramiko.RejectPolicy())
+        else:
+            trusted_keys.prepare(client, target)
+        try:
+            client.connect(
+                target.host,
+                port=target.port,
+                username=username,
+                password=password or None,
+                timeout=timeout,
+                banner_timeout=timeout,
+                auth_timeout=timeout,
+                allow_agent=False,
+                look_for_keys=not password,
+            )
+        except BaseException:
+            client.close()
+            raise
+        with self._lock:
+            self.connects += 1
+        return client, False
+
+    def release(self, target: Target, username: str, password: str, client: paramiko.SSHClient, healthy: bool) -> None:
+        if not healthy or self.idle_seconds <= 0 or not self._alive(client):
+            client.close()
+            return
+        key = self.key(target, username, password)
+        with self._lock:
+            self._purge()
+            if sum(len(stack) for stack in self._idle.values()) >= self.max_idle:
+                client.close()
+                return
+            self._idle.setdefault(key, []).append((client, time.monotonic()))
+
+    def _purge(self) -> None:
+        cutoff = time.monotonic() - self.idle_seconds
+        for key in list(self._idle):
+            fresh = []
+            for client, since in self._idle[key]:
+                if since >= cutoff and self._alive(client):
+                    fresh.append((client, since))
+                else:
+                    client.close()
+            if fresh:
+                self._idle[key] = fresh
+            else:
+                del self._idle[key]
+
+    def close_all(self) -> None:
+        with self._lock:
+            for stack in self._idle.values():
+                for client, _since in stack:
+                    client.close()
+            self._idle.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge()
+            idle = sum(len(stack) for stack in self._idle.values())
+        return {"idle": idle, "max_idle": self.max_idle, "idle_seconds": self.idle_seconds,
+                "connects": self.connects, "reuses": self.reuses}
+
+
+pool = ConnectionPool(IDLE_SECONDS, MAX_IDLE)
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=COLLECT_WORKERS, thread_name_prefix="nettools-collect")
+    return _executor
+
+
+def shutdown_collect() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    pool.close_all()
+
+
+def _run_command(client: paramiko.SSHClient, command: str, deadline: float, out, budget: int) -> int:
+    """Write ``command``'s output to ``out``; returns the bytes written."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise CollectTimeout()
+    channel = client.get_transport().open_session(timeout=remaining)
+    written = 0
+    try:
+        channel.set_combine_stderr(True)
+        channel.settimeout(remaining)
+        channel.exec_command(command)
+        while True:
+            data = channel.recv(RECV_CHUNK)
+            if not data:
+                break
+            out.write(data[: max(0, budget - written)])
+            written += len(data)
+            if written >= budget:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise CollectTimeout()
+            channel.settimeout(remaining)
+    finally:
+        channel.close()
+    return min(written, budget)
+
+
+def collect_device(target: Target, username: str, password: str, commands: list[str], path: str) -> dict:
+    """Run ``commands`` on one device into ``path``; never raises."""
+    started = time.monotonic()
+    result = {"host": target.host, "port": target.port, "ok": False, "error": None,
+              "reused": False, "commands": 0, "bytes": 0, "seconds": 0.0}
+    client = None
+    healthy = False
+    try:
+        client, result["reused"] = pool.acquire(target, username, password, CONNECT_TIMEOUT)
+        device_deadline = started + DEVICE_TIMEOUT
+        with open(path, "wb") as out:
+            for command in commands:
+                out.write(f"# {command}\n".encode("utf-8"))
+                deadline = min(device_deadline, time.monotonic() + COMMAND_TIMEOUT)
+                result["bytes"] += _run_command(client, command, deadline, out, MAX_OUTPUT_BYTES - result["bytes"])
+                out.write(b"\n")
+                result["commands"] += 1
+                if result["bytes"] >= MAX_OUTPUT_BYTES:
+                    break
+        healthy = True
+        result["ok"] = True
+    except (CollectTimeout, socket.timeout, TimeoutError):
+        result["error"] = "시간 초과"
+    except paramiko.AuthenticationException:
+        result["error"] = "인증 실패"
+    except paramiko.BadHostKeyException:
+        result["error"] = "호스트 키 불일치"
+    except (paramiko.SSHException, OSError, EOFError) as exc:
+        if client is None and time.monotonic() - started >= CONNECT_TIMEOUT:
+            # paramiko reports a silent server as a banner or session error
+            result["error"] = "시간 초과"
+        else:
+            result["error"] = f"접속 실패: {exc or type(exc).__name__}"
+    finally:
+        if client is not None:
+            pool.release(target, username, password, client, healthy)
+        result["seconds"] = round(time.monotonic() - started, 3)
+    return result
+
+
+async def collect(targets: list[Target], username: str, password: str, commands: list[str],
+                  spool: UploadSpool, progress=None) -> tuple[list[dict], list[LogSource]]:
+    """Collect from every target; returns per-device results and the logs of the ones that answered."""
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    paths = [spool.new_path() for _ in targets]
+    futures = []
+    for target, path in zip(targets, paths):
+        future = loop.run_in_executor(executor, collect_device, target, username, password, commands, path)
+        if progress is not None:
+            future.add_done_callback(lambda f: f.cancelled() or progress(1, f.result()["bytes"]))
+        futures.append(future)
+    with span("collect"):
+        results = await asyncio.gather(*futures)
+    sources = [
+        LogSource(f"{r['host']}_collect.log", path, None, r["bytes"])
+        for r, path in zip(results, paths)
+        if r["ok"]
+    ]
+    count(files=len(sources), bytes=sum(src.size for src in sources))
+    return results, sources
+
+
+class CollectOptions(NamedTuple):
+    extract: bool
+    lldp: bool
+    pattern: str
+    strip_prefix: str
+    exact_match: bool
+    use_inventory: bool
+
+
+async def _collect_and_parse(targets, username, password, commands, options: CollectOptions,
+                             spool: UploadSpool, progress=None) -> tuple[list[dict], list[dict] | None, list[list[str]] | None]:
+    devices, sources = await collect(targets, username, password, commands, spool, progress)
+    rows = lldp_rows = None
+    if options.extract:
+        rows = await _extract_items(sources, OUTPUT_COLUMNS)
+    if options.lldp:
+        lldp_rows = await _lldp_rows(
+            sources, _compile_patterns(options.pattern), options.strip_prefix, options.exact_match,
+            use_inventory=options.use_inventory,
+        )
+    return devices, rows, lldp_rows
+
+
+DEVICE_COLUMNS = ["host", "port", "ok", "error", "reused", "commands", "bytes", "seconds"]
+
+
+async def _collect_job(targets, username, password, commands, options: CollectOptions, spool: UploadSpool, job):
+    try:
+        devices, rows, lldp_rows = await _collect_and_parse(
+            targets, username, password, commands, options, spool, job.advance
+        )
+    finally:
+        spool.close()
+    sheets = [("devices", DEVICE_COLUMNS, ([d[c] for c in DEVICE_COLUMNS] for d in devices))]
+    if rows is not None:
+        sheets.extend(_excel_sheets(rows, OUTPUT_COLUMNS))
+    if lldp_rows is not None:
+        with span("dataframe"):
+            sheets.append(("lldp", LLDP_COLUMNS, await run_blocking(_excel_rows, lldp_rows)))
+    return stream_xlsx(sheets)
+
+
+@router.post("/collect")
+async def collect_devices(
+    request: Request,
+    hosts: str = Form(...),
+    username: str = Form(...),
+    password: str = Form(""),
+    port: int = Form(22),
+    command_set: str = Form("exos"),
+    commands: str = Form(""),
+    extract: bool = Form(True),
+    lldp: bool = Form(True),
+    pattern: str = Form(""),
+    strip_prefix: str = Form(""),
+    include_description: bool = Form(False),  # exact match, as on /lldp
+    use_inventory: bool = Form(True),
+    background: bool = Form(False),
+):
+    targets = parse_targets(hosts, port)
+    if not targets:
+        return NO_HOSTS
+    if len(targets) > MAX_DEVICES:
+        return TOO_MANY_DEVICES
+    command_list = [c.strip() for c in commands.splitlines() if c.strip()] or COMMAND_SETS.get(command_set.lower(), [])
+    if not command_list:
+        return NO_COMMANDS
+    options = CollectOptions(extract, lldp, pattern, strip_prefix, bool(include_description), use_inventory)
+
+    if background:
+        # the spool outlives this request; the job removes it when it is done
+        spool = UploadSpool()
+        work = partial(_collect_job, targets, username, password, command_list, options, spool)
+        return submit_job(request, "collect", "collect.xlsx", XLSX_MEDIA_TYPE, work,
+                          files_total=len(targets), cleanup=spool.close)
+
+    async with UploadSpool() as spool:
+        devices, rows, lldp_rows = await _collect_and_parse(targets, username, password, command_list, options, spool)
+    sessions = {}
+    result: dict = {"devices": devices, "ok": sum(1 for d in devices if d["ok"]), "failed": sum(1 for d in devices if not d["ok"])}
+    if rows is not None:
+        result["extract"] = rows
+        # export tokens for /extract/any/excel and /lldp/hostname/excel
+        sessions["extract"] = store.create("extract", (OUTPUT_COLUMNS, rows))
+    if lldp_rows is not None:
+        sessions["lldp"] = store.create("lldp", lldp_rows)
+        with span("dataframe"):
+            result["lldp"] = await run_blocking(_preview_records, lldp_rows)
+    result["sessions"] = sessions
+    return result
+
+
+@router.get("/collect/stats")
+async def collect_stats():
+    return {"workers": COLLECT_WORKERS, "max_devices": MAX_DEVICES, "pool": pool.stats()}
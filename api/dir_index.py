@@ -0,0 +1,247 @@
+"""Persistent, incrementally refreshed file index for /dir/list.
+
+Each listed root keeps one entry per directory: its mtime, the subdirectories
+to descend into and the file names, in ``os.scandir`` order so listings come
+out exactly as ``os.walk`` produced them. Adding, removing or renaming an entry
+changes the mtime of its parent directory, so a refresh only re-lists the
+directories whose mtime moved and merely stats the rest. Entries are stored in
+sqlite (NETTOOLS_DIR_INDEX_DB, by default in NETTOOLS_STATE_DIR) and survive
+restarts; set NETTOOLS_DIR_INDEX_DB="" to keep them in memory only. Files still
+being written under a ``partial_path`` name (TFTP uploads) are left out until
+they are renamed into place.
+"""
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, NamedTuple
+
+from .state import private_file, state_path
+
+INDEX_DB = os.getenv("NETTOOLS_DIR_INDEX_DB", state_path("dir-index.sqlite3"))
+# listings older than this answer from the index and refresh in the background
+INDEX_TTL = float(os.getenv("NETTOOLS_DIR_INDEX_TTL", "60"))
+# ... but only up to this age; an older index (after an idle night, or loaded
+# from sqlite at startup) is refreshed before it answers, like a first scan
+INDEX_MAX_STALE = float(os.getenv("NETTOOLS_DIR_INDEX_MAX_STALE", str(2 * INDEX_TTL)))
+INDEX_MAX_ROOTS = int(os.getenv("NETTOOLS_DIR_INDEX_ROOTS", "8"))
+# a directory modified this close to the scan may change again within the same
+# mtime tick; such entries are re-listed on the next refresh
+RACY_NS = 2_000_000_000
+
+# names given by partial_path
+_PARTIAL_RE = re.compile(r"\..+\.[0-9a-f]{8}\.part")
+
+INDEX_AGE_HEADER = "X-NetTools-Index-Age"
+INDEX_REFRESHING_HEADER = "X-NetTools-Index-Refreshing"
+
+
+class _Dir(NamedTuple):
+    mtime_ns: int  # -1: list again on the next refresh
+    subdirs: tuple[str, ...]
+    files: tuple[str, ...]
+
+
+def partial_path(path: str) -> str:
+    """Hidden sibling of ``path`` to write into and then rename; never listed."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{secrets.token_hex(4)}.part")
+
+
+def _split(names: str) -> tuple[str, ...]:
+    return tuple(names.split("\0")) if names else ()
+
+
+def _list_dir(path: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    subdirs: list[str] = []
+    files: list[str] = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                if not _PARTIAL_RE.fullmatch(entry.name):
+                    files.append(entry.name)
+            # like os.walk(followlinks=False): linked directories are neither
+            # files nor descended into
+            elif not entry.is_symlink():
+                subdirs.append(entry.name)
+    return tuple(subdirs), tuple(files)
+
+
+class DirectoryIndex:
+    def __init__(self, root: str, db: "IndexStore | None" = None):
+        self.root = root
+        self.db = db
+        # relative dir path ("" for the root) -> _Dir; replaced wholesale on refresh
+        self.dirs: dict[str, _Dir] = {}
+        self.scanned_at: float | None = None
+        self.last_scan: dict = {}
+        self.refreshing = False
+        # set when files are known to have changed under the root (see invalidate)
+        self.stale = False
+        self._lock = threading.Lock()
+        if db is not None:
+            self.dirs, self.scanned_at = db.load(root)
+
+    def refresh(self) -> None:
+        with self._lock:
+            self.refreshing = True
+            try:
+                self._refresh()
+            finally:
+                self.refreshing = False
+
+    def _refresh(self) -> None:
+        # cleared first, so a change during the scan marks the result stale again
+        self.stale = False
+        started = time.time()
+        scan_ns = time.time_ns()
+        old = self.dirs
+        new: dict[str, _Dir] = {}
+        changed: dict[str, _Dir] = {}
+        statted = 0
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            path = os.path.join(self.root, rel) if rel else self.root
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+                statted += 1
+                entry = old.get(rel)
+                if entry is None or entry.mtime_ns != mtime_ns:
+                    subdirs, files = _list_dir(path)
+                    if scan_ns - mtime_ns < RACY_NS:
+                        mtime_ns = -1
+                    entry = _Dir(mtime_ns, subdirs, files)
+                    changed[rel] = entry
+            except OSError:
+                # unreadable or vanished: os.walk skips these silently too
+                entry = _Dir(-1, (), ())
+                changed[rel] = entry
+            new[rel] = entry
+            # reversed so the stack pops subdirectories in listing order
+            stack.extend(os.path.join(rel, name) if rel else name for name in reversed(entry.subdirs))
+        removed = [rel for rel in old if rel not in new]
+        self.dirs = new
+        self.scanned_at = time.time()
+        self.last_scan = {
+            "seconds": round(self.scanned_at - started, 3),
+            "dirs": len(new),
+            "dirs_statted": statted,
+            "dirs_listed": len(changed),
+            "dirs_removed": len(removed),
+        }
+        if self.db is not None:
+            self.db.save(self.root, self.scanned_at, changed, removed)
+
+    def iter_dirs(self, base: str) -> Iterator[tuple[str, tuple[str, ...]]]:
+        """``(dirpath, filenames)`` in os.walk order, with paths rooted at ``base``."""
+        dirs = self.dirs
+        stack = [("", base)]
+        while stack:
+            rel, path = stack.pop()
+            entry = dirs.get(rel)
+            if entry is None:
+                continue
+            yield path, entry.files
+            for name in reversed(entry.subdirs):
+                stack.append((os.path.join(rel, name) if rel else name, os.path.join(path, name)))
+
+    def age(self) -> float | None:
+        return None if self.scanned_at is None else time.time() - self.scanned_at
+
+    def status(self) -> dict:
+        age = self.age()
+        return {
+            "root": self.root,
+            "scanned_at": self.scanned_at,
+            "age_seconds": None if age is None else round(age, 3),
+            "refreshing": self.refreshing,
+            "stale": self.stale,
+            "files": sum(len(d.files) for d in self.dirs.values()),
+            "last_scan": self.last_scan,
+        }
+
+
+class IndexStore:
+    def __init__(self, path: str):
+        # a planted index would list files that do not exist; see state
+        self._db = sqlite3.connect(private_file(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS dirs ("
+                "root TEXT NOT NULL, rel TEXT NOT NULL, mtime_ns INTEGER NOT NULL, "
+                "subdirs TEXT NOT NULL, files TEXT NOT NULL, PRIMARY KEY (root, rel))"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS roots (root TEXT PRIMARY KEY, scanned_at REAL NOT NULL)")
+            self._db.commit()
+
+    def load(self, root: str) -> tuple[dict[str, _Dir], float | None]:
+        with self._lock:
+            row = self._db.execute("SELECT scanned_at FROM roots WHERE root = ?", (root,)).fetchone()
+            if row is None:
+                return {}, None
+            dirs = {
+                rel: _Dir(mtime_ns, _split(subdirs), _split(files))
+                for rel, mtime_ns, subdirs, files in self._db.execute(
+                    "SELECT rel, mtime_ns, subdirs, files FROM dirs WHERE root = ?", (root,)
+                )
+            }
+        return dirs, row[0]
+
+    def save(self, root: str, scanned_at: float, changed: dict[str, _Dir], removed: list[str]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO dirs (root, rel, mtime_ns, subdirs, files) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (root, rel, d.mtime_ns, "\0".join(d.subdirs), "\0".join(d.files))
+                    for rel, d in changed.items()
+                ),
+            )
+            self._db.executemany("DELETE FROM dirs WHERE root = ? AND rel = ?", ((root, rel) for rel in removed))
+            self._db.execute("INSERT OR REPLACE INTO roots (root, scanned_at) VALUES (?, ?)", (root, scanned_at))
+            self._db.commit()
+
+
+class IndexRegistry:
+    """The indexes of the most recently listed roots, keyed by real path."""
+
+    def __init__(self, db_path: str | None, max_roots: int):
+        self.db = IndexStore(db_path) if db_path else None
+        self.max_roots = max_roots
+        self._indexes: OrderedDict[str, DirectoryIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, directory: str) -> DirectoryIndex:
+        root = os.path.realpath(directory)
+        with self._lock:
+            index = self._indexes.get(root)
+            if index is None:
+                index = self._indexes[root] = DirectoryIndex(root, self.db)
+                while len(self._indexes) > self.max_roots:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(root)
+            return index
+
+    def invalidate(self, path: str) -> None:
+        """Make the next listing of any root holding ``path`` refresh first."""
+        real = os.path.realpath(path)
+        with self._lock:
+            for root, index in self._indexes.items():
+                if real == root or real.startswith(os.path.join(root, "")):
+                    index.stale = True
+
+    def status(self) -> list[dict]:
+        with self._lock:
+            indexes = list(self._indexes.values())
+        return [index.status() for index in indexes]
+
+
+indexes = IndexRegistry(INDEX_DB or None, INDEX_MAX_ROOTS)
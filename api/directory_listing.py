@@ -1,47 +1,170 @@
-from fastapi import APIRouter, Form, UploadFile, File
+from fastapi import APIRouter, Form, UploadFile, File, Response
 from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+import fnmatch
+import json
 import os
-import pandas as pd
-import io
+import re
+import weakref
 import zipfile
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Literal
+
+from .archive import UploadSpool
+from .dir_index import INDEX_AGE_HEADER, INDEX_MAX_STALE, INDEX_REFRESHING_HEADER, INDEX_TTL, DirectoryIndex, indexes
+from .offload import iterate_blocking, run_blocking, spawn_blocking
+from .sessions import attach_session, session_expired, store
+from .xlsx_stream import xlsx_response
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+INVALID_CURSOR = {"error": "cursor에 해당하는 항목이 없습니다. 처음부터 다시 조회하세요."}
+
+
+def _allowed_exts(include_ini: bool, include_log: bool, include_txt: bool, exts: str | None) -> set[str]:
+    # an explicit extension list ("log,cfg") replaces the include_* switches
+    if exts and exts.strip():
+        return {"." + e.strip().lstrip(".").lower() for e in re.split(r"[\s,]+", exts) if e.strip().lstrip(".")}
+    allow_exts = set()
+    if include_ini:
+        allow_exts.add(".ini")
+    if include_log:
+        allow_exts.add(".log")
+    if include_txt:
+        allow_exts.add(".txt")
+    return allow_exts
+
+
+def _name_filter(name_glob: str | None) -> Callable[[str], bool] | None:
+    if not name_glob or not name_glob.strip():
+        return None
+    return re.compile(fnmatch.translate(name_glob.strip()), re.IGNORECASE).match
+
 
-def _collect_files(base_dir: str, allow_exts: set[str]):
-    rows = []
-    for root, _dirs, files in os.walk(base_dir):
-        for filename in files:
-            ext = os.path.splitext(filename)[1].lower()
-            if ext in allow_exts:
-                file_path = os.path.join(root, filename)
-                raw_name = os.path.splitext(filename)[0]
-                rows.append({
+def _iter_rows(
+    dirs: Iterable[tuple[str, Iterable[str]]],
+    allow_exts: set[str],
+    name_match: Callable[[str], bool] | None = None,
+) -> Iterator[dict]:
+    # same rows, in the same order, as the os.walk listing this replaced
+    suffixes = tuple(allow_exts)
+    for root, filenames in dirs:
+        prefix = os.path.join(root, "")
+        for filename in filenames:
+            # cheap suffix test first; splitext only for the files that are listed
+            if not filename.lower().endswith(suffixes):
+                continue
+            raw_name, ext = os.path.splitext(filename)
+            ext = ext.lower()
+            if ext in allow_exts and (name_match is None or name_match(filename)):
+                yield {
                     "name": raw_name,
                     "filename": filename,
-                    "path": file_path,
+                    "path": prefix + filename,
                     "ext": ext,
-                })
-    return rows
+                }
+
+
+def _after_cursor(rows: Iterable[dict], cursor: str | None) -> Iterator[dict]:
+    """The rows that follow the one whose ``path`` is ``cursor``.
+
+    Raises KeyError when the cursor row is no longer listed.
+    """
+    it = iter(rows)
+    if cursor:
+        for row in it:
+            if row["path"] == cursor:
+                break
+        else:
+            raise KeyError(cursor)
+    return it
+
+
+def _page(rows: Iterable[dict], cursor: str | None, limit: int | None) -> tuple[list[dict], str | None]:
+    it = _after_cursor(rows, cursor)
+    if limit is None:
+        return list(it), None
+    items = list(islice(it, limit))
+    # peek one row ahead so the last page does not hand out a dangling cursor
+    more = next(it, None) is not None
+    return items, items[-1]["path"] if more and items else None
+
+
+def _ndjson(rows: Iterable[dict]) -> Iterator[bytes]:
+    for row in rows:
+        yield (json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _ndjson_page(rows: Iterable[dict], cursor: str | None, limit: int | None) -> Iterator[bytes]:
+    try:
+        page = islice(_after_cursor(rows, cursor), limit)
+    except KeyError:
+        yield from _ndjson([INVALID_CURSOR])
+        return
+    yield from _ndjson(page)
+
+
+def _listing_payload(items: list[dict], next_cursor: str | None, paged: bool):
+    # without limit/cursor the response stays the plain array it always was
+    return {"items": items, "next_cursor": next_cursor} if paged else items
+
+
+async def _fresh_index(directory: str, refresh: bool) -> DirectoryIndex:
+    index = indexes.get(directory)
+    if refresh or index.scanned_at is None or index.stale or index.age() > INDEX_MAX_STALE:
+        await run_blocking(index.refresh)
+    elif index.age() > INDEX_TTL and not index.refreshing:
+        # answer from the index now; the next call sees the refreshed tree
+        spawn_blocking(index.refresh)
+    return index
+
+
+def _freshness_headers(response: Response, index: DirectoryIndex) -> None:
+    response.headers[INDEX_AGE_HEADER] = f"{index.age() or 0:.3f}"
+    response.headers[INDEX_REFRESHING_HEADER] = "1" if index.refreshing else "0"
 
 
 @router.post("/dir/list")
 async def list_directory(
+    response: Response,
     directory: str = Form(...),
     include_ini: bool = Form(False),
     include_log: bool = Form(True),
     include_txt: bool = Form(True),
+    exts: str | None = Form(None),
+    name_glob: str | None = Form(None),
+    cursor: str | None = Form(None),
+    limit: int | None = Form(None, ge=1),
+    format: Literal["json", "ndjson"] = Form("json"),
+    refresh: bool = Form(False),
 ):
-    allow_exts = set()
-    if include_ini:
-        allow_exts.add(".ini")
-    if include_log:
-        allow_exts.add(".log")
-    if include_txt:
-        allow_exts.add(".txt")
+    allow_exts = _allowed_exts(include_ini, include_log, include_txt, exts)
+    name_match = _name_filter(name_glob)
+
+    if format == "ndjson":
+        index = indexes.get(directory)
+        if index.scanned_at is None and not refresh:
+            # nothing indexed yet: stream straight from the walk and build the
+            # index alongside it for the next call
+            spawn_blocking(index.refresh)
+            dirs = ((root, files) for root, _dirs, files in os.walk(directory))
+        else:
+            index = await _fresh_index(directory, refresh)
+            dirs = index.iter_dirs(directory)
+
+        headers = {INDEX_AGE_HEADER: f"{index.age() or 0:.3f}"}
+        rows = _iter_rows(dirs, allow_exts, name_match)
+        return StreamingResponse(iterate_blocking(_ndjson_page(rows, cursor, limit)), media_type=NDJSON_MEDIA_TYPE, headers=headers)
 
-    rows = _collect_files(directory, allow_exts)
-    return rows
+    index = await _fresh_index(directory, refresh)
+    rows = _iter_rows(index.iter_dirs(directory), allow_exts, name_match)
+    try:
+        items, next_cursor = await run_blocking(_page, rows, cursor, limit)
+    except KeyError:
+        return INVALID_CURSOR
+    _freshness_headers(response, index)
+    return _listing_payload(items, next_cursor, cursor is not None or limit is not None)
 
 
 @router.post("/dir/list/excel")
@@ -50,91 +173,153 @@ async def list_directory_excel(
     include_ini: bool = Form(False),
     include_log: bool = Form(True),
     include_txt: bool = Form(True),
+    exts: str | None = Form(None),
+    name_glob: str | None = Form(None),
+    refresh: bool = Form(False),
 ):
-    allow_exts = set()
-    if include_ini:
-        allow_exts.add(".ini")
-    if include_log:
-        allow_exts.add(".log")
-    if include_txt:
-        allow_exts.add(".txt")
+    allow_exts = _allowed_exts(include_ini, include_log, include_txt, exts)
+    index = await _fresh_index(directory, refresh)
+    rows = _iter_rows(index.iter_dirs(directory), allow_exts, _name_filter(name_glob))
+    response = _listing_excel(rows)
+    _freshness_headers(response, index)
+    return response
 
-    rows = _collect_files(directory, allow_exts)
-    df = pd.DataFrame(rows)
-    stream = io.BytesIO()
-    with pd.ExcelWriter(stream, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="listing")
-    stream.seek(0)
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=directory-listing.xlsx"},
-    )
-
-
-def _collect_files_from_zip(zip_bytes: bytes, allow_exts: set[str]):
-    rows = []
-    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
-        for info in zf.infolist():
-            if info.is_dir():
-                continue
-            filename = os.path.basename(info.filename)
-            ext = os.path.splitext(filename)[1].lower()
-            if ext in allow_exts:
-                raw_name = os.path.splitext(filename)[0]
-                rows.append({
-                    "name": raw_name,
-                    "filename": filename,
-                    "path": info.filename,  # path inside zip
-                    "ext": ext,
-                })
-    return rows
+
+@router.get("/dir/index/status")
+async def directory_index_status():
+    return indexes.status()
+
+
+LISTING_COLUMNS = ["name", "filename", "path", "ext"]
+
+
+def _listing_excel(rows: Iterable[dict]):
+    sheet_rows = ([row[col] for col in LISTING_COLUMNS] for row in rows)
+    return xlsx_response([("listing", LISTING_COLUMNS, sheet_rows)], "directory-listing.xlsx")
+
+
+def _iter_zip_rows(zf: zipfile.ZipFile, allow_exts: set[str] | None, name_match=None) -> Iterator[dict]:
+    # only the central directory is read; members are never decompressed.
+    # allow_exts None: every file, whatever its extension
+    for info in zf.infolist():
+        if info.is_dir():
+            continue
+        filename = os.path.basename(info.filename)
+        ext = os.path.splitext(filename)[1].lower()
+        if (allow_exts is None or ext in allow_exts) and (name_match is None or name_match(filename)):
+            raw_name = os.path.splitext(filename)[0]
+            yield {
+                "name": raw_name,
+                "filename": filename,
+                "path": info.filename,  # path inside zip
+                "ext": ext,
+            }
+
+
+def _filter_zip_rows(rows: Iterable[dict], allow_exts: set[str], name_match=None) -> Iterator[dict]:
+    return (r for r in rows if r["ext"] in allow_exts and (name_match is None or name_match(r["filename"])))
+
+
+def _collect_files_from_zip(zip_path: str, allow_exts: set[str]):
+    with zipfile.ZipFile(zip_path) as zf:
+        return list(_iter_zip_rows(zf, allow_exts))
+
+
+def _close_upload(zf: zipfile.ZipFile, spool: UploadSpool) -> None:
+    zf.close()
+    spool.close()
 
 
 @router.post("/dir/zip/list")
 async def list_zip(
-    zip: UploadFile = File(...),
+    response: Response,
+    zip: UploadFile | None = File(None),
     include_ini: bool = Form(False),
     include_log: bool = Form(True),
     include_txt: bool = Form(True),
+    exts: str | None = Form(None),
+    name_glob: str | None = Form(None),
+    cursor: str | None = Form(None),
+    limit: int | None = Form(None, ge=1),
+    format: Literal["json", "ndjson"] = Form("json"),
+    session: str | None = Form(None),
 ):
-    allow_exts = set()
-    if include_ini:
-        allow_exts.add(".ini")
-    if include_log:
-        allow_exts.add(".log")
-    if include_txt:
-        allow_exts.add(".txt")
+    allow_exts = _allowed_exts(include_ini, include_log, include_txt, exts)
+    name_match = _name_filter(name_glob)
+    paged = cursor is not None or limit is not None
+
+    if session or zip is None:
+        # later pages / other filters over the listing of an earlier upload
+        stored = store.get("dir-zip", session)
+        if stored is None:
+            return session_expired()
+        rows = _filter_zip_rows(stored, allow_exts, name_match)
+        if format == "ndjson":
+            return StreamingResponse(iterate_blocking(_ndjson_page(rows, cursor, limit)), media_type=NDJSON_MEDIA_TYPE)
+        try:
+            items, next_cursor = await run_blocking(_page, rows, cursor, limit)
+        except KeyError:
+            return INVALID_CURSOR
+        return _listing_payload(items, next_cursor, paged)
 
-    data = await zip.read()
-    rows = _collect_files_from_zip(data, allow_exts)
-    return rows
+    spool = UploadSpool()
+    try:
+        zf = await run_blocking(zipfile.ZipFile, await spool.add(zip))
+    except BaseException:
+        spool.close()
+        raise
+
+    if format == "ndjson":
+        def stream():
+            try:
+                yield from _ndjson_page(_iter_zip_rows(zf, allow_exts, name_match), cursor, limit)
+            finally:
+                cleanup()
+
+        body = stream()
+        # a client gone before the first next() leaves the generator unstarted,
+        # so its finally never runs; the finalizer also fires (once) when the
+        # response is sent or when the generator is collected
+        cleanup = weakref.finalize(body, _close_upload, zf, spool)
+        return StreamingResponse(
+            iterate_blocking(body), media_type=NDJSON_MEDIA_TYPE, background=BackgroundTask(cleanup)
+        )
+
+    try:
+        rows = await run_blocking(lambda: list(_iter_zip_rows(zf, None)))
+    finally:
+        zf.close()
+        spool.close()
+    # the session keeps every file, so a later request may widen the filters too
+    attach_session(response, "dir-zip", rows)
+    try:
+        items, next_cursor = _page(_filter_zip_rows(rows, allow_exts, name_match), cursor, limit)
+    except KeyError:
+        return INVALID_CURSOR
+    return _listing_payload(items, next_cursor, paged)
 
 
 @router.post("/dir/zip/list/excel")
 async def list_zip_excel(
-    zip: UploadFile = File(...),
+    zip: UploadFile | None = File(None),
     include_ini: bool = Form(False),
     include_log: bool = Form(True),
     include_txt: bool = Form(True),
+    exts: str | None = Form(None),
+    name_glob: str | None = Form(None),
+    session: str | None = Form(None),
 ):
-    allow_exts = set()
-    if include_ini:
-        allow_exts.add(".ini")
-    if include_log:
-        allow_exts.add(".log")
-    if include_txt:
-        allow_exts.add(".txt")
+    allow_exts = _allowed_exts(include_ini, include_log, include_txt, exts)
+    name_match = _name_filter(name_glob)
 
-    data = await zip.read()
-    rows = _collect_files_from_zip(data, allow_exts)
-    df = pd.DataFrame(rows)
-    stream = io.BytesIO()
-    with pd.ExcelWriter(stream, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="listing")
-    stream.seek(0)
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=directory-listing.xlsx"},
-    )
+    if session or zip is None:
+        rows = store.get("dir-zip", session)
+        if rows is None:
+            return session_expired()
+        rows = list(_filter_zip_rows(rows, allow_exts, name_match))
+    else:
+        async with UploadSpool() as spool:
+            rows = await run_blocking(_collect_files_from_zip, await spool.add(zip), allow_exts)
+        if name_match is not None:
+            rows = [r for r in rows if name_match(r["filename"])]
+    return _listing_excel(rows)
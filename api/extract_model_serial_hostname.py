@@ -1,63 +1,42 @@
 # backend/extract_model_serial_hostname.py
-from fastapi import APIRouter, UploadFile, File, Form
-import pandas as pd
-import io
+from fastapi import APIRouter, UploadFile, File, Form, Request, Response
 from fastapi.responses import StreamingResponse
 import re
-import zipfile
+from functools import lru_cache, partial
+
+from .archive import LogSource, UploadSpool
+from .inventory import inventory
+from .jobs import submit_job
+from .offload import run_blocking
+from .parse_cache import cached_map, pattern_fingerprint
+from .server_files import has_server_paths, server_sources
+from .sessions import attach_session, session_expired, store
+from .vendor_parsers import GENERIC, VendorParser, as_bytes, detect, get_vendor, registry_fingerprint, text
+from .xlsx_stream import XLSX_MEDIA_TYPE, stream_xlsx, xlsx_response
 
 router = APIRouter()
 
-# 정규식 패턴 (원래 코드에서 옮김)
-patterns = {
-    "sysname": [
-        re.compile(r"SysName\s*:\s*(.+)"),
-        re.compile(r'(?i)sys-?name\s+"([^"]+)"'),
-        re.compile(r'(?i)prompt\s+"([^"]+)"'),
-    ],
-    "serial": [
-        re.compile(r"Serial#\s*:\s*(.+)"),
-        re.compile(r"CardSerial#\s*:\s*(\S+)"),
-        re.compile(r'Switch\s*:\s*\S+\s+(\S+)'),
-    ],
-    "model": [
-        re.compile(r"ModelName\s*:\s*(.+)"),
-        re.compile(r"Chassis\s*:\s*(.+)"),
-        re.compile(r"System Type\s*:\s*(.+)"),
-        re.compile(r"box type\s*:\s*(.+)", re.IGNORECASE),
-    ],
-    # Image info (EXOS/FabricEngine) - capture version numbers only
-    "image": [
-        # From 'Image :' line in 'show version'
-        re.compile(r"(?im)Image\s*:\s.*?\b(\d+(?:\.\d+){1,3})\b"),
-        # Fallback to 'Primary ver:' or 'Secondary ver:' numeric version
-        re.compile(r"(?im)Primary\s+ver\s*:\s*(\d+(?:\.\d+){1,3})"),
-        re.compile(r"(?im)Secondary\s+ver\s*:\s*(\d+(?:\.\d+){1,3})"),
-        # FabricEngine/VOSS: SysDescr contains version in parentheses
-        re.compile(r"(?im)SysDescr\s*:\s.*?\((\d+(?:\.\d+){1,3})\)"),
-        # FabricEngine: software releases list like '9.0.5.1.GA (Primary Release)'
-        re.compile(r"(?im)^\s*(\d+(?:\.\d+){1,3})\.[A-Za-z].*\(Primary Release\)"),
-    ],
-    "image_selected": [
-        re.compile(r"Image\s*Selected\s*:\s*(\S+)"),
-        re.compile(r"(?im)^\s*(\d+(?:\.\d+){1,3})\.[A-Za-z].*\(Primary Release\)"),
-    ],
-    "image_booted": [
-        re.compile(r"Image\s*Booted\s*:\s*(\S+)"),
-        re.compile(r"(?im)SysDescr\s*:\s.*?\((\d+(?:\.\d+){1,3})\)"),
-    ],
-    # IP 추출: 로그 본문에서 우선 추출, 실패 시 파일명에서 추출
-    "ip": [
-        # EXOS 등에서 Mgmt/MGMT/Management가 포함된 라인에서 IP
-        re.compile(r"(?i)\b(?:mgmt|management)\b.*?((?:\d{1,3}\.){3}\d{1,3})"),
-        re.compile(r"(?i)\bip\s+address\s+((?:\d{1,3}\.){3}\d{1,3})"),
-        # VLAN 표처럼 'IP/Mask' 형태
-        re.compile(r"\b((?:\d{1,3}\.){3}\d{1,3})\b\s*/\d{1,2}"),
-        # 'IP:' 또는 'Address:' 표기
-        re.compile(r"(?i)\b(?:ip(?:v4)?|addr(?:ess)?)\b\s*[:=]\s*((?:\d{1,3}\.){3}\d{1,3})"),
-    ],
-    "filename": [re.compile(r"^(\d{1,3}(?:\.\d{1,3}){3})_")],
+# 정규식 패턴 (원래 코드에서 옮김) - the rules live in vendor_parsers; these are
+# the generic tables every vendor falls back to
+patterns = {field: [pat for pat, _anchors in rules] for field, rules in GENERIC.rules.items()}
+patterns["filename"] = [re.compile(r"^(\d{1,3}(?:\.\d{1,3}){3})_")]
+pattern_anchors = {field: [anchors for _pat, anchors in rules] for field, rules in GENERIC.rules.items()}
+
+# output column -> key in `patterns`, in output order
+FIELD_PATTERNS = {
+    "ip": "ip",
+    "hostname": "sysname",
+    "serial": "serial",
+    "model": "model",
+    "image": "image",
+    "image_selected": "image_selected",
+    "image_booted": "image_booted",
 }
+OUTPUT_COLUMNS = list(FIELD_PATTERNS)
+NOT_FOUND = "없음"
+# bump PARSER_VERSION when extraction logic changes without a pattern change
+PARSER_VERSION = "4-" + pattern_fingerprint(patterns, pattern_anchors, registry_fingerprint())
+
 
 def extract_by_patterns(pattern_list, text: str):
     for p in pattern_list:
@@ -68,7 +47,202 @@ def extract_by_patterns(pattern_list, text: str):
                 return m.group(1).strip()
             except IndexError:
                 return m.group(0).strip()
-    return "없음"
+    return NOT_FOUND
+
+
+# bytes of a raw log lowered at a time while looking for keywords
+SCAN_WINDOW = 1 << 20
+
+
+def _keyword_offsets(buf, keywords: set[str]) -> dict[str, int]:
+    """First offset of each (lowercase) keyword in the raw log ``buf``, -1 if absent.
+
+    Lowers one window at a time rather than copying the whole log, and stops
+    once every keyword has been seen.
+    """
+    found = dict.fromkeys(keywords, -1)
+    pending = {kw.encode("utf-8"): kw for kw in keywords}
+    overlap = max(map(len, pending), default=1) - 1
+    pos = 0
+    while pending and pos < len(buf):
+        window = bytes(buf[pos:pos + SCAN_WINDOW + overlap]).lower()
+        for kw in list(pending):
+            i = window.find(kw)
+            if i != -1:
+                found[pending.pop(kw)] = pos + i
+        pos += SCAN_WINDOW
+    return found
+
+
+def _line_start(buf, pos: int) -> int:
+    if hasattr(buf, "rfind"):
+        return buf.rfind(b"\n", 0, pos) + 1
+    # memoryview: look back a window at a time
+    while pos > 0:
+        lo = max(0, pos - SCAN_WINDOW)
+        i = bytes(buf[lo:pos]).rfind(b"\n")
+        if i != -1:
+            return lo + i + 1
+        pos = lo
+    return 0
+
+
+class CompiledExtractor:
+    """Extracts the requested columns from a log with one scan per distinct pattern.
+
+    Fields keep the first-pattern-wins priority of ``extract_by_patterns``;
+    patterns shared between fields run once, patterns whose keyword never
+    occurs are skipped, and columns that were not requested are not searched.
+    ``vendor`` selects the plugin whose rules are used (GENERIC: all of them).
+
+    ``extract`` takes the log as str or as its raw bytes (bytes, mmap or
+    memoryview); raw logs are searched with the bytes twins of the patterns and
+    only the captures are decoded.
+    """
+
+    def __init__(self, columns: list[str] | None = None, vendor: VendorParser = GENERIC):
+        wanted = set(OUTPUT_COLUMNS if columns is None else columns)
+        self.columns = [c for c in OUTPUT_COLUMNS if c in wanted]
+        self.vendor = vendor
+        self._rules = {col: vendor.field_rules(FIELD_PATTERNS[col]) for col in self.columns}
+        self._byte_rules = {
+            col: [(as_bytes(pat), anchors) for pat, anchors in rules] for col, rules in self._rules.items()
+        }
+        self._keywords = {kw for rules in self._rules.values() for _pat, anchors in rules for kw in anchors or ()}
+
+    def extract(self, content, filename: str = "") -> dict[str, str]:
+        offsets: dict[str, int] = {}
+        searched: dict[tuple, str | None] = {}
+        if isinstance(content, str):
+            rules = self._rules
+            lowered = content.lower()
+            if len(lowered) != len(content):
+                # a few non-ASCII characters change length when lowered; keyword
+                # offsets would be off, so fall back to scanning from the start
+                lowered = None
+
+            def line_start(pos: int) -> int:
+                return lowered.rfind("\n", 0, pos) + 1
+        else:
+            # lowering bytes only touches ASCII, so offsets always line up
+            rules = self._byte_rules
+            lowered = content
+            offsets = _keyword_offsets(content, self._keywords)
+
+            def line_start(pos: int) -> int:
+                return _line_start(content, pos)
+
+        def start_of(anchors) -> int:
+            if anchors is None or lowered is None:
+                return 0
+            best = -1
+            for kw in anchors:
+                if kw not in offsets:
+                    offsets[kw] = lowered.find(kw)
+                off = offsets[kw]
+                if off != -1 and (best == -1 or off < best):
+                    best = off
+            if best == -1:
+                return -1
+            return line_start(best)
+
+        row: dict[str, str] = {}
+        for col in self.columns:
+            value = None
+            for pat, anchors in rules[col]:
+                key = (pat.pattern, pat.flags)
+                if key not in searched:
+                    pos = start_of(anchors)
+                    m = pat.search(content, pos) if pos != -1 else None
+                    if m is None:
+                        searched[key] = None
+                    else:
+                        try:
+                            searched[key] = text(m.group(1)).strip()
+                        except IndexError:
+                            searched[key] = text(m.group(0)).strip()
+                value = searched[key]
+                if value is not None:
+                    break
+            if value is None:
+                value = NOT_FOUND
+                if col == "ip" and filename:
+                    value = extract_by_patterns(patterns["filename"], filename)
+            row[col] = value
+        return row
+
+
+@lru_cache(maxsize=64)
+def _extractor_for(columns: tuple[str, ...], vendor: str) -> CompiledExtractor:
+    return CompiledExtractor(list(columns), get_vendor(vendor))
+
+
+def _extract_item(columns: tuple[str, ...], source: LogSource) -> dict[str, str]:
+    # runs in the parse pool over the raw spooled upload (mmapped, not decoded);
+    # only the detected vendor's patterns are searched
+    with source.buffer() as buf:
+        return _extractor_for(columns, detect(buf).name).extract(buf, source.filename)
+
+
+def _filename_ip(source: LogSource) -> str:
+    # the ip column falls back to the filename, so it is part of the cache key
+    return extract_by_patterns(patterns["filename"], source.filename)
+
+
+async def _extract_items(sources: list[LogSource], columns: list[str], progress=None) -> list[dict]:
+    params = f"{PARSER_VERSION}:{','.join(columns)}"
+    rows = await cached_map(
+        "extract", params, partial(_extract_item, tuple(columns)), sources, progress,
+        variant=_filename_ip if "ip" in columns else None,
+    )
+    if "hostname" in columns:
+        # every parsed device also lands in the inventory LLDP resolves against
+        records = [(r["hostname"], r.get("ip"), r.get("model"), r.get("serial")) for r in rows]
+        await run_blocking(inventory.update, records, "extract")
+    return rows
+
+
+def _selected_columns(
+    include_ip: bool,
+    include_hostname: bool,
+    include_serial: bool,
+    include_model: bool,
+    include_image: bool,
+    include_image_selected: bool,
+    include_image_booted: bool,
+) -> list[str]:
+    flags = [
+        include_ip,
+        include_hostname,
+        include_serial,
+        include_model,
+        include_image,
+        include_image_selected,
+        include_image_booted,
+    ]
+    return [col for col, on in zip(OUTPUT_COLUMNS, flags) if on]
+
+
+def _excel_sheets(rows: list[dict], columns: list[str]):
+    sheet_rows = ([row.get(col, "") for col in columns] for row in rows)
+    return [("extracted", columns, sheet_rows)]
+
+
+def _excel_response(rows: list[dict], columns: list[str]) -> StreamingResponse:
+    return xlsx_response(_excel_sheets(rows, columns), "extract.xlsx")
+
+
+async def _extract_job(sources: list[LogSource], columns: list[str], spool: UploadSpool, job):
+    try:
+        rows = await _extract_items(sources, columns, job.advance)
+    finally:
+        spool.close()
+    return stream_xlsx(_excel_sheets(rows, columns))
+
+
+async def _rows_job(rows: list[dict], columns: list[str], job):
+    return stream_xlsx(_excel_sheets(rows, columns))
+
 
 @router.post("/extract/json")
 async def extract_json(
@@ -81,48 +255,14 @@ async def extract_json(
     include_image_selected: bool = Form(True),
     include_image_booted: bool = Form(True),
 ):
-    results = []
-    for f in files:
-        content = (await f.read()).decode("utf-8", errors="ignore")
-
-        sysname = extract_by_patterns(patterns["sysname"], content)
-        serial = extract_by_patterns(patterns["serial"], content)
-        model = extract_by_patterns(patterns["model"], content)
-        image = extract_by_patterns(patterns["image"], content)
-        image_selected = extract_by_patterns(patterns["image_selected"], content)
-        image_booted = extract_by_patterns(patterns["image_booted"], content)
-        ip_addr = extract_by_patterns(patterns["ip"], content)
-        if ip_addr == "없음":
-            ip_addr = extract_by_patterns(patterns["filename"], f.filename)
-
-        row = {
-            "ip": ip_addr,
-            "hostname": sysname,
-            "serial": serial,
-            "model": model,
-            "image": image,
-            "image_selected": image_selected,
-            "image_booted": image_booted,
-        }
+    # 선택된 항목만 추출해서 반환
+    columns = _selected_columns(
+        include_ip, include_hostname, include_serial, include_model,
+        include_image, include_image_selected, include_image_booted,
+    )
+    async with UploadSpool() as spool:
+        return await _extract_items(await spool.sources(files, exts=None), columns)
 
-        # 선택된 항목만 반환
-        filtered = {}
-        if include_ip:
-            filtered["ip"] = row["ip"]
-        if include_hostname:
-            filtered["hostname"] = row["hostname"]
-        if include_serial:
-            filtered["serial"] = row["serial"]
-        if include_model:
-            filtered["model"] = row["model"]
-        if include_image:
-            filtered["image"] = row["image"]
-        if include_image_selected:
-            filtered["image_selected"] = row["image_selected"]
-        if include_image_booted:
-            filtered["image_booted"] = row["image_booted"]
-        results.append(filtered)
-    return results
 
 @router.post("/extract/excel")
 async def extract_excel(
@@ -135,56 +275,15 @@ async def extract_excel(
     include_image_selected: bool = Form(True),
     include_image_booted: bool = Form(True),
 ):
-    rows = []
-    for f in files:
-        content = (await f.read()).decode("utf-8", errors="ignore")
-        sysname = extract_by_patterns(patterns["sysname"], content)
-        serial = extract_by_patterns(patterns["serial"], content)
-        model = extract_by_patterns(patterns["model"], content)
-        image = extract_by_patterns(patterns["image"], content)
-        image_selected = extract_by_patterns(patterns["image_selected"], content)
-        image_booted = extract_by_patterns(patterns["image_booted"], content)
-        ip_addr = extract_by_patterns(patterns["ip"], content)
-        if ip_addr == "없음":
-            ip_addr = extract_by_patterns(patterns["filename"], f.filename)
-        rows.append({
-            "ip": ip_addr,
-            "hostname": sysname,
-            "serial": serial,
-            "model": model,
-            "image": image,
-            "image_selected": image_selected,
-            "image_booted": image_booted,
-        })
-
-    df = pd.DataFrame(rows)
     # 열 선택: 체크박스에 따라 필터링
-    columns = []
-    if include_ip:
-        columns.append("ip")
-    if include_hostname:
-        columns.append("hostname")
-    if include_serial:
-        columns.append("serial")
-    if include_model:
-        columns.append("model")
-    if include_image:
-        columns.append("image")
-    if include_image_selected:
-        columns.append("image_selected")
-    if include_image_booted:
-        columns.append("image_booted")
-
-    df = df[columns]
-    stream = io.BytesIO()
-    with pd.ExcelWriter(stream, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="extracted")
-    stream.seek(0)
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=extract.xlsx"},
+    columns = _selected_columns(
+        include_ip, include_hostname, include_serial, include_model,
+        include_image, include_image_selected, include_image_booted,
     )
+    async with UploadSpool() as spool:
+        rows = await _extract_items(await spool.sources(files, exts=None), columns)
+    return _excel_response(rows, columns)
+
 
 @router.post("/extract/zip/json")
 async def extract_zip_json(
@@ -197,54 +296,12 @@ async def extract_zip_json(
     include_image_selected: bool = Form(True),
     include_image_booted: bool = Form(True),
 ):
-    data = await zip.read()
-    zf = zipfile.ZipFile(io.BytesIO(data))
-    results = []
-    for name in zf.namelist():
-        if name.endswith("/"):
-            continue
-        lower = name.lower()
-        if not (lower.endswith(".log") or lower.endswith(".txt")):
-            continue
-        content = zf.read(name).decode("utf-8", errors="ignore")
-
-        sysname = extract_by_patterns(patterns["sysname"], content)
-        serial = extract_by_patterns(patterns["serial"], content)
-        model = extract_by_patterns(patterns["model"], content)
-        image = extract_by_patterns(patterns["image"], content)
-        image_selected = extract_by_patterns(patterns["image_selected"], content)
-        image_booted = extract_by_patterns(patterns["image_booted"], content)
-        ip_addr = extract_by_patterns(patterns["ip"], content)
-        if ip_addr == "?�음":
-            ip_addr = extract_by_patterns(patterns["filename"], name.split("/")[-1])
-
-        row = {
-            "ip": ip_addr,
-            "hostname": sysname,
-            "serial": serial,
-            "model": model,
-            "image": image,
-            "image_selected": image_selected,
-            "image_booted": image_booted,
-        }
-
-        filtered = {}
-        if include_ip:
-            filtered["ip"] = row["ip"]
-        if include_hostname:
-            filtered["hostname"] = row["hostname"]
-        if include_serial:
-            filtered["serial"] = row["serial"]
-        if include_model:
-            filtered["model"] = row["model"]
-        if include_image:
-            filtered["image"] = row["image"]
-        if include_image_selected:
-            filtered["image_selected"] = row["image_selected"]
-        if include_image_booted:
-            filtered["image_booted"] = row["image_booted"]
-        results.append(filtered)
-    return results
+    columns = _selected_columns(
+        include_ip, include_hostname, include_serial, include_model,
+        include_image, include_image_selected, include_image_booted,
+    )
+    async with UploadSpool() as spool:
+        return await _extract_items(await spool.sources(zips=[zip]), columns)
 
 
 @router.post("/extract/zip/excel")
@@ -258,63 +315,13 @@ async def extract_zip_excel(
     include_image_selected: bool = Form(True),
     include_image_booted: bool = Form(True),
 ):
-    data = await zip.read()
-    zf = zipfile.ZipFile(io.BytesIO(data))
-    rows = []
-    for name in zf.namelist():
-        if name.endswith("/"):
-            continue
-        lower = name.lower()
-        if not (lower.endswith(".log") or lower.endswith(".txt")):
-            continue
-        content = zf.read(name).decode("utf-8", errors="ignore")
-
-        sysname = extract_by_patterns(patterns["sysname"], content)
-        serial = extract_by_patterns(patterns["serial"], content)
-        model = extract_by_patterns(patterns["model"], content)
-        image = extract_by_patterns(patterns["image"], content)
-        image_selected = extract_by_patterns(patterns["image_selected"], content)
-        image_booted = extract_by_patterns(patterns["image_booted"], content)
-        ip_addr = extract_by_patterns(patterns["ip"], content)
-        if ip_addr == "?�음":
-            ip_addr = extract_by_patterns(patterns["filename"], name.split("/")[-1])
-        rows.append({
-            "ip": ip_addr,
-            "hostname": sysname,
-            "serial": serial,
-            "model": model,
-            "image": image,
-            "image_selected": image_selected,
-            "image_booted": image_booted,
-        })
-
-    df = pd.DataFrame(rows)
-    columns = []
-    if include_ip:
-        columns.append("ip")
-    if include_hostname:
-        columns.append("hostname")
-    if include_serial:
-        columns.append("serial")
-    if include_model:
-        columns.append("model")
-    if include_image:
-        columns.append("image")
-    if include_image_selected:
-        columns.append("image_selected")
-    if include_image_booted:
-        columns.append("image_booted")
-
-    df = df[columns]
-    stream = io.BytesIO()
-    with pd.ExcelWriter(stream, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="extracted")
-    stream.seek(0)
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=extract.xlsx"},
+    columns = _selected_columns(
+        include_ip, include_hostname, include_serial, include_model,
+        include_image, include_image_selected, include_image_booted,
     )
+    async with UploadSpool() as spool:
+        rows = await _extract_items(await spool.sources(zips=[zip]), columns)
+    return _excel_response(rows, columns)
 
 # moved Directory Listing and SecureCRT endpoints to dedicated modules
 
@@ -322,6 +329,7 @@ async def extract_zip_excel(
 # Unified endpoints: accept both raw files and zip(s) in one request
 @router.post("/extract/any/json")
 async def extract_any_json(
+    response: Response,
     files: list[UploadFile] | None = File(None),
     zips: list[UploadFile] | None = File(None),
     include_ip: bool = Form(True),
@@ -331,110 +339,29 @@ async def extract_any_json(
     include_image: bool = Form(True),
     include_image_selected: bool = Form(True),
     include_image_booted: bool = Form(True),
+    directory: str | None = Form(None),
+    paths: list[str] | None = Form(None),
 ):
-    results: list[dict] = []
-
-    # Handle raw files (.log/.txt)
-    if files:
-        for f in files:
-            fname = f.filename or ""
-            lower = fname.lower()
-            if not (lower.endswith(".log") or lower.endswith(".txt")):
-                continue
-            content = (await f.read()).decode("utf-8", errors="ignore")
-
-            sysname = extract_by_patterns(patterns["sysname"], content)
-            serial = extract_by_patterns(patterns["serial"], content)
-            model = extract_by_patterns(patterns["model"], content)
-            image = extract_by_patterns(patterns["image"], content)
-            image_selected = extract_by_patterns(patterns["image_selected"], content)
-            image_booted = extract_by_patterns(patterns["image_booted"], content)
-            ip_addr = extract_by_patterns(patterns["ip"], content)
-            if ip_addr == "?�음":
-                ip_addr = extract_by_patterns(patterns["filename"], fname)
-
-            row = {
-                "ip": ip_addr,
-                "hostname": sysname,
-                "serial": serial,
-                "model": model,
-                "image": image,
-                "image_selected": image_selected,
-                "image_booted": image_booted,
-            }
-
-            filtered: dict = {}
-            if include_ip:
-                filtered["ip"] = row["ip"]
-            if include_hostname:
-                filtered["hostname"] = row["hostname"]
-            if include_serial:
-                filtered["serial"] = row["serial"]
-            if include_model:
-                filtered["model"] = row["model"]
-            if include_image:
-                filtered["image"] = row["image"]
-            if include_image_selected:
-                filtered["image_selected"] = row["image_selected"]
-            if include_image_booted:
-                filtered["image_booted"] = row["image_booted"]
-            results.append(filtered)
-
-    # Handle zip archives (search recursively inside)
-    if zips:
-        for z in zips:
-            data = await z.read()
-            zf = zipfile.ZipFile(io.BytesIO(data))
-            for name in zf.namelist():
-                if name.endswith("/"):
-                    continue
-                lower = name.lower()
-                if not (lower.endswith(".log") or lower.endswith(".txt")):
-                    continue
-                content = zf.read(name).decode("utf-8", errors="ignore")
-
-                sysname = extract_by_patterns(patterns["sysname"], content)
-                serial = extract_by_patterns(patterns["serial"], content)
-                model = extract_by_patterns(patterns["model"], content)
-                image = extract_by_patterns(patterns["image"], content)
-                image_selected = extract_by_patterns(patterns["image_selected"], content)
-                image_booted = extract_by_patterns(patterns["image_booted"], content)
-                ip_addr = extract_by_patterns(patterns["ip"], content)
-                if ip_addr == "?�음":
-                    ip_addr = extract_by_patterns(patterns["filename"], name.split("/")[-1])
-
-                row = {
-                    "ip": ip_addr,
-                    "hostname": sysname,
-                    "serial": serial,
-                    "model": model,
-                    "image": image,
-                    "image_selected": image_selected,
-                    "image_booted": image_booted,
-                }
-
-                filtered: dict = {}
-                if include_ip:
-                    filtered["ip"] = row["ip"]
-                if include_hostname:
-                    filtered["hostname"] = row["hostname"]
-                if include_serial:
-                    filtered["serial"] = row["serial"]
-                if include_model:
-                    filtered["model"] = row["model"]
-                if include_image:
-                    filtered["image"] = row["image"]
-                if include_image_selected:
-                    filtered["image_selected"] = row["image_selected"]
-                if include_image_booted:
-                    filtered["image_booted"] = row["image_booted"]
-                results.append(filtered)
-
+    columns = _selected_columns(
+        include_ip, include_hostname, include_serial, include_model,
+        include_image, include_image_selected, include_image_booted,
+    )
+    # server files named by directory/paths are parsed in place (server_files)
+    try:
+        local = await server_sources(directory, paths)
+    except ValueError as e:
+        return {"error": str(e)}
+    # raw .log/.txt files plus every .log/.txt inside the zip archives
+    async with UploadSpool() as spool:
+        results = await _extract_items(await spool.sources(files, zips) + local, columns)
+    # /extract/any/excel can export these rows by session token
+    attach_session(response, "extract", (columns, results))
     return results
 
 
 @router.post("/extract/any/excel")
 async def extract_any_excel(
+    request: Request,
     files: list[UploadFile] | None = File(None),
     zips: list[UploadFile] | None = File(None),
     include_ip: bool = Form(True),
@@ -444,103 +371,47 @@ async def extract_any_excel(
     include_image: bool = Form(True),
     include_image_selected: bool = Form(True),
     include_image_booted: bool = Form(True),
+    session: str | None = Form(None),
+    background: bool = Form(False),
+    directory: str | None = Form(None),
+    paths: list[str] | None = Form(None),
 ):
-    rows: list[dict] = []
-
-    if files:
-        for f in files:
-            fname = f.filename or ""
-            lower = fname.lower()
-            if not (lower.endswith(".log") or lower.endswith(".txt")):
-                continue
-            content = (await f.read()).decode("utf-8", errors="ignore")
-
-            sysname = extract_by_patterns(patterns["sysname"], content)
-            serial = extract_by_patterns(patterns["serial"], content)
-            model = extract_by_patterns(patterns["model"], content)
-            image = extract_by_patterns(patterns["image"], content)
-            image_selected = extract_by_patterns(patterns["image_selected"], content)
-            image_booted = extract_by_patterns(patterns["image_booted"], content)
-            ip_addr = extract_by_patterns(patterns["ip"], content)
-            if ip_addr == "?�음":
-                ip_addr = extract_by_patterns(patterns["filename"], fname)
-            rows.append({
-                "ip": ip_addr,
-                "hostname": sysname,
-                "serial": serial,
-                "model": model,
-                "image": image,
-                "image_selected": image_selected,
-                "image_booted": image_booted,
-            })
-
-    if zips:
-        for z in zips:
-            data = await z.read()
-            zf = zipfile.ZipFile(io.BytesIO(data))
-            for name in zf.namelist():
-                if name.endswith("/"):
-                    continue
-                lower = name.lower()
-                if not (lower.endswith(".log") or lower.endswith(".txt")):
-                    continue
-                content = zf.read(name).decode("utf-8", errors="ignore")
-
-                sysname = extract_by_patterns(patterns["sysname"], content)
-                serial = extract_by_patterns(patterns["serial"], content)
-                model = extract_by_patterns(patterns["model"], content)
-                image = extract_by_patterns(patterns["image"], content)
-                image_selected = extract_by_patterns(patterns["image_selected"], content)
-                image_booted = extract_by_patterns(patterns["image_booted"], content)
-                ip_addr = extract_by_patterns(patterns["ip"], content)
-                if ip_addr == "?�음":
-                    ip_addr = extract_by_patterns(patterns["filename"], name.split("/")[-1])
-                rows.append({
-                    "ip": ip_addr,
-                    "hostname": sysname,
-                    "serial": serial,
-                    "model": model,
-                    "image": image,
-                    "image_selected": image_selected,
-                    "image_booted": image_booted,
-                })
-
-    df = pd.DataFrame(rows)
-    if df.empty:
-        # return empty excel with headers if nothing found
-        df = pd.DataFrame(columns=[
-            "ip",
-            "hostname",
-            "serial",
-            "model",
-            "image",
-            "image_selected",
-            "image_booted",
-        ])
-
-    columns: list[str] = []
-    if include_ip:
-        columns.append("ip")
-    if include_hostname:
-        columns.append("hostname")
-    if include_serial:
-        columns.append("serial")
-    if include_model:
-        columns.append("model")
-    if include_image:
-        columns.append("image")
-    if include_image_selected:
-        columns.append("image_selected")
-    if include_image_booted:
-        columns.append("image_booted")
-
-    df = df[columns] if columns else df
-    stream = io.BytesIO()
-    with pd.ExcelWriter(stream, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="extracted")
-    stream.seek(0)
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=extract.xlsx"},
+    columns = _selected_columns(
+        include_ip, include_hostname, include_serial, include_model,
+        include_image, include_image_selected, include_image_booted,
     )
+    # no column selected -> export everything
+    columns = columns or OUTPUT_COLUMNS
+    local: list[LogSource] = []
+    if not session and has_server_paths(directory, paths):
+        try:
+            local = await server_sources(directory, paths)
+        except ValueError as e:
+            return {"error": str(e)}
+    if session or not (files or zips or has_server_paths(directory, paths)):
+        state = store.get("extract", session)
+        if state is None:
+            return session_expired()
+        stored_columns, rows = state
+        if not set(columns) <= set(stored_columns):
+            return {"error": "미리보기에서 선택하지 않은 항목이 있습니다. 파일을 다시 업로드하세요."}
+        if background:
+            return submit_job(request, "extract", "extract.xlsx", XLSX_MEDIA_TYPE, partial(_rows_job, rows, columns))
+    elif background:
+        # the spool outlives this request; the job removes it when parsing is done
+        spool = UploadSpool()
+        try:
+            sources = await spool.sources(files, zips) + local
+        except BaseException:
+            spool.close()
+            raise
+        return submit_job(
+            request, "extract", "extract.xlsx", XLSX_MEDIA_TYPE, partial(_extract_job, sources, columns, spool),
+            files_total=len(sources), bytes_total=sum(src.size for src in sources), cleanup=spool.close,
+        )
+    else:
+        async with UploadSpool() as spool:
+            rows = await _extract_items(await spool.sources(files, zips) + local, columns)
+
+    # empty result still yields a sheet with headers
+    return _excel_response(rows, columns)
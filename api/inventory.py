@@ -0,0 +1,237 @@
+"""Persistent sysName -> management IP / model / serial index.
+
+Every log the extract and LLDP routers parse adds what it revealed about its
+own device, and /inventory/load bulk-loads a CSV or workbook (an /extract
+export works as-is). LLDP resolves NeighborIP for neighbors that are not among
+the uploaded files from this index, so a topology loaded once resolves in one
+pass. Non-empty fields overwrite; empty ones never erase a known value. Hosts
+are kept in memory and mirrored to sqlite (NETTOOLS_INVENTORY_DB, by default in
+NETTOOLS_STATE_DIR; "" keeps them in memory only).
+"""
+import csv
+import fnmatch
+import io
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable, NamedTuple
+
+from fastapi import APIRouter, File, Form, UploadFile
+
+from .offload import run_blocking
+from .state import private_file, state_path
+from .xlsx_stream import open_workbook_readonly
+
+router = APIRouter()
+
+INVENTORY_DB = os.getenv("NETTOOLS_INVENTORY_DB", state_path("inventory.sqlite3"))
+# "없음" is what /extract writes for a value it could not find
+EMPTY_VALUES = ("", "없음")
+
+# accepted header names (lowercased, spaces and underscores removed) per field
+COLUMN_ALIASES = {
+    "sysname": ("sysname", "hostname", "host", "name", "devicename"),
+    "ip": ("ip", "mgmtip", "managementip", "ipaddress", "address"),
+    "model": ("model", "modelname", "systemtype"),
+    "serial": ("serial", "serialnumber", "serial#", "sn"),
+}
+
+INVALID_INVENTORY_FILE = {"error": "sysName(또는 hostname) 열이 있는 CSV 또는 엑셀 파일을 올려주세요."}
+
+
+class Host(NamedTuple):
+    sysname: str
+    ip: str = ""
+    model: str = ""
+    serial: str = ""
+    source: str = ""
+    updated_at: float = 0.0
+
+
+def _clean(value) -> str:
+    text = "" if value is None else str(value).strip()
+    return "" if text in EMPTY_VALUES else text
+
+
+class Inventory:
+    def __init__(self, db_path: str | None):
+        self._hosts: dict[str, Host] = {}
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        if db_path:
+            # its IPs end up in every LLDP export; see state for the checks
+            self._db = sqlite3.connect(private_file(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS hosts ("
+                "sysname TEXT PRIMARY KEY, ip TEXT NOT NULL, model TEXT NOT NULL, serial TEXT NOT NULL, "
+                "source TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            for row in self._db.execute("SELECT sysname, ip, model, serial, source, updated_at FROM hosts"):
+                self._hosts[row[0]] = Host(*row)
+
+    def update(self, records: Iterable[tuple], source: str) -> int:
+        """Merge ``(sysname, ip, model, serial)`` records; returns hosts changed."""
+        now = time.time()
+        changed: dict[str, Host] = {}
+        with self._lock:
+            for sysname, ip, model, serial in records:
+                sysname = _clean(sysname)
+                if not sysname:
+                    continue
+                old = changed.get(sysname) or self._hosts.get(sysname) or Host(sysname)
+                new = Host(
+                    sysname,
+                    _clean(ip) or old.ip,
+                    _clean(model) or old.model,
+                    _clean(serial) or old.serial,
+                    source,
+                    now,
+                )
+                if new[:4] != old[:4]:
+                    changed[sysname] = self._hosts[sysname] = new
+            if changed and self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO hosts (sysname, ip, model, serial, source, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    changed.values(),
+                )
+                self._db.commit()
+        return len(changed)
+
+    def get(self, sysname: str) -> Host | None:
+        return self._hosts.get(sysname)
+
+    def ips(self, names: Iterable[str], strip_prefix: str = "") -> dict[str, str]:
+        """Known IPs for ``names``, which may have had ``strip_prefix`` removed."""
+        hosts = self._hosts
+        found: dict[str, str] = {}
+        for name in names:
+            host = (strip_prefix and hosts.get(strip_prefix + name)) or hosts.get(name)
+            if host is not None and host.ip:
+                found[name] = host.ip
+        return found
+
+    def search(self, name_glob: str | None, limit: int) -> tuple[list[Host], int]:
+        with self._lock:
+            hosts = sorted(self._hosts.values())
+        if name_glob and name_glob.strip():
+            match = re.compile(fnmatch.translate(name_glob.strip()), re.IGNORECASE).match
+            hosts = [h for h in hosts if match(h.sysname)]
+        return hosts[:limit], len(hosts)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM hosts")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return {
+            "hosts": len(hosts),
+            "with_ip": sum(1 for h in hosts if h.ip),
+            "with_model": sum(1 for h in hosts if h.model),
+            "with_serial": sum(1 for h in hosts if h.serial),
+            "persistent": self._db is not None,
+        }
+
+
+inventory = Inventory(INVENTORY_DB or None)
+
+
+def _header_key(text) -> str:
+    return re.sub(r"[\s_]+", "", str(text or "")).lower()
+
+
+def _column_map(header: list) -> dict[str, int] | None:
+    keys = [_header_key(h) for h in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for i, key in enumerate(keys):
+            if key in aliases:
+                columns[field] = i
+                break
+    return columns if "sysname" in columns else None
+
+
+def _records(rows: Iterable[list]) -> list[tuple[str, str, str, str]]:
+    rows = iter(rows)
+    columns = None
+    # the header is the first row naming a sysName column
+    for row in rows:
+        columns = _column_map(list(row))
+        if columns is not None:
+            break
+    if columns is None:
+        raise ValueError("no sysname column")
+
+    def cell(row, field):
+        i = columns.get(field)
+        return row[i] if i is not None and i < len(row) else ""
+
+    return [
+        (cell(row, "sysname"), cell(row, "ip"), cell(row, "model"), cell(row, "serial"))
+        for row in rows
+    ]
+
+
+def load_file(data: bytes, filename: str) -> list[tuple[str, str, str, str]]:
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        wb = open_workbook_readonly(data)
+        try:
+            return _records(list(r) for r in wb.worksheets[0].iter_rows(values_only=True))
+        finally:
+            wb.close()
+    text = data.decode("utf-8-sig", errors="ignore")
+    first = text.split("\n", 1)[0]
+    delimiter = "\t" if "\t" in first else (";" if first.count(";") > first.count(",") else ",")
+    return _records(csv.reader(io.StringIO(text), delimiter=delimiter))
+
+
+def _host_dict(host: Host) -> dict:
+    return host._asdict()
+
+
+@router.get("/inventory")
+async def inventory_list(name_glob: str | None = None, limit: int = 1000):
+    hosts, total = inventory.search(name_glob, max(0, limit))
+    return {"items": [_host_dict(h) for h in hosts], "total": total}
+
+
+@router.get("/inventory/stats")
+async def inventory_stats():
+    return inventory.stats()
+
+
+@router.post("/inventory/query")
+async def inventory_query(names: str = Form(...), strip_prefix: str = Form("")):
+    # newline/comma/whitespace separated sysNames; unknown names map to null
+    result = {}
+    for name in (n for n in re.split(r"[\s,;]+", names) if n):
+        host = (strip_prefix and inventory.get(strip_prefix + name)) or inventory.get(name)
+        result[name] = None if host is None else _host_dict(host)
+    return result
+
+
+@router.post("/inventory/load")
+async def inventory_load(file: UploadFile = File(...), replace: bool = Form(False)):
+    data = await file.read()
+    try:
+        records = await run_blocking(load_file, data, file.filename or "")
+    except Exception:
+        return INVALID_INVENTORY_FILE
+    if replace:
+        await run_blocking(inventory.clear)
+    changed = await run_blocking(inventory.update, records, "load")
+    return {"rows": len(records), "changed": changed, **inventory.stats()}
+
+
+@router.post("/inventory/clear")
+async def inventory_clear():
+    await run_blocking(inventory.clear)
+    return inventory.stats()
@@ -0,0 +1,132 @@
+"""Address ranges kept as merged integer intervals and expanded lazily.
+
+``AddressRanges`` knows its size without materialising anything, so request
+limits are checked before a single address string exists. IPv4 addresses are
+formatted straight from the integer; IPv6 goes through ``ipaddress``.
+"""
+import ipaddress
+import os
+import re
+from typing import Iterator
+
+# upper bound on the addresses one request may expand to
+MAX_ADDRESSES = int(os.getenv("NETTOOLS_IPRANGE_MAX", "65536"))
+
+_SPLIT_RE = re.compile(r"[\s,;]+")
+_DASH_RE = re.compile(r"\s*-\s*")
+
+
+def _v4(n: int) -> str:
+    return f"{n >> 24}.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+def _address(text: str) -> ipaddress.IPv4Address | ipaddress.IPv6Address:
+    try:
+        return ipaddress.ip_address(text.strip())
+    except ValueError:
+        raise ValueError(f"잘못된 IP 주소입니다: {text}") from None
+
+
+def _merge(intervals: list[tuple[int, int, int]]) -> list[tuple[int, int, int]]:
+    merged: list[tuple[int, int, int]] = []
+    for version, start, end in sorted(intervals):
+        if merged and merged[-1][0] == version and start <= merged[-1][2] + 1:
+            if end > merged[-1][2]:
+                merged[-1] = (version, merged[-1][1], end)
+        else:
+            merged.append((version, start, end))
+    return merged
+
+
+class AddressRanges:
+    """Sorted, non-overlapping ``(version, start, end)`` intervals (inclusive)."""
+
+    def __init__(self, intervals: list[tuple[int, int, int]] | None = None):
+        self.intervals = _merge(intervals or [])
+
+    @classmethod
+    def between(cls, start_ip: str, end_ip: str) -> "AddressRanges":
+        start, end = _address(start_ip), _address(end_ip)
+        if start.version != end.version:
+            raise ValueError("시작 IP와 종료 IP의 버전이 다릅니다.")
+        lo, hi = sorted((int(start), int(end)))
+        return cls([(start.version, lo, hi)])
+
+    @classmethod
+    def parse(cls, text: str) -> "AddressRanges":
+        """Comma/whitespace separated CIDRs, ``a-b`` ranges and single addresses."""
+        intervals: list[tuple[int, int, int]] = []
+        for token in _SPLIT_RE.split(_DASH_RE.sub("-", text.strip())):
+            if not token:
+                continue
+            if "/" in token:
+                try:
+                    net = ipaddress.ip_network(token, strict=False)
+                except ValueError:
+                    raise ValueError(f"잘못된 CIDR입니다: {token}") from None
+                intervals.append((net.version, int(net.network_address), int(net.broadcast_address)))
+            elif "-" in token:
+                start, _, end = token.partition("-")
+                intervals.extend(cls.between(start, end).intervals)
+            else:
+                addr = _address(token)
+                intervals.append((addr.version, int(addr), int(addr)))
+        return cls(intervals)
+
+    def exclude(self, other: "AddressRanges") -> "AddressRanges":
+        out: list[tuple[int, int, int]] = []
+        cuts = other.intervals
+        j = 0
+        for version, start, end in self.intervals:
+            # both lists are sorted by (version, start): skip cuts that end before us
+            while j < len(cuts) and (cuts[j][0], cuts[j][2]) < (version, start):
+                j += 1
+            k = j
+            while k < len(cuts) and cuts[k][0] == version and cuts[k][1] <= end:
+                if cuts[k][1] > start:
+                    out.append((version, start, cuts[k][1] - 1))
+                start = max(start, cuts[k][2] + 1)
+                k += 1
+            if start <= end:
+                out.append((version, start, end))
+        return AddressRanges(out)
+
+    @property
+    def count(self) -> int:
+        return sum(end - start + 1 for _version, start, end in self.intervals)
+
+    def check_limit(self, limit: int = MAX_ADDRESSES) -> int:
+        count = self.count
+        if count == 0:
+            raise ValueError("생성할 IP가 없습니다.")
+        if count > limit:
+            raise ValueError(f"IP 개수({count})가 최대 {limit}개를 초과합니다.")
+        return count
+
+    def __iter__(self) -> Iterator[str]:
+        for version, start, end in self.intervals:
+            if version == 4:
+                yield from map(_v4, range(start, end + 1))
+            else:
+                for n in range(start, end + 1):
+                    yield str(ipaddress.IPv6Address(n))
+
+
+def address_ranges(
+    start_ip: str | None = None,
+    end_ip: str | None = None,
+    ranges: str | None = None,
+    exclude: str | None = None,
+) -> AddressRanges:
+    """Build the request's address set; raises ValueError with a user message."""
+    start_ip, end_ip = (start_ip or "").strip(), (end_ip or "").strip()
+    if bool(start_ip) != bool(end_ip):
+        raise ValueError("시작 IP와 종료 IP를 모두 입력하세요.")
+    result = AddressRanges.parse(ranges or "")
+    if start_ip:
+        result = AddressRanges(result.intervals + AddressRanges.between(start_ip, end_ip).intervals)
+    if not result.intervals:
+        raise ValueError("시작/종료 IP 또는 IP 대역을 입력하세요.")
+    if exclude and exclude.strip():
+        result = result.exclude(AddressRanges.parse(exclude))
+    return result
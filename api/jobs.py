@@ -0,0 +1,363 @@
+"""In-process background jobs for exports that outlive a proxy timeout.
+
+Export endpoints accept ``background=true``. The uploads are spooled, the
+request returns 202 with a job id, and a fixed number of worker tasks on the
+event loop work through an ``asyncio.Queue``, so no external broker is needed.
+Progress (files and bytes done, ETA) can be polled at GET /jobs/{id} or
+followed as server-sent events at /jobs/{id}/events. Finished files stay in
+NETTOOLS_JOB_DIR for NETTOOLS_JOB_TTL seconds. A user (X-NetTools-User, or the
+client address) may have NETTOOLS_JOBS_PER_USER jobs queued or running at once.
+Jobs live in memory; a restart drops them and their leftover files are removed
+once they are older than the TTL.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import secrets
+import tempfile
+import time
+from typing import AsyncIterator, Awaitable, Callable, Iterable
+
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+
+from .metrics import RequestMetrics, activate, span
+from .offload import run_blocking
+
+router = APIRouter()
+
+JOB_DIR = os.getenv("NETTOOLS_JOB_DIR") or os.path.join(tempfile.gettempdir(), "nettools-jobs")
+JOB_TTL = int(os.getenv("NETTOOLS_JOB_TTL", "3600"))
+JOB_WORKERS = int(os.getenv("NETTOOLS_JOB_WORKERS", "2"))
+JOBS_PER_USER = int(os.getenv("NETTOOLS_JOBS_PER_USER", "2"))
+EVENT_INTERVAL = 0.5
+
+USER_HEADER = "X-NetTools-User"
+
+JOB_NOT_FOUND = {"error": "작업이 없거나 보관 기간이 지났습니다."}
+JOB_NOT_READY = {"error": "작업이 아직 끝나지 않았습니다."}
+TOO_MANY_JOBS = {"error": "진행 중인 작업이 너무 많습니다. 앞선 작업이 끝난 뒤 다시 시도하세요."}
+
+# work(job) -> the artifact's bytes, produced lazily on the blocking pool
+JobWork = Callable[["Job"], Awaitable[Iterable[bytes]]]
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, owner: str, kind: str, filename: str, media_type: str, work: JobWork,
+                 files_total: int, bytes_total: int, cleanup: Callable[[], None] | None):
+        self.id = secrets.token_urlsafe(16)
+        self.owner = owner
+        self.kind = kind
+        self.filename = filename
+        self.media_type = media_type
+        self.path = os.path.join(JOB_DIR, self.id + (os.path.splitext(filename)[1] or ".bin"))
+        self.work: JobWork | None = work
+        self.cleanup = cleanup
+        self.state = "queued"  # queued, running, done, failed, cancelled
+        self.phase = ""  # parse, write
+        self.files_total = files_total
+        self.files_done = 0
+        self.bytes_total = bytes_total
+        self.bytes_done = 0
+        self.size = 0
+        self.error: str | None = None
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.cancel_requested = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed", "cancelled")
+
+    def advance(self, files: int, nbytes: int) -> None:
+        # called from the loop and from pool threads; lost updates only skew the ETA
+        self.files_done += files
+        self.bytes_done += nbytes
+
+    def eta(self) -> float | None:
+        if self.state != "running" or self.started_at is None:
+            return None
+        done, total = (self.bytes_done, self.bytes_total) if self.bytes_total else (self.files_done, self.files_total)
+        if not done or not total:
+            return None
+        elapsed = time.time() - self.started_at
+        return max(0.0, elapsed * (total - done) / done)
+
+    def status(self) -> dict:
+        eta = self.eta()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.state,
+            "phase": self.phase,
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "bytes_total": self.bytes_total,
+            "bytes_done": self.bytes_done,
+            "eta_seconds": None if eta is None else round(eta, 1),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "expires_at": None if self.finished_at is None else self.finished_at + JOB_TTL,
+            "error": self.error,
+            "filename": self.filename,
+            "size": self.size,
+            "download": f"/jobs/{self.id}/download" if self.state == "done" else None,
+        }
+
+
+def _write_artifact(job: Job, chunks: Iterable[bytes], path: str) -> None:
+    with open(path, "wb") as out:
+        for chunk in chunks:
+            if job.cancel_requested:
+                raise JobCancelled()
+            out.write(chunk)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class JobQueue:
+    def __init__(self, workers: int, per_user: int, ttl: int, directory: str):
+        self.workers = workers
+        self.per_user = per_user
+        self.ttl = ttl
+        self.directory = directory
+        self._jobs: dict[str, Job] = {}
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._stale_removed = False
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if not self._stale_removed:
+            self._stale_removed = True
+            self._remove_stale_files()
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        # a fresh context: the workers must not inherit the submitting request's metrics
+        self._tasks = [
+            loop.create_task(self._worker(), context=contextvars.Context()) for _ in range(max(1, self.workers))
+        ]
+
+    def _remove_stale_files(self) -> None:
+        # artifacts of a previous run; their jobs are gone with that process
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    _remove(entry.path)
+            except OSError:
+                pass
+
+    def submit(self, owner: str, kind: str, filename: str, media_type: str, work: JobWork,
+               files_total: int = 0, bytes_total: int = 0,
+               cleanup: Callable[[], None] | None = None) -> Job | None:
+        """Queue ``work``; None when ``owner`` already has ``per_user`` active jobs."""
+        self._purge()
+        active = sum(1 for job in self._jobs.values() if job.owner == owner and not job.finished)
+        if active >= self.per_user:
+            return None
+        self._ensure_workers()
+        job = Job(owner, kind, filename, media_type, work, files_total, bytes_total, cleanup)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        self._purge()
+        return self._jobs.get(job_id)
+
+    def list(self, owner: str) -> list[Job]:
+        self._purge()
+        return [job for job in self._jobs.values() if job.owner == owner]
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self._jobs.get(job_id)
+        if job is None or job.finished:
+            return job
+        job.cancel_requested = True
+        if job._task is not None:
+            job._task.cancel()
+        else:
+            self._finish(job, "cancelled")
+        return job
+
+    def remove(self, job_id: str) -> Job | None:
+        job = self.cancel(job_id)
+        if job is not None and job.finished:
+            self._jobs.pop(job_id, None)
+            _remove(job.path)
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            if job.state != "queued":
+                continue
+            job._task = asyncio.create_task(self._run(job))
+            # wait() leaves the job running if this worker is cancelled, and a
+            # cancelled job does not take the worker down with it
+            await asyncio.wait([job._task])
+
+    async def _run(self, job: Job) -> None:
+        job.state = "running"
+        job.started_at = time.time()
+        job.phase = "parse"
+        part = job.path + ".part"
+        metrics = RequestMetrics(f"job:{job.kind}")
+        activate(metrics)
+        try:
+            chunks = await job.work(job)
+            job.phase = "write"
+            with span("write"):
+                await run_blocking(_write_artifact, job, chunks, part)
+            os.replace(part, job.path)
+            job.size = os.path.getsize(job.path)
+            self._finish(job, "done")
+        except (asyncio.CancelledError, JobCancelled):
+            self._finish(job, "cancelled")
+        except Exception as exc:
+            job.error = f"작업 중 오류가 발생했습니다: {exc or type(exc).__name__}"
+            self._finish(job, "failed")
+        finally:
+            _remove(part)
+            metrics.finish()
+
+    def _finish(self, job: Job, state: str) -> None:
+        job.state = state
+        job.finished_at = time.time()
+        # uploads and parsed rows are no longer needed
+        job.work = None
+        if job.cleanup is not None:
+            job.cleanup()
+            job.cleanup = None
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.finished_at < cutoff:
+                del self._jobs[job_id]
+                _remove(job.path)
+
+    def shutdown(self) -> None:
+        for job in self._jobs.values():
+            if not job.finished:
+                job.cancel_requested = True
+                if job._task is not None:
+                    job._task.cancel()
+                else:
+                    self._finish(job, "cancelled")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._loop = None
+        self._queue = None
+
+    def stats(self) -> dict:
+        self._purge()
+        states: dict[str, int] = {}
+        for job in self._jobs.values():
+            states[job.state] = states.get(job.state, 0) + 1
+        return {"workers": self.workers, "per_user": self.per_user, "ttl_seconds": self.ttl, "jobs": states}
+
+
+jobs = JobQueue(JOB_WORKERS, JOBS_PER_USER, JOB_TTL, JOB_DIR)
+
+
+def shutdown_jobs() -> None:
+    jobs.shutdown()
+
+
+def job_owner(request: Request) -> str:
+    return request.headers.get(USER_HEADER) or (request.client.host if request.client else "") or "anonymous"
+
+
+def submit_job(
+    request: Request,
+    kind: str,
+    filename: str,
+    media_type: str,
+    work: JobWork,
+    files_total: int = 0,
+    bytes_total: int = 0,
+    cleanup: Callable[[], None] | None = None,
+) -> JSONResponse:
+    """Queue an export and answer 202 with its status (429 over the user's cap)."""
+    job = jobs.submit(job_owner(request), kind, filename, media_type, work, files_total, bytes_total, cleanup)
+    if job is None:
+        if cleanup is not None:
+            cleanup()
+        return JSONResponse(TOO_MANY_JOBS, status_code=429)
+    return JSONResponse(job.status(), status_code=202, headers={"Location": f"/jobs/{job.id}"})
+
+
+@router.get("/jobs")
+async def list_jobs(request: Request):
+    return [job.status() for job in jobs.list(job_owner(request))]
+
+
+@router.get("/jobs/stats")
+async def job_stats():
+    return jobs.stats()
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(JOB_NOT_FOUND, status_code=404)
+    return job.status()
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    async def events() -> AsyncIterator[str]:
+        while True:
+            job = jobs.get(job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps(JOB_NOT_FOUND, ensure_ascii=False)}\n\n"
+                return
+            yield f"data: {json.dumps(job.status(), ensure_ascii=False)}\n\n"
+            if job.finished:
+                return
+            await asyncio.sleep(EVENT_INTERVAL)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/jobs/{job_id}/download")
+async def job_download(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        return JSONResponse(JOB_NOT_FOUND, status_code=404)
+    if job.state != "done":
+        return JSONResponse({**JOB_NOT_READY, "status": job.state}, status_code=409)
+    return FileResponse(job.path, media_type=job.media_type, filename=job.filename)
+
+
+@router.delete("/jobs/{job_id}")
+async def job_delete(job_id: str):
+    job = jobs.remove(job_id)
+    if job is None:
+        return JSONResponse(JOB_NOT_FOUND, status_code=404)
+    return job.status()
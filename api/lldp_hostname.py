@@ -1,23 +1,28 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Form, Request, Response
 from typing import List
-import io
-import os
 import re
+from itertools import islice
+import numpy as np
 import pandas as pd
 from openpyxl import Workbook
-import zipfile
+from contextlib import ExitStack
+from functools import partial
+
+from .archive import LogSource, UploadSpool
+from .inventory import inventory
+from .jobs import submit_job
+from .metrics import span
+from .name_filter import NameFilter
+from .offload import run_blocking
+from .parse_cache import cached_map, pattern_fingerprint
+from .server_files import has_server_paths, server_sources
+from .sessions import attach_session, session_expired, store
+from .vendor_parsers import as_bytes, detect, registry_fingerprint, text
+from .xlsx_stream import XLSX_MEDIA_TYPE, stream_xlsx, xlsx_response
 
 router = APIRouter()
 
 
-SYSNAME_PATTERNS = [
-    re.compile(r"SysName\s*:\s*(.+)"),
-    re.compile(r'sysName\s+"(\S+)"'),
-    # e.g., "HOSTNAME # show lldp neighbors"
-    re.compile(r'^(\w[\w.\-]*)\s*#\s*show\s+lldp\s+neighbors', re.MULTILINE),
-]
-
 # Month word detector to filter bogus NeighborName containing date-like tokens
 MONTH_WORD_RE = re.compile(
     r"(?i)\b(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|"
@@ -35,6 +40,9 @@ IP_PATTERNS: list[re.Pattern] = [
 ]
 FILENAME_IP_RE = re.compile(r"^(\d{1,3}(?:\.\d{1,3}){3})_")
 
+# cache key component; bump the leading number when _scan_files logic changes
+PARSER_VERSION = "6-" + pattern_fingerprint(MONTH_WORD_RE, IP_PATTERNS, FILENAME_IP_RE, registry_fingerprint())
+
 
 def natural_sort_key(text: str):
     parts = re.split(r"(\d+)", text)
@@ -47,46 +55,32 @@ def natural_sort_key(text: str):
     return key
 
 
-def _extract_by_patterns(patterns: List[re.Pattern], content: str) -> str | None:
+def _extract_by_patterns(patterns: List[re.Pattern], content) -> str | None:
+    # content is str, or a raw log buffer searched with the bytes patterns
+    raw = not isinstance(content, str)
     for pat in patterns:
-        m = pat.search(content)
+        m = (as_bytes(pat) if raw else pat).search(content)
         if m:
-            return m.group(1).strip()
+            return text(m.group(1)).strip()
     return None
 
 
-def _compile_patterns(pattern_text: str | None) -> List[re.Pattern]:
-    if not pattern_text:
-        return []
-    # support newline/comma separated, allow wildcard '*'
-    raw_items = [x.strip() for x in re.split(r"[\n,]", pattern_text) if x.strip()]
-    patterns: List[re.Pattern] = []
-    for item in raw_items:
-        # convert shell-like * to .*
-        esc = item
-        esc = esc.replace("*", ".*")
-        try:
-            patterns.append(re.compile(esc))
-        except re.error:
-            # fallback to literal search
-            patterns.append(re.compile(re.escape(item)))
-    return patterns
+def _compile_patterns(pattern_text: str | None) -> NameFilter:
+    # support newline/comma separated, allow wildcard '*'; see name_filter
+    return NameFilter(pattern_text)
 
 
-def _match_any(text: str, patterns: List[re.Pattern], exact: bool = False) -> bool:
-    if not patterns:
-        # if no filter provided, accept all
-        return True
-    if exact:
-        return any(p.fullmatch(text) for p in patterns)
-    return any(p.search(text) for p in patterns)
+def _match_any(text: str, patterns: NameFilter, exact: bool = False) -> bool:
+    # an empty filter accepts all
+    return patterns.match(text, exact)
 
 
-def _extract_ip(content: str, filename: str | None = None) -> str:
+def _extract_ip(content, filename: str | None = None) -> str:
+    raw = not isinstance(content, str)
     for pat in IP_PATTERNS:
-        m = pat.search(content)
+        m = (as_bytes(pat) if raw else pat).search(content)
         if m:
-            return m.group(1).strip()
+            return text(m.group(1)).strip()
     if filename:
         m = FILENAME_IP_RE.search(filename)
         if m:
@@ -94,202 +88,262 @@ def _extract_ip(content: str, filename: str | None = None) -> str:
     return ""
 
 
+def _filename_ip(source: LogSource) -> str:
+    # _extract_ip falls back to the filename, so it is part of the cache key
+    m = FILENAME_IP_RE.search(source.filename)
+    return m.group(1) if m else ""
+
+
 def _normalize_name(name: str, strip_prefix: str) -> str:
     if strip_prefix and name.startswith(strip_prefix):
         return name[len(strip_prefix):]
     return name
 
 
-def _parse_one(content: str, neighbor_patterns: List[re.Pattern], strip_prefix: str, filename: str | None = None, host_ip_map: dict[str, str] | None = None, exact_match: bool = False) -> list[list[str]]:
-    rows: list[list[str]] = []
-    sysname_full = _extract_by_patterns(SYSNAME_PATTERNS, content) or ""
-    if not sysname_full:
-        return rows
+PORT_NUMBER_RE = re.compile(r'/(\d+)')
+# neighbor names that are table noise, compared stripped and lowercased
+IGNORED_NEIGHBORS = ["not-advertised", "sep", "up"]
+
+
+def _neighbor_tables(tables: list[list[tuple[str, str, str, str]]], sysnames: list[str], ips: list[str], neighbor_patterns: NameFilter, strip_prefix: str, host_ip_map: dict[str, str] | None = None, exact_match: bool = False) -> list[list[list[str]]]:
+    """Neighbor rows for several files at once, one list of rows per file.
+
+    ``tables`` holds each file's LLDP table matches (its vendor's lldp_line_re). The rows are split into
+    columns and factorized: the pattern filter, prefix strip, noise/month-word
+    rejection and NeighborIP lookup run once per distinct neighbor name, port
+    numbers once per distinct port id, and the results are taken back to rows
+    with array indexing. Row order within a file is kept.
+    """
+    counts = [len(t) for t in tables]
+    if not any(counts):
+        return [[] for _ in tables]
+    table = np.array([row for table in tables for row in table], dtype=object)
+    ports, port_ids, neighbors = table[:, 0], table[:, 2], table[:, 3]
+
+    name_codes, names = pd.factorize(neighbors)
+    names = pd.Series(names, dtype=object)
+    keep_name = np.ones(len(names), dtype=bool)
+    if neighbor_patterns:
+        keep_name &= neighbor_patterns.mask(names, exact_match)
+    if strip_prefix:
+        prefixed = names.str.startswith(strip_prefix).to_numpy(dtype=bool)
+        names = names.where(~prefixed, names.str.slice(len(strip_prefix)))
+    keep_name &= ~names.str.strip().str.lower().isin(IGNORED_NEIGHBORS).to_numpy(dtype=bool)
+    keep_name &= ~names.str.contains(MONTH_WORD_RE).to_numpy(dtype=bool)
+    name_ips = names.map(host_ip_map).fillna("") if host_ip_map else pd.Series("", index=names.index, dtype=object)
+
+    keep = keep_name[name_codes]
+    name_codes = name_codes[keep]
+    port_codes, port_uniques = pd.factorize(port_ids[keep])
+    port_ids = pd.Series(port_uniques, dtype=object)
+    port_nums = "P" + port_ids.str.extract(PORT_NUMBER_RE, expand=False).fillna(port_ids)
+
+    columns = zip(
+        ("P" + ports[keep]).tolist(),
+        names.to_numpy()[name_codes].tolist(),
+        port_nums.to_numpy()[port_codes].tolist(),
+        name_ips.to_numpy()[name_codes].tolist(),
+    )
+    kept = np.bincount(np.repeat(np.arange(len(tables)), counts)[keep], minlength=len(tables))
+    return [
+        [[sysname_out, port, name, port_num, neighbor_ip, ip_addr] for port, name, port_num, neighbor_ip in islice(columns, n)]
+        for sysname_out, ip_addr, n in zip(sysnames, ips, kept.tolist())
+    ]
+
+
+def _scan_files(neighbor_patterns: NameFilter, strip_prefix: str, exact_match: bool, sources: list[LogSource]) -> list[tuple[str, str, list[list[str]], str]]:
+    # Runs in the parse pool on a chunk of files: each file yields its sysName,
+    # its own IP and its neighbor table, then the neighbor rows of the whole
+    # chunk are filtered together. NeighborIP needs every file's sysName, so it
+    # is filled in afterwards by _resolve_rows. The raw sysName comes last
+    # for the inventory.
+    heads: list[tuple[str, str, str]] = []
+    tables: list[list[tuple[str, str, str, str]]] = []
+    for source in sources:
+        # the raw log (mmapped, not decoded); only the captures are decoded
+        with ExitStack() as stack:
+            try:
+                content = stack.enter_context(source.buffer())
+            except Exception:
+                # unreadable zip member: skip it like before
+                content = b""
+            vendor = detect(content)
+            sysname = _extract_by_patterns(vendor.lldp_sysname_patterns(), content)
+            if not sysname:
+                heads.append(("", "", ""))
+                tables.append([])
+                continue
+            heads.append((_normalize_name(sysname, strip_prefix), _extract_ip(content, source.filename), sysname))
+            tables.append([
+                tuple(field.decode("utf-8", errors="ignore") for field in fields)
+                for fields in as_bytes(vendor.lldp_line_re()).findall(content)
+            ])
+    rows = _neighbor_tables(
+        tables, [h[0] for h in heads], [h[1] for h in heads], neighbor_patterns, strip_prefix, None, exact_match
+    )
+    return [(sys_out, ip_addr, file_rows, sysname) for (sys_out, ip_addr, sysname), file_rows in zip(heads, rows)]
 
-    # Do not filter by local sysName; pattern applies to neighbor names only
 
-    sysname_out = _normalize_name(sysname_full, strip_prefix)
+def _resolve_rows(scanned: list[tuple[str, str, list[list[str]], str]], strip_prefix: str = "", use_inventory: bool = False) -> list[list[str]]:
+    # host->ip map from all files, later files win (same as the serial loop)
+    host_ip_map: dict[str, str] = {}
+    for sys_out, ip_addr, _rows, _sysname in scanned:
+        if sys_out and ip_addr:
+            host_ip_map[sys_out] = ip_addr
+    if use_inventory:
+        # neighbors that are not among the uploaded files
+        missing = {row[2] for _s, _ip, rows, _n in scanned for row in rows if row[2] not in host_ip_map}
+        known = inventory.ips(missing, strip_prefix)
+        inventory.update(((sysname, ip_addr, "", "") for _s, ip_addr, _rows, sysname in scanned), "lldp")
+        host_ip_map = {**known, **host_ip_map}
 
-    # LLDP table line format (flexible):
-    # port   mac           port-id      ...  neighbor
-    # Optional timestamp prefix like: [YYYY/MM/DD HH:MM:SS]
-    # capture: (port_num)(mac)(port_id_raw)(neighbor)
-    lldp_lines = re.findall(
-        r'^(?:\[[^\]]+\]\s*)?\s*(\d+)\s+(\S+)\s+(\S+)\s+\S+\s+\S+\s+(\S+)',
-        content,
-        re.MULTILINE,
+    all_rows: list[list[str]] = []
+    for sys_out, ip_addr, rows, _sysname in scanned:
+        local_ip = host_ip_map.get(sys_out) or ip_addr
+        for row in rows:
+            row[4] = host_ip_map.get(row[2], "")
+            row[5] = local_ip
+            all_rows.append(row)
+    return all_rows
+
+
+async def _lldp_rows(collected: list[LogSource], neighbor_patterns: NameFilter, strip_prefix: str, exact_match: bool, progress=None, use_inventory: bool = True) -> list[list[str]]:
+    params = repr((PARSER_VERSION, neighbor_patterns.items, strip_prefix, exact_match))
+    scanned = await cached_map(
+        "lldp",
+        params,
+        partial(_scan_files, neighbor_patterns, strip_prefix, exact_match),
+        collected,
+        progress,
+        batched=True,
+        variant=_filename_ip,
     )
-    # local device IP
-    ip_addr = (host_ip_map or {}).get(sysname_out) or _extract_ip(content, filename)
-    for port_num, mac, port_id_raw, neighbor_full in lldp_lines:
-        if not _match_any(neighbor_full, neighbor_patterns, exact=exact_match):
-            continue
-        neighbor_name = _normalize_name(neighbor_full, strip_prefix)
-        # filter out unwanted neighbor names
-        low = neighbor_name.strip().lower()
-        if low in {"not-advertised", "sep", "up"}:
-            continue
-        if MONTH_WORD_RE.search(neighbor_name):
-            continue
-
-        c_match = re.search(r'/(\d+)', port_id_raw)
-        c = c_match.group(1) if c_match else port_id_raw
-        neighbor_ip = (host_ip_map or {}).get(neighbor_name, "")
-        rows.append([sysname_out, f'P{port_num}', neighbor_name, f'P{c}', neighbor_ip, ip_addr])
-    return rows
+    return await run_blocking(_resolve_rows, scanned, strip_prefix, use_inventory)
+
+
+def _preview_records(all_rows: list[list[str]]) -> list[dict]:
+    if not all_rows:
+        return []
+
+    df = pd.DataFrame(all_rows, columns=["sysName", "Port", "NeighborName", "NeighborPort", "NeighborIP", "ip"])  
+    df_sorted = df.sort_values(by=["sysName"], key=lambda s: s.map(natural_sort_key))
+    return df_sorted.to_dict(orient="records")
+
+
+def _excel_rows(all_rows: list[list[str]]) -> list[list[str]]:
+    df = pd.DataFrame(all_rows, columns=["sysName", "Port", "NeighborName", "NeighborPort", "NeighborIP", "ip"]) if all_rows else pd.DataFrame(columns=["sysName", "Port", "NeighborName", "NeighborPort", "NeighborIP", "ip"])
+    df_sorted = df.sort_values(by=["sysName"], key=lambda s: s.map(natural_sort_key)) if not df.empty else df
+
+    # insert blank line between groups of sysName
+    final_rows: list[list[str]] = []
+    prev = None
+    for row in df_sorted.itertuples(index=False):
+        current = row.sysName
+        if prev is not None and current != prev:
+            final_rows.append(["", "", "", "", "", ""]) 
+        final_rows.append(list(row))
+        prev = current
+    return final_rows
+
+
+LLDP_COLUMNS = ["sysName", "Port", "NeighborName", "NeighborPort", "NeighborIP", "ip"]
+
+
+async def _lldp_job(all_rows: list[list[str]] | None, collected: list[LogSource], spool: UploadSpool | None,
+                    neighbor_patterns: NameFilter, strip_prefix: str, exact_match: bool, use_inventory: bool, job):
+    if all_rows is None:
+        try:
+            all_rows = await _lldp_rows(collected, neighbor_patterns, strip_prefix, exact_match, job.advance, use_inventory)
+        finally:
+            spool.close()
+    with span("dataframe"):
+        final_rows = await run_blocking(_excel_rows, all_rows)
+    return stream_xlsx([("Sheet1", LLDP_COLUMNS, final_rows)])
 
 
 @router.post("/lldp/hostname/preview")
 async def lldp_hostname_preview(
+    response: Response,
     files: List[UploadFile] | None = File(None),
     zips: List[UploadFile] | None = File(None),
     pattern: str = Form(""),
     strip_prefix: str = Form(""),
     include_description: bool = Form(False),  # reserved, not used currently
+    use_inventory: bool = Form(True),
+    directory: str | None = Form(None),
+    paths: List[str] | None = Form(None),
 ):
     # Checkbox repurposed: include_description = True -> filter by pattern, False -> include all
     # include_description True -> exact match only, False -> contains match
     neighbor_patterns = _compile_patterns(pattern)
     exact_match = bool(include_description)
-    all_rows: list[list[str]] = []
-
-    # collect all contents once for host-ip map and parsing reuse
-    collected: list[tuple[str, str]] = []  # (filename, content)
-    if files:
-        for f in files:
-            fname = f.filename or ""
-            lower = fname.lower()
-            if not (lower.endswith(".log") or lower.endswith(".txt")):
-                continue
-            content = (await f.read()).decode("utf-8", errors="ignore")
-            collected.append((fname, content))
-
-    if zips:
-        for z in zips:
-            data = await z.read()
-            try:
-                zf = zipfile.ZipFile(io.BytesIO(data))
-            except zipfile.BadZipFile:
-                continue
-            for name in zf.namelist():
-                if name.endswith("/"):
-                    continue
-                lower = name.lower()
-                if not (lower.endswith(".log") or lower.endswith(".txt")):
-                    continue
-                try:
-                    content = zf.read(name).decode("utf-8", errors="ignore")
-                except Exception:
-                    continue
-                collected.append((os.path.basename(name), content))
-
-    # build host->ip map from all collected contents
-    host_ip_map: dict[str, str] = {}
-    for fname, content in collected:
-        sysname = _extract_by_patterns(SYSNAME_PATTERNS, content)
-        if not sysname:
-            continue
-        sys_out = _normalize_name(sysname, strip_prefix)
-        ip_addr = _extract_ip(content, fname)
-        if ip_addr:
-            host_ip_map[sys_out] = ip_addr
-
-    # now parse lldp
-    for fname, content in collected:
-        rows = _parse_one(content, neighbor_patterns, strip_prefix, fname, host_ip_map, exact_match)
-        if rows:
-            all_rows.extend(rows)
-
-    if not all_rows:
-        return []
-
-    df = pd.DataFrame(all_rows, columns=["sysName", "Port", "NeighborName", "NeighborPort", "NeighborIP", "ip"])  
-    df_sorted = df.sort_values(by=["sysName"], key=lambda s: s.map(natural_sort_key))
-    return df_sorted.to_dict(orient="records")
+    # server files named by directory/paths are parsed in place (server_files)
+    try:
+        local = await server_sources(directory, paths, skip_bad_zip=True)
+    except ValueError as e:
+        return {"error": str(e)}
+
+    # spool uploads once; files are read for host-ip map and parsing in one pass
+    async with UploadSpool() as spool:
+        collected = await spool.sources(files, zips, skip_bad_zip=True) + local
+        all_rows = await _lldp_rows(collected, neighbor_patterns, strip_prefix, exact_match, use_inventory=use_inventory)
+    # /lldp/hostname/excel can export these rows (same filters) by session token
+    attach_session(response, "lldp", all_rows)
+    with span("dataframe"):
+        return await run_blocking(_preview_records, all_rows)
 
 
 @router.post("/lldp/hostname/excel")
 async def lldp_hostname_excel(
+    request: Request,
     files: List[UploadFile] | None = File(None),
     zips: List[UploadFile] | None = File(None),
     pattern: str = Form(""),
     strip_prefix: str = Form("") ,
     include_description: bool = Form(False),  # reserved
+    session: str | None = Form(None),
+    background: bool = Form(False),
+    use_inventory: bool = Form(True),
+    directory: str | None = Form(None),
+    paths: List[str] | None = Form(None),
 ):
     # Checkbox repurposed: include_description = True -> filter by pattern, False -> include all
     # include_description True -> exact match only, False -> contains match
     neighbor_patterns = _compile_patterns(pattern)
     exact_match = bool(include_description)
-    all_rows: list[list[str]] = []
-
-    # collect
-    collected: list[tuple[str, str]] = []
-    if files:
-        for f in files:
-            fname = f.filename or ""
-            lower = fname.lower()
-            if not (lower.endswith(".log") or lower.endswith(".txt")):
-                continue
-            content = (await f.read()).decode("utf-8", errors="ignore")
-            collected.append((fname, content))
-
-    if zips:
-        for z in zips:
-            data = await z.read()
-            try:
-                zf = zipfile.ZipFile(io.BytesIO(data))
-            except zipfile.BadZipFile:
-                continue
-            for name in zf.namelist():
-                if name.endswith("/"):
-                    continue
-                lower = name.lower()
-                if not (lower.endswith(".log") or lower.endswith(".txt")):
-                    continue
-                try:
-                    content = zf.read(name).decode("utf-8", errors="ignore")
-                except Exception:
-                    continue
-                collected.append((os.path.basename(name), content))
-
-    # host->ip map
-    host_ip_map: dict[str, str] = {}
-    for fname, content in collected:
-        sysname = _extract_by_patterns(SYSNAME_PATTERNS, content)
-        if not sysname:
-            continue
-        sys_out = _normalize_name(sysname, strip_prefix)
-        ip_addr = _extract_ip(content, fname)
-        if ip_addr:
-            host_ip_map[sys_out] = ip_addr
-
-    for fname, content in collected:
-        rows = _parse_one(content, neighbor_patterns, strip_prefix, fname, host_ip_map, exact_match)
-        if rows:
-            all_rows.extend(rows)
-
-    df = pd.DataFrame(all_rows, columns=["sysName", "Port", "NeighborName", "NeighborPort", "NeighborIP", "ip"]) if all_rows else pd.DataFrame(columns=["sysName", "Port", "NeighborName", "NeighborPort", "NeighborIP", "ip"])
-    df_sorted = df.sort_values(by=["sysName"], key=lambda s: s.map(natural_sort_key)) if not df.empty else df
-
-    # insert blank line between groups of sysName
-    final_rows: list[list[str]] = []
-    prev = None
-    for row in df_sorted.itertuples(index=False):
-        current = row.sysName
-        if prev is not None and current != prev:
-            final_rows.append(["", "", "", "", "", ""]) 
-        final_rows.append(list(row))
-        prev = current
-
-    out_df = pd.DataFrame(final_rows, columns=["sysName", "Port", "NeighborName", "NeighborPort", "NeighborIP", "ip"]) if final_rows else df_sorted
-
-    stream = io.BytesIO()
-    with pd.ExcelWriter(stream, engine="openpyxl") as writer:
-        out_df.to_excel(writer, index=False)
-    stream.seek(0)
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=lldp.xlsx"},
-    )
+    local: List[LogSource] = []
+    if not session and has_server_paths(directory, paths):
+        try:
+            local = await server_sources(directory, paths, skip_bad_zip=True)
+        except ValueError as e:
+            return {"error": str(e)}
+
+    if session or not (files or zips or has_server_paths(directory, paths)):
+        all_rows = store.get("lldp", session)
+        if all_rows is None:
+            return session_expired()
+        if background:
+            work = partial(_lldp_job, all_rows, [], None, neighbor_patterns, strip_prefix, exact_match, use_inventory)
+            return submit_job(request, "lldp", "lldp.xlsx", XLSX_MEDIA_TYPE, work)
+    elif background:
+        # the spool outlives this request; the job removes it when parsing is done
+        spool = UploadSpool()
+        try:
+            collected = await spool.sources(files, zips, skip_bad_zip=True) + local
+        except BaseException:
+            spool.close()
+            raise
+        work = partial(_lldp_job, None, collected, spool, neighbor_patterns, strip_prefix, exact_match, use_inventory)
+        return submit_job(
+            request, "lldp", "lldp.xlsx", XLSX_MEDIA_TYPE, work,
+            files_total=len(collected), bytes_total=sum(src.size for src in collected), cleanup=spool.close,
+        )
+    else:
+        async with UploadSpool() as spool:
+            collected = await spool.sources(files, zips, skip_bad_zip=True) + local
+            all_rows = await _lldp_rows(collected, neighbor_patterns, strip_prefix, exact_match, use_inventory=use_inventory)
+
+    with span("dataframe"):
+        final_rows = await run_blocking(_excel_rows, all_rows)
+    return xlsx_response([("Sheet1", LLDP_COLUMNS, final_rows)], "lldp.xlsx")
 
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, Response
 from fastapi.responses import StreamingResponse
 from typing import List
-import io
-import os
 import re
-import zipfile
-from openpyxl import load_workbook
+
+from .metrics import span, timed
+from .offload import iterate_blocking, run_blocking
+from .sessions import attach_session, session_expired, store
+from .xlsx_stream import open_workbook_readonly, sheet_lines, workbook_line_counts
+from .zip_stream import stream_zip
 
 router = APIRouter()
 
@@ -18,21 +20,18 @@ def _safe_sheet_name(name: str) -> str:
 
 
 @router.post("/distribute/preview")
-async def distribute_preview(excel: UploadFile = File(...)):
-    data = await excel.read()
-    stream = io.BytesIO(data)
-    wb = load_workbook(stream, data_only=True)
+async def distribute_preview(response: Response, excel: UploadFile = File(...)):
+    with span("read"):
+        data = await excel.read()
+    # keep the workbook bytes so /distribute/zip needs no second upload
+    attach_session(response, "distribute", data)
     results = []
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        lines = 0
-        for row in ws.iter_rows(values_only=True):
-            line = ''.join([str(cell) if cell is not None else '' for cell in row])
-            # count even if empty line to reflect file length semantics
-            lines += 1
+    # counted from sheet dimensions / row tags; no cell values are read
+    for sheet_name, lines in await run_blocking(workbook_line_counts, data):
         results.append({
             "sheet": _safe_sheet_name(sheet_name),
             "original_sheet": sheet_name,
+            # count even if empty line to reflect file length semantics
             "lines": lines,
         })
     return results
@@ -40,35 +39,41 @@ async def distribute_preview(excel: UploadFile = File(...)):
 
 @router.post("/distribute/zip")
 async def distribute_zip(
-    excel: UploadFile = File(...),
+    excel: UploadFile | None = File(None),
     format: str = Form("txt"),
+    session: str | None = Form(None),
 ):
     fmt = (format or "txt").lower()
     if fmt not in {"txt", "log"}:
         fmt = "txt"
 
-    data = await excel.read()
-    stream = io.BytesIO(data)
-    wb = load_workbook(stream, data_only=True)
-
-    zip_stream = io.BytesIO()
-    with zipfile.ZipFile(zip_stream, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            safe_name = _safe_sheet_name(sheet_name)
-            txt_filename = f"{safe_name}.{fmt}"
-            # Build content
-            lines_out = []
-            for row in ws.iter_rows(values_only=True):
-                line = ''.join([str(cell) if cell is not None else '' for cell in row])
-                lines_out.append(line)
-            content = ("\n".join(lines_out)).encode("utf-8")
-            zf.writestr(txt_filename, content)
-
-    zip_stream.seek(0)
+    if session or excel is None:
+        data = store.get("distribute", session)
+        if data is None:
+            return session_expired()
+    else:
+        with span("read"):
+            data = await excel.read()
     return StreamingResponse(
-        zip_stream,
+        iterate_blocking(timed(stream_zip(_distribute_entries(data, fmt)), "zip")),
         media_type="application/zip",
         headers={"Content-Disposition": "attachment; filename=distributed-logs.zip"},
     )
 
+
+def _distribute_entries(data: bytes, fmt: str):
+    # one text file per sheet, rows read and compressed one at a time
+    wb = open_workbook_readonly(data)
+    try:
+        for sheet_name in wb.sheetnames:
+            txt_filename = f"{_safe_sheet_name(sheet_name)}.{fmt}"
+            yield txt_filename, _sheet_text(wb[sheet_name])
+    finally:
+        wb.close()
+
+
+def _sheet_text(ws):
+    sep = b""
+    for line in sheet_lines(ws):
+        yield sep + line.encode("utf-8")
+        sep = b"\n"
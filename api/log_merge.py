@@ -1,10 +1,13 @@
-from fastapi import APIRouter, UploadFile, File, Form
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Form, Request, Response
 from typing import List
-import io
 import os
 import re
-from openpyxl import Workbook
+
+from .jobs import submit_job
+from .metrics import count, span
+from .offload import run_blocking
+from .sessions import attach_session, session_expired, store
+from .xlsx_stream import XLSX_MEDIA_TYPE, stream_xlsx, xlsx_response
 
 router = APIRouter()
 
@@ -16,17 +19,33 @@ def natural_sort_key(text: str):
     return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", text)]
 
 
-@router.post("/merge/preview")
-async def merge_preview(files: List[UploadFile] = File(...)):
+async def _read_entries(files: List[UploadFile]) -> list[tuple[str, str]]:
     # Sort files by natural order of filename
     file_entries = sorted(files, key=lambda f: natural_sort_key(f.filename or ""))
+    with span("read"):
+        entries = [
+            (f.filename or "", (await f.read()).decode("utf-8", errors="ignore"))
+            for f in file_entries
+        ]
+    count(files=len(entries), bytes=sum(len(content) for _, content in entries))
+    return entries
+
+
+@router.post("/merge/preview")
+async def merge_preview(response: Response, files: List[UploadFile] = File(...)):
+    entries = await _read_entries(files)
+    results = await run_blocking(_preview_rows, entries)
+    attach_session(response, "merge", entries)
+    return results
+
+
+def _preview_rows(entries: list[tuple[str, str]]) -> list[dict]:
     results = []
-    for f in file_entries:
-        content = (await f.read()).decode("utf-8", errors="ignore")
-        raw_name = os.path.splitext(os.path.basename(f.filename or ""))[0]
+    for filename, content in entries:
+        raw_name = os.path.splitext(os.path.basename(filename))[0]
         safe_name = invalid_chars.sub("", raw_name)[:31] or "Sheet"
         results.append({
-            "filename": f.filename,
+            "filename": filename,
             "sheet": safe_name,
             "lines": len(content.splitlines()),
         })
@@ -35,43 +54,48 @@ async def merge_preview(files: List[UploadFile] = File(...)):
 
 @router.post("/merge/excel")
 async def merge_excel(
-    files: List[UploadFile] = File(...),
+    request: Request,
+    files: List[UploadFile] | None = File(None),
     output_name: str = Form("merged_logs.xlsx"),
+    session: str | None = Form(None),
+    background: bool = Form(False),
 ):
-    wb = Workbook()
-    # remove default sheet
-    wb.remove(wb.active)
+    # session token from /merge/preview replaces the second upload
+    if session or not files:
+        entries = store.get("merge", session)
+        if entries is None:
+            return session_expired()
+    else:
+        entries = await _read_entries(files)
+
+    if background:
+        # 202 with a job id; the workbook is written to disk (see jobs.py)
+        async def work(job):
+            return stream_xlsx(_merge_sheets(entries, job.advance))
+
+        return submit_job(
+            request, "merge", output_name or "merged_logs.xlsx", XLSX_MEDIA_TYPE, work,
+            files_total=len(entries), bytes_total=sum(len(content) for _name, content in entries),
+        )
+    return xlsx_response(_merge_sheets(entries), output_name or "merged_logs.xlsx")
 
-    # Sort files by natural order of filename
-    file_entries = sorted(files, key=lambda f: natural_sort_key(f.filename or ""))
 
+def _merge_sheets(entries: list[tuple[str, str]], progress=None):
+    # one sheet per file, one line per row; rows are streamed as they are produced
     existing_names = set()
-    for f in file_entries:
-        content = (await f.read()).decode("utf-8", errors="ignore")
-        lines = content.splitlines()
-        raw_name = os.path.splitext(os.path.basename(f.filename or ""))[0]
+    for filename, content in entries:
+        raw_name = os.path.splitext(os.path.basename(filename))[0]
         safe_name = invalid_chars.sub("", raw_name)[:31] or "Sheet"
-        # ensure unique within 31 chars
+        # ensure unique within 31 chars (Excel compares sheet names case-insensitively)
         original = safe_name
         count = 1
-        while safe_name in existing_names:
+        while safe_name.lower() in existing_names:
             suffix = f"_{count}"
             safe_name = (original[: max(0, 31 - len(suffix))] + suffix) or f"Sheet_{count}"
             count += 1
-        existing_names.add(safe_name)
-
-        ws = wb.create_sheet(title=safe_name)
-        for idx, line in enumerate(lines, 1):
-            ws.cell(row=idx, column=1, value=line)
-
-    stream = io.BytesIO()
-    wb.save(stream)
-    stream.seek(0)
-    return StreamingResponse(
-        stream,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": f"attachment; filename={output_name or 'merged_logs.xlsx'}"
-        },
-    )
+        existing_names.add(safe_name.lower())
 
+        yield safe_name, None, ((line,) for line in content.splitlines())
+        # resumed once the writer has consumed this sheet's rows
+        if progress is not None:
+            progress(1, len(content))
@@ -1,23 +1,55 @@
 ﻿# api/main.py
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .extract_model_serial_hostname import router as extract_router  # ?????섎굹
 from .directory_listing import router as dir_router
+from .dir_index import INDEX_AGE_HEADER, INDEX_REFRESHING_HEADER
 from .securecrt_hostname import router as securecrt_router
 from .securecrt_iprange import router as securecrt_ip_router
 from .log_merge import router as log_merge_router
 from .log_distribute import router as log_distribute_router
 from .lldp_hostname import router as lldp_hostname_router
 from .xsf_generate import router as xsf_router
+from .parse_cache import router as cache_router
+from .jobs import router as jobs_router, shutdown_jobs
+from .inventory import router as inventory_router
+from .collect import router as collect_router, shutdown_collect
+from .tftp import router as tftp_router, start_tftp, stop_tftp
+from .metrics import SERVER_TIMING_HEADER, MetricsMiddleware, router as metrics_router
+from .offload import ConcurrencyLimitMiddleware, configure_threadpool, router as limits_router, shutdown_threadpool
+from .parse_pool import shutdown_executor
+from .profiling import PROFILE_ID_HEADER, ProfilingMiddleware, router as profiling_router
+from .sessions import SESSION_HEADER, router as sessions_router
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    configure_threadpool()
+    await start_tftp()
+    yield
+    await stop_tftp()
+    shutdown_jobs()
+    shutdown_collect()
+    shutdown_executor()
+    shutdown_threadpool()
+
 
-app = FastAPI(title="NetTools API")
+app = FastAPI(title="NetTools API", lifespan=lifespan)
 
+# added first so CORS wraps it and 503 answers still carry CORS headers
+app.add_middleware(ConcurrencyLimitMiddleware)
+# outside the limiter, so queueing time and 503 answers are measured too
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[SESSION_HEADER, INDEX_AGE_HEADER, INDEX_REFRESHING_HEADER, SERVER_TIMING_HEADER, PROFILE_ID_HEADER],
 )
 
 app.include_router(extract_router, prefix="")
@@ -28,6 +60,15 @@ app.include_router(log_merge_router, prefix="")
 app.include_router(log_distribute_router, prefix="")
 app.include_router(lldp_hostname_router, prefix="")
 app.include_router(xsf_router, prefix="")
+app.include_router(cache_router, prefix="")
+app.include_router(sessions_router, prefix="")
+app.include_router(limits_router, prefix="")
+app.include_router(jobs_router, prefix="")
+app.include_router(inventory_router, prefix="")
+app.include_router(metrics_router, prefix="")
+app.include_router(profiling_router, prefix="")
+app.include_router(collect_router, prefix="")
+app.include_router(tftp_router, prefix="")
 
 @app.get("/healthz")
 async def health_check():
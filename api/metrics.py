@@ -0,0 +1,323 @@
+"""Per-request timings and sizes, exposed in Prometheus text format at /metrics.
+
+``MetricsMiddleware`` times every HTTP request and counts the bytes it
+receives and sends. Handlers and helpers mark their stages with
+``with span("parse"):``, or with ``timed(chunks, "xlsx")`` for a body that is
+produced while it streams. The stages are:
+
+* receive: reading the request body
+* queue: waiting for a concurrency slot
+* spool: copying uploads to disk
+* unzip: listing ZIP members
+* walk: finding server files parsed in place (server_files)
+* hash: reading (and inflating) files for cache keys
+* parse: the parse pool
+* dataframe: building DataFrames
+* xlsx, zip, xsf: producing the download
+* write: writing a background job's file
+
+``count(files=..., bytes=...)`` adds to the request's input size. The
+request's peak memory is the largest resident set size sampled at the end of
+each stage and of the request. When the request finishes, everything is
+observed into histograms labelled by route template, so path parameters do not
+multiply series. Background jobs record under the route ``job:<kind>``.
+
+With NETTOOLS_SERVER_TIMING=1, responses also carry a ``Server-Timing``
+header. It lists the stages finished before the response started, so the
+stages of a streamed download show up in the histograms only.
+"""
+import contextvars
+import os
+import resource
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter()
+
+SERVER_TIMING = os.getenv("NETTOOLS_SERVER_TIMING", "0") == "1"
+SERVER_TIMING_HEADER = "Server-Timing"
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(12))  # 1 KiB .. 4 GiB
+FILE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+MEMORY_BUCKETS = tuple(64 * 1024 * 1024 * 2 ** i for i in range(8))  # 64 MiB .. 8 GiB
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def resident_bytes() -> int:
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        # no procfs: the high-water mark is the best we have
+        return max_resident_bytes()
+
+
+def max_resident_bytes() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labels, labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name, self.help, self.labels = name, help, labels
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (last one is +Inf), sum]
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *labels: str, value: float) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        names = self.labels + ("le",)
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                yield f"{self.name}_bucket{_labels(names, labels + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+REQUESTS = Counter("nettools_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+IN_PROGRESS = Gauge("nettools_requests_in_progress", "HTTP requests being served.")
+DURATION = Histogram(
+    "nettools_request_duration_seconds", "Time until the response body was sent.", ("method", "route"), DURATION_BUCKETS
+)
+STAGE_DURATION = Histogram(
+    "nettools_stage_duration_seconds", "Time spent per request stage.", ("route", "stage"), DURATION_BUCKETS
+)
+REQUEST_SIZE = Histogram("nettools_request_size_bytes", "Request body bytes received.", ("route",), SIZE_BUCKETS)
+RESPONSE_SIZE = Histogram("nettools_response_size_bytes", "Response body bytes sent.", ("route",), SIZE_BUCKETS)
+INPUT_FILES = Histogram("nettools_input_files", "Log files (including ZIP members) per request.", ("route",), FILE_BUCKETS)
+INPUT_SIZE = Histogram("nettools_input_size_bytes", "Uncompressed input bytes per request.", ("route",), SIZE_BUCKETS)
+PEAK_MEMORY = Histogram(
+    "nettools_request_peak_resident_bytes", "Largest process RSS sampled during a request.", ("route",), MEMORY_BUCKETS
+)
+RESIDENT = Gauge("nettools_process_resident_memory_bytes", "Resident set size of the API process.")
+MAX_RESIDENT = Gauge("nettools_process_max_resident_memory_bytes", "Peak resident set size of the API process.")
+
+METRICS = [
+    REQUESTS, IN_PROGRESS, DURATION, STAGE_DURATION, REQUEST_SIZE, RESPONSE_SIZE,
+    INPUT_FILES, INPUT_SIZE, PEAK_MEMORY, RESIDENT, MAX_RESIDENT,
+]
+
+
+def register(metric):
+    """Add a metric kept by another module to /metrics."""
+    METRICS.append(metric)
+    return metric
+
+
+class RequestMetrics:
+    def __init__(self, route: str = ""):
+        self.route = route
+        self.started = time.perf_counter()
+        # stage -> seconds, summed over repeats (one spool per upload)
+        self.stages: dict[str, float] = {}
+        self.files = 0
+        self.input_bytes = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.peak_rss = resident_bytes()
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.peak_rss = max(self.peak_rss, resident_bytes())
+
+    def server_timing(self) -> str:
+        parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in list(self.stages.items())]
+        parts.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def finish(self, method: str | None = None, status: int | None = None) -> None:
+        """Observe this request (or job) into the histograms."""
+        route = self.route or "unmatched"
+        self.peak_rss = max(self.peak_rss, resident_bytes())
+        for stage, seconds in self.stages.items():
+            STAGE_DURATION.observe(route, stage, value=seconds)
+        if self.files or self.input_bytes:
+            INPUT_FILES.observe(route, value=self.files)
+            INPUT_SIZE.observe(route, value=self.input_bytes)
+        PEAK_MEMORY.observe(route, value=self.peak_rss)
+        if method is not None:
+            REQUESTS.inc(method, route, str(status or 0))
+            DURATION.observe(method, route, value=time.perf_counter() - self.started)
+            REQUEST_SIZE.observe(route, value=self.bytes_in)
+            RESPONSE_SIZE.observe(route, value=self.bytes_out)
+
+
+_current: contextvars.ContextVar[RequestMetrics | None] = contextvars.ContextVar("nettools_request_metrics", default=None)
+
+
+def current() -> RequestMetrics | None:
+    return _current.get()
+
+
+def activate(metrics: RequestMetrics | None) -> contextvars.Token:
+    return _current.set(metrics)
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block as ``stage`` of the current request."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_stage(stage, time.perf_counter() - t0)
+
+
+def timed(chunks: Iterable, stage: str) -> Iterator:
+    """Pass ``chunks`` through, recording the time spent producing them."""
+    # bound now: the chunks are pulled later, from pool threads
+    metrics = _current.get()
+    if metrics is None:
+        return iter(chunks)
+    return _timed(iter(chunks), stage, metrics)
+
+
+def _timed(it: Iterator, stage: str, metrics: RequestMetrics) -> Iterator:
+    spent = 0.0
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                chunk = next(it)
+            except StopIteration:
+                return
+            finally:
+                spent += time.perf_counter() - t0
+            yield chunk
+    finally:
+        close = getattr(it, "close", None)
+        if close is not None:
+            close()
+        metrics.add_stage(stage, spent)
+
+
+def count(files: int = 0, bytes: int = 0) -> None:
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.files += files
+        metrics.input_bytes += bytes
+
+
+def _route(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", "") or ""
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        status = 0
+
+        async def receive_counted():
+            message = await receive()
+            if message["type"] == "http.request":
+                metrics.bytes_in += len(message.get("body", b""))
+                if metrics.bytes_in and not message.get("more_body", False):
+                    metrics.add_stage("receive", time.perf_counter() - metrics.started)
+            return message
+
+        async def send_counted(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", metrics.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                metrics.bytes_out += len(message.get("body", b""))
+            await send(message)
+
+        IN_PROGRESS.inc(amount=1)
+        try:
+            await self.app(scope, receive_counted, send_counted)
+        finally:
+            IN_PROGRESS.inc(amount=-1)
+            metrics.route = _route(scope)
+            metrics.finish(scope["method"], status or 500)
+            _current.reset(token)
+
+
+@router.get("/metrics")
+async def metrics_endpoint():
+    RESIDENT.set(value=resident_bytes())
+    MAX_RESIDENT.set(value=max_resident_bytes())
+    lines = [line for metric in METRICS for line in metric.render()]
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_MEDIA_TYPE)
@@ -0,0 +1,141 @@
+"""Neighbor name filters for /lldp and /collect, matched in linear time.
+
+A filter is what the user types: items separated by commas or newlines, where
+``*`` stands for any run of characters and every other character is literal
+(case-sensitive). Items are never compiled as regexes, so no filter can make a
+match backtrack: a glob is split at its ``*`` into literal parts, and each
+part is found once, left to right, with ``str.find``. Taking the leftmost
+occurrence of each part is enough for ``*``-only globs.
+
+Items without ``*`` are looked up in a set (exact match) or found together by
+one Aho-Corasick automaton (contains match), so a filter listing hundreds of
+host names still costs one pass over each neighbor name.
+"""
+from collections import deque
+from typing import Iterable
+
+import numpy as np
+
+
+class Glob:
+    __slots__ = ("pattern", "parts")
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.parts = pattern.split("*")
+
+    def fullmatch(self, text: str) -> bool:
+        parts = self.parts
+        if len(parts) == 1:
+            return text == parts[0]
+        head, tail = parts[0], parts[-1]
+        if len(text) < len(head) + len(tail) or not text.startswith(head) or not text.endswith(tail):
+            return False
+        pos, end = len(head), len(text) - len(tail)
+        for part in parts[1:-1]:
+            pos = text.find(part, pos, end)
+            if pos == -1:
+                return False
+            pos += len(part)
+        return True
+
+    def search(self, text: str) -> bool:
+        pos = 0
+        for part in self.parts:
+            pos = text.find(part, pos)
+            if pos == -1:
+                return False
+            pos += len(part)
+        return True
+
+
+class AhoCorasick:
+    """Whether any of ``words`` occurs in a text, in one pass over the text.
+
+    The automaton is built as a full DFA over the characters of the words, so
+    each character of the text costs one dict lookup.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self._delta: list[dict[str, int]] = [{}]
+        self._out: list[bool] = [False]
+        self._any = False  # an empty word occurs everywhere
+        for word in words:
+            if not word:
+                self._any = True
+            state = 0
+            for ch in word:
+                nxt = self._delta[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._delta)
+                    self._delta[state][ch] = nxt
+                    self._delta.append({})
+                    self._out.append(False)
+                state = nxt
+            self._out[state] = True
+        self._link()
+
+    def _link(self) -> None:
+        # breadth-first: a state's failure state is shallower, so already complete
+        delta, out = self._delta, self._out
+        alphabet = {ch for row in delta for ch in row}
+        fail = [0] * len(delta)
+        queue = deque()
+        for ch in alphabet:
+            child = delta[0].get(ch)
+            if child is None:
+                delta[0][ch] = 0
+            else:
+                queue.append(child)
+        while queue:
+            state = queue.popleft()
+            row, fallback = delta[state], delta[fail[state]]
+            for ch in alphabet:
+                child = row.get(ch)
+                if child is None:
+                    row[ch] = fallback[ch]
+                else:
+                    fail[child] = fallback[ch]
+                    out[child] = out[child] or out[fail[child]]
+                    queue.append(child)
+
+    def search(self, text: str) -> bool:
+        if self._any:
+            return True
+        delta, out = self._delta, self._out
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                return True
+        return False
+
+
+class NameFilter:
+    """A compiled filter; empty (falsy) when nothing was typed, matching every name."""
+
+    def __init__(self, text: str | None = None):
+        items = [x.strip() for x in (text or "").replace("\n", ",").split(",")]
+        self.items = tuple(x for x in items if x)
+        literals = [x for x in self.items if "*" not in x]
+        self._literals = frozenset(literals)
+        self._contains = AhoCorasick(literals) if literals else None
+        self._globs = [Glob(x) for x in self.items if "*" in x]
+
+    def __bool__(self) -> bool:
+        return bool(self.items)
+
+    def __repr__(self) -> str:
+        return f"NameFilter({', '.join(self.items)!r})"
+
+    def match(self, name: str, exact: bool = False) -> bool:
+        if not self.items:
+            return True
+        if exact:
+            return name in self._literals or any(g.fullmatch(name) for g in self._globs)
+        return (self._contains is not None and self._contains.search(name)) or any(g.search(name) for g in self._globs)
+
+    def mask(self, names: Iterable[str], exact: bool = False) -> np.ndarray:
+        """``match`` for each of ``names``, as a boolean array."""
+        names = list(names)
+        return np.fromiter((self.match(n, exact) for n in names), dtype=bool, count=len(names))
@@ -0,0 +1,220 @@
+"""Execution model for blocking work and per-endpoint concurrency limits.
+
+Blocking I/O and short CPU stages run through ``run_blocking`` on one bounded
+thread pool, and sync streaming bodies (XLSX, ZIP, NDJSON) are pulled through
+the same pool with ``iterate_blocking``. Heavy parsing goes to the process pool
+in parse_pool. Pool threads and parse processes run at a lower CPU priority
+(NETTOOLS_WORKER_NICE), so the scheduler hands the core to the event loop as
+soon as a request arrives, even when exports keep every core busy.
+
+``ConcurrencyLimitMiddleware`` caps how many POST requests of each group run at
+once. Later requests queue, and once a group's queue is full they are turned
+away with 503. The slot is held until the response body has been sent, which
+covers streamed exports too. See benchmarks/load_healthz.py for /healthz
+latency under export load.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Iterable
+
+import anyio.to_thread
+from fastapi import APIRouter
+
+from .metrics import span
+
+router = APIRouter()
+
+BLOCKING_WORKERS = int(os.getenv("NETTOOLS_BLOCKING_WORKERS", "0")) or min(32, (os.cpu_count() or 1) + 4)
+# requests allowed to wait for a slot, per group, before answering 503
+QUEUE_MAX = int(os.getenv("NETTOOLS_LIMIT_QUEUE", "32"))
+GROUP_LIMITS = {
+    group: int(os.getenv(f"NETTOOLS_LIMIT_{group.upper()}", default))
+    for group, default in (("export", "2"), ("parse", "4"), ("listing", "4"), ("preview", "8"), ("collect", "2"))
+}
+# nice value for pool threads and parse processes; 0 keeps the loop's priority
+WORKER_NICE = int(os.getenv("NETTOOLS_WORKER_NICE", "10"))
+
+BUSY = {"error": "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도하세요."}
+
+_background: set[asyncio.Task] = set()
+_DONE = object()
+
+
+def route_group(method: str, path: str) -> str | None:
+    if method != "POST":
+        return None
+    if path.startswith(("/collect", "/tftp/")):
+        return "collect"
+    if path.endswith(("/excel", "/generate", "/zip")) or path.startswith("/xsf/"):
+        return "export"
+    if path.startswith(("/extract/", "/lldp/")):
+        return "parse"
+    if path.startswith("/dir/"):
+        return "listing"
+    if path.startswith(("/merge/", "/distribute/", "/securecrt/")):
+        return "preview"
+    return None
+
+
+def lower_priority() -> None:
+    """Pool initializer: drop the calling thread (or process) to WORKER_NICE."""
+    if not WORKER_NICE or not hasattr(os, "setpriority"):
+        return
+    # on Linux a thread id addresses just that thread, not the whole process
+    tid = threading.get_native_id()
+    try:
+        os.setpriority(os.PRIO_PROCESS, tid, max(WORKER_NICE, os.getpriority(os.PRIO_PROCESS, tid)))
+    except OSError:
+        pass
+
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def get_thread_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=BLOCKING_WORKERS,
+            thread_name_prefix="nettools-blocking",
+            initializer=lower_priority,
+        )
+    return _executor
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run ``fn`` on the shared bounded thread pool and await its result."""
+    # carry the caller's context along so spans land on the right request
+    call = partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_thread_executor(), call)
+
+
+def spawn_blocking(fn, *args, **kwargs) -> asyncio.Task:
+    """Start ``fn`` on the thread pool without waiting for it."""
+    task = asyncio.create_task(run_blocking(fn, *args, **kwargs))
+    # the loop only keeps weak references to tasks
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+async def iterate_blocking(iterable: Iterable) -> AsyncIterator:
+    """Async view of a sync iterable whose ``next()`` runs on the pool.
+
+    Pass this to StreamingResponse instead of a sync generator, which Starlette
+    would otherwise iterate on its own, normal-priority threads.
+    """
+    it = iter(iterable)
+    loop = asyncio.get_running_loop()
+    executor = get_thread_executor()
+    pending = None
+    try:
+        while True:
+            pending = executor.submit(next, it, _DONE)
+            item = await asyncio.wrap_future(pending)
+            pending = None
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        # client gone mid-stream: still run the generator's cleanup
+        close = getattr(it, "close", None)
+        if close is not None:
+            if pending is not None:
+                # cancelled while next() was still running on a pool thread;
+                # closing a generator that is executing raises ValueError
+                await asyncio.wait([asyncio.wrap_future(pending)])
+            await loop.run_in_executor(executor, close)
+
+
+def configure_threadpool() -> None:
+    """Bound Starlette's own thread pool too; call once from the app lifespan."""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = BLOCKING_WORKERS
+
+
+def shutdown_threadpool() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class GroupLimiter:
+    def __init__(self, name: str, limit: int, queue_max: int):
+        self.name = name
+        self.limit = limit
+        self.queue_max = queue_max
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.completed = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "queue_max": self.queue_max,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+limiters = {group: GroupLimiter(group, limit, QUEUE_MAX) for group, limit in GROUP_LIMITS.items()}
+
+
+class ConcurrencyLimitMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        group = route_group(scope.get("method", ""), scope["path"]) if scope["type"] == "http" else None
+        limiter = limiters.get(group) if group else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        if limiter.waiting >= limiter.queue_max:
+            limiter.rejected += 1
+            await _send_busy(send)
+            return
+        limiter.waiting += 1
+        try:
+            with span("queue"):
+                await limiter._semaphore.acquire()
+        finally:
+            limiter.waiting -= 1
+        limiter.active += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.active -= 1
+            limiter.completed += 1
+            limiter._semaphore.release()
+
+
+async def _send_busy(send) -> None:
+    body = json.dumps(BUSY, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", b"5"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+@router.get("/limits/stats")
+async def limit_stats():
+    return {
+        "blocking_workers": BLOCKING_WORKERS,
+        "groups": {name: limiter.stats() for name, limiter in limiters.items()},
+    }
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import APIRouter
+
+from .archive import LogSource
+from .metrics import span
+from .offload import run_blocking
+from .parse_pool import map_ordered
+from .profiling import note_inputs
+
+router = APIRouter()
+
+# Parse results keyed by content hash + parser/pattern version + parse options
+# (+ whatever the parser reads from the source besides its content, see cached_map).
+# Values are stored pickled: sizes are exact and every hit returns a fresh copy.
+MEM_MAX_BYTES = int(os.getenv("NETTOOLS_CACHE_MEM_MB", "64")) * 1024 * 1024
+# optional second tier; set NETTOOLS_CACHE_DIR to enable it
+DISK_DIR = os.getenv("NETTOOLS_CACHE_DIR") or None
+DISK_MAX_BYTES = int(os.getenv("NETTOOLS_CACHE_DISK_MB", "512")) * 1024 * 1024
+HASH_CHUNK = 1024 * 1024
+
+
+def pattern_fingerprint(*groups) -> str:
+    """Short hash of regex tables, so changing a pattern invalidates old entries."""
+    h = hashlib.sha1()
+    for group in groups:
+        h.update(repr(group).encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def source_digest(source: LogSource) -> str:
+    h = hashlib.blake2b(digest_size=20)
+    if source.in_place:
+        # server files (see server_files) are keyed by where they are and when
+        # they last changed, so unchanged ones are not read just to be hashed
+        st = os.stat(source.path)
+        h.update(f"{source.path}\0{source.member}\0{st.st_size}\0{st.st_mtime_ns}".encode("utf-8"))
+        return h.hexdigest()
+    with source.open() as fh:
+        while True:
+            chunk = fh.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ParseCache:
+    def __init__(self, mem_max_bytes: int, disk_dir: str | None = None, disk_max_bytes: int = 0):
+        self.mem_max_bytes = mem_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._mem: OrderedDict[str, bytes] = OrderedDict()
+        self._mem_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {
+            "hits_memory": 0,
+            "hits_disk": 0,
+            "misses": 0,
+            "evictions_memory": 0,
+            "evictions_disk": 0,
+        }
+        self._db: sqlite3.Connection | None = None
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._db = sqlite3.connect(os.path.join(disk_dir, "parse-cache.sqlite3"), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, atime REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS entries_atime ON entries(atime)")
+            self._disk_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: list[str]) -> list:
+        """``get`` for each key; disk hits update their access time in one commit."""
+        results: list = []
+        touched: list[str] = []
+        with self._lock:
+            for key in keys:
+                blob = self._mem.get(key)
+                if blob is not None:
+                    self._mem.move_to_end(key)
+                    self.counters["hits_memory"] += 1
+                    results.append(pickle.loads(blob))
+                    continue
+                if self._db is not None:
+                    row = self._db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        touched.append(key)
+                        self.counters["hits_disk"] += 1
+                        self._put_mem(key, row[0])
+                        results.append(pickle.loads(row[0]))
+                        continue
+                self.counters["misses"] += 1
+                results.append(None)
+            if touched:
+                now = time.time()
+                self._db.executemany("UPDATE entries SET atime = ? WHERE key = ?", [(now, key) for key in touched])
+                self._db.commit()
+        return results
+
+    def put(self, key: str, value) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: list[tuple[str, object]]) -> None:
+        """``put`` for each ``(key, value)``, with one commit to the disk tier."""
+        blobs = [(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)) for key, value in items]
+        with self._lock:
+            for key, blob in blobs:
+                self._put_mem(key, blob)
+            if self._db is None:
+                return
+            now = time.time()
+            for key, blob in blobs:
+                if len(blob) > self.disk_max_bytes:
+                    continue
+                old = self._db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, atime) VALUES (?, ?, ?, ?)",
+                    (key, blob, len(blob), now),
+                )
+                self._disk_bytes += len(blob) - (old[0] if old else 0)
+            self._evict_disk()
+            self._db.commit()
+
+    def _put_mem(self, key: str, blob: bytes) -> None:
+        if len(blob) > self.mem_max_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= len(old)
+        self._mem[key] = blob
+        self._mem_bytes += len(blob)
+        while self._mem_bytes > self.mem_max_bytes:
+            _key, evicted = self._mem.popitem(last=False)
+            self._mem_bytes -= len(evicted)
+            self.counters["evictions_memory"] += 1
+
+    def _evict_disk(self) -> None:
+        while self._disk_bytes > self.disk_max_bytes:
+            rows = self._db.execute("SELECT key, size FROM entries ORDER BY atime LIMIT 64").fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._disk_bytes <= self.disk_max_bytes:
+                    break
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._disk_bytes -= size
+                self.counters["evictions_disk"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+                self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self.counters,
+                "memory_entries": len(self._mem),
+                "memory_bytes": self._mem_bytes,
+                "memory_max_bytes": self.mem_max_bytes,
+                "disk_enabled": self._db is not None,
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes if self._db is not None else 0,
+            }
+
+
+cache = ParseCache(MEM_MAX_BYTES, DISK_DIR, DISK_MAX_BYTES)
+
+
+async def cached_map(namespace: str, params: str, fn, sources: list[LogSource], progress=None, batched=False, variant=None) -> list:
+    """``map_ordered(fn, sources)`` that only parses sources not seen before.
+
+    ``namespace``/``params`` must capture everything besides the file content
+    that affects ``fn``'s result (parser version, options). When ``fn`` also
+    reads something of the source itself (e.g. the IP in its filename),
+    ``variant(source)`` gives that part, as a str, and goes into its key.
+    ``progress`` and ``batched`` are passed on to map_ordered; cache hits are
+    reported up front.
+    """
+    if not sources:
+        return []
+    with span("hash"):
+        digests = await run_blocking(lambda: [source_digest(src) for src in sources])
+    note_inputs(sources, digests)
+    keys = [f"{namespace}:{params}:{digest}" for digest in digests]
+    if variant is not None:
+        keys = [f"{key}:{variant(src)}" for key, src in zip(keys, sources)]
+
+    # sqlite reads, commits and unpickling stay off the event loop
+    results: list = await run_blocking(cache.get_many, keys)
+    missing = [i for i, value in enumerate(results) if value is None]
+    hit_bytes = sum(src.size for src, value in zip(sources, results) if value is not None)
+    if progress is not None and len(missing) < len(sources):
+        progress(len(sources) - len(missing), hit_bytes)
+
+    with span("parse"):
+        computed = await map_ordered(fn, [sources[i] for i in missing], size=lambda src: src.size, progress=progress, batched=batched)
+    for i, value in zip(missing, computed):
+        results[i] = value
+    await run_blocking(cache.put_many, [(keys[i], value) for i, value in zip(missing, computed)])
+    return results
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return cache.stats()
+
+
+@router.post("/cache/clear")
+async def cache_clear():
+    await run_blocking(cache.clear)
+    return cache.stats()
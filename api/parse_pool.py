@@ -0,0 +1,109 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .offload import lower_priority, run_blocking
+from .profiling import chunk_mode, merge_chunk, sampled_chunk
+
+# Shared process pool for CPU-bound log parsing (extract / LLDP routers).
+# NETTOOLS_PARSE_WORKERS=1 disables the pool entirely; so does a 1-CPU host,
+# where a worker process would only compete with the server for the one core.
+# Serial parses still run on the low-priority offload threads.
+PARSE_WORKERS = int(os.getenv("NETTOOLS_PARSE_WORKERS", "0")) or (os.cpu_count() or 1)
+# jobs at or below either bound are parsed serially (pool round-trips cost more)
+SERIAL_MAX_ITEMS = int(os.getenv("NETTOOLS_PARSE_SERIAL_MAX_ITEMS", "4"))
+SERIAL_MAX_BYTES = int(os.getenv("NETTOOLS_PARSE_SERIAL_MAX_BYTES", str(2 * 1024 * 1024)))
+# upper bound for the payload shipped to a worker in one task
+CHUNK_MAX_BYTES = int(os.getenv("NETTOOLS_PARSE_CHUNK_BYTES", str(16 * 1024 * 1024)))
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a threaded uvicorn worker is not safe
+        _executor = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=lower_priority,
+        )
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _run_chunk(fn, chunk: list, profile_mode: str | None = None) -> list:
+    if profile_mode:
+        return sampled_chunk(fn, chunk, False, profile_mode)
+    return [fn(item) for item in chunk]
+
+
+def _run_batch(fn, chunk: list, profile_mode: str | None = None) -> list:
+    if profile_mode:
+        return sampled_chunk(fn, chunk, True, profile_mode)
+    return fn(chunk)
+
+
+def _chunks(items: list, sizes: list[int]) -> list[tuple[list, int]]:
+    # keep input order; aim for a few chunks per worker so stragglers balance out
+    target = max(1, min(CHUNK_MAX_BYTES, sum(sizes) // (PARSE_WORKERS * 4) or 1))
+    chunks: list[tuple[list, int]] = []
+    current: list = []
+    current_size = 0
+    for item, size in zip(items, sizes):
+        if current and current_size + size > target:
+            chunks.append((current, current_size))
+            current, current_size = [], 0
+        current.append(item)
+        current_size += size
+    if current:
+        chunks.append((current, current_size))
+    return chunks
+
+
+async def map_ordered(fn, items, size=None, progress=None, batched=False) -> list:
+    """Apply ``fn`` to every item off the event loop and return results in input order.
+
+    ``fn`` and the items must be picklable (module-level function or
+    ``functools.partial`` of one). ``size`` estimates an item's weight in bytes
+    and drives both the serial fallback and chunking. ``progress(items, bytes)``
+    is called on the loop as chunks finish. With ``batched`` set, ``fn`` takes
+    a whole chunk (a list of items) and returns one result per item.
+    """
+    items = list(items)
+    if not items:
+        return []
+    sizes = [size(item) for item in items] if size else [1] * len(items)
+    run = fn if batched else partial(_run_chunk, fn)
+    mode = chunk_mode()
+    if mode:
+        # profiled request: chunks sample and time themselves (see profiling)
+        run = partial(_run_batch if batched else _run_chunk, fn, profile_mode=mode)
+    if PARSE_WORKERS <= 1 or len(items) <= SERIAL_MAX_ITEMS or sum(sizes) <= SERIAL_MAX_BYTES:
+        results = await run_blocking(run, items)
+        merge_chunk(results)
+        if progress is not None:
+            progress(len(items), sum(sizes))
+        return results
+
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    futures = []
+    for chunk, chunk_bytes in _chunks(items, sizes):
+        future = loop.run_in_executor(executor, run, chunk)
+        if progress is not None:
+            future.add_done_callback(lambda f, n=len(chunk), b=chunk_bytes: f.cancelled() or progress(n, b))
+        futures.append(future)
+    results: list = []
+    for part in await asyncio.gather(*futures):
+        merge_chunk(part)
+        results.extend(part)
+    return results
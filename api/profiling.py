@@ -0,0 +1,497 @@
+"""Opt-in sampling profiler for slow requests.
+
+With NETTOOLS_PROFILE=1, a request is profiled when it carries
+``X-NetTools-Profile: 1`` or when it runs longer than
+NETTOOLS_PROFILE_SLOW_SECONDS (0 profiles only requests with the header). The
+response to a header request names its profile in ``X-NetTools-Profile-Id``.
+
+A sampler thread reads the stacks of busy threads every
+NETTOOLS_PROFILE_INTERVAL seconds. Parse chunks run their own sampler (in the
+pool worker, or on the thread that parses small requests), and those samples
+start with a ``file <name>`` frame. All threads are sampled, so a profile
+taken while other requests run also contains their stacks.
+
+A regex search holds the GIL, so the sampler cannot look inside a stalled
+search. For header requests the parse chunks therefore also time every call
+into a compiled pattern (a ``sys.setprofile`` hook on C calls) and record the
+seconds per file and pattern. That ties a stall to one pattern and one file.
+A profile saved because a request was slow has the per-file times and input
+digests; sending the same upload again with the header adds the pattern times.
+
+Profiles are saved in NETTOOLS_PROFILE_DIR (the newest NETTOOLS_PROFILE_KEEP
+are kept). Each one holds the BLAKE2 digest of every input, as in the parse
+cache, and the per-file parse times from the pool. GET /profiles lists them;
+/profiles/{id}/folded returns the stacks in the folded format flamegraph.pl
+and speedscope read.
+"""
+import contextvars
+import hashlib
+import json
+import os
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from .offload import run_blocking, spawn_blocking
+
+router = APIRouter()
+
+PROFILE = os.getenv("NETTOOLS_PROFILE", "0") == "1"
+SLOW_SECONDS = float(os.getenv("NETTOOLS_PROFILE_SLOW_SECONDS", "10"))
+SAMPLE_INTERVAL = float(os.getenv("NETTOOLS_PROFILE_INTERVAL", "0.005"))
+PROFILE_DIR = os.getenv("NETTOOLS_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "nettools-profiles")
+PROFILE_KEEP = int(os.getenv("NETTOOLS_PROFILE_KEEP", "100"))
+PROFILE_HEADER = "X-NetTools-Profile"
+PROFILE_ID_HEADER = "X-NetTools-Profile-Id"
+# stacks kept per saved profile, heaviest first
+TOP_STACKS = 2000
+
+PROFILE_NOT_FOUND = {"error": "프로파일이 없습니다."}
+
+# (file name, function) of frames where a thread is idle rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("queues.py", "get"),
+    ("connection.py", "_recv"),
+    ("connection.py", "_poll"),
+}
+_ID_RE = re.compile(r"[A-Za-z0-9_-]+$")
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _pattern_text(pattern: re.Pattern) -> str:
+    # bytes twins (vendor_parsers.as_bytes) report as their str source
+    p = pattern.pattern
+    return p if isinstance(p, str) else p.decode("utf-8", errors="replace")
+
+
+def _searched_pattern(frame) -> str | None:
+    # a regex scan is C code, so the innermost Python frame is its caller;
+    # the pattern it is running is one of that frame's locals
+    try:
+        values = list(frame.f_locals.values())
+    except Exception:
+        return None
+    for value in values:
+        if isinstance(value, re.Pattern):
+            return _pattern_text(value)[:200]
+    return None
+
+
+def folded_stack(frame, prefix: str = "") -> str | None:
+    """``root;...;leaf`` for a thread's current frame, None if it is idle."""
+    code = frame.f_code
+    if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+        return None
+    labels = []
+    pattern = _searched_pattern(frame)
+    if pattern is not None:
+        labels.append("re " + pattern.replace(";", ","))
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    if prefix:
+        labels.append(prefix)
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """Adds a count per busy stack to every registered Counter.
+
+    ``threads`` limits sampling to those thread ids; None samples all but the
+    sampler itself. ``prefix()`` may return a root frame label for the sample.
+    """
+
+    def __init__(self, interval: float, threads: set[int] | None = None, prefix=None):
+        self.interval = interval
+        self.threads = threads
+        self.prefix = prefix
+        self._collectors: list[Counter] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread: threading.Thread | None = None
+
+    def add(self, collector: Counter) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+            if self._thread is None:
+                self._stop = False
+                self._thread = threading.Thread(target=self._run, name="nettools-profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, collector: Counter) -> None:
+        with self._lock:
+            self._collectors = [c for c in self._collectors if c is not collector]
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop = True
+            thread, self._thread = self._thread, None
+        self._wake.set()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def sample(self) -> None:
+        with self._lock:
+            collectors = list(self._collectors)
+        if not collectors:
+            return
+        own = threading.get_ident()
+        prefix = self.prefix() if self.prefix is not None else ""
+        for tid, frame in sys._current_frames().items():
+            if tid == own:
+                continue
+            if self.threads is None:
+                if tid in _claimed:
+                    continue
+            elif tid not in self.threads:
+                continue
+            stack = folded_stack(frame, prefix)
+            if stack is None:
+                continue
+            for collector in collectors:
+                collector[stack] += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if self._stop:
+                    return
+                idle = not self._collectors
+            if idle:
+                # nothing to profile: sleep until a collector is added
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            self.sample()
+            time.sleep(self.interval)
+
+
+_sampler = StackSampler(SAMPLE_INTERVAL)
+# threads running sampled_chunk, which samples them itself
+_claimed: set[int] = set()
+
+
+class Profile:
+    def __init__(self, method: str, path: str, forced: bool):
+        self.id = time.strftime("%Y%m%d-%H%M%S-") + secrets.token_hex(4)
+        self.method = method
+        self.path = path
+        self.route = ""
+        self.forced = forced
+        self.status = 0
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+        # (filename, size, digest) of every parsed input
+        self.inputs: list[tuple[str, int, str]] = []
+        # (files, seconds) per parse pool item or batch
+        self.parse_times: list[tuple[str, float]] = []
+        # (files, pattern, seconds, calls), header requests only
+        self.pattern_times: list[tuple[str, str, float, int]] = []
+
+    def input_hash(self) -> str:
+        h = hashlib.blake2b(digest_size=20)
+        for digest in sorted(d for _name, _size, d in self.inputs):
+            h.update(digest.encode())
+        return h.hexdigest()
+
+    def patterns(self) -> list[dict]:
+        """Regex time per pattern over all files, slowest first."""
+        totals: dict[str, list] = {}
+        for files, pattern, seconds, calls in self.pattern_times:
+            entry = totals.setdefault(pattern, [0.0, 0, files, 0.0])
+            entry[0] += seconds
+            entry[1] += calls
+            if seconds > entry[3]:
+                entry[2], entry[3] = files, seconds
+        ranked = sorted(totals.items(), key=lambda kv: kv[1][0], reverse=True)[:20]
+        return [
+            {"pattern": p, "seconds": round(sec, 4), "calls": calls, "slowest_file": files}
+            for p, (sec, calls, files, _worst) in ranked
+        ]
+
+    def summary(self) -> dict:
+        slowest = sorted(self.parse_times, key=lambda t: t[1], reverse=True)[:10]
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "forced": self.forced,
+            "started_at": self.started_at,
+            "duration": round(self.duration, 3),
+            "samples": sum(self.stacks.values()),
+            "interval": SAMPLE_INTERVAL,
+            "input_hash": self.input_hash() if self.inputs else None,
+            "files": len(self.inputs),
+            "bytes": sum(size for _name, size, _d in self.inputs),
+            "slowest_parse": [{"files": name, "seconds": round(sec, 3)} for name, sec in slowest],
+            "patterns": self.patterns(),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            **self.summary(),
+            "inputs": [{"filename": n, "size": s, "digest": d} for n, s, d in self.inputs],
+            "parse_times": [{"files": name, "seconds": round(sec, 4)} for name, sec in self.parse_times],
+            "pattern_times": [
+                {"files": f, "pattern": p, "seconds": round(sec, 5), "calls": calls}
+                for f, p, sec, calls in sorted(self.pattern_times, key=lambda t: t[2], reverse=True)[:TOP_STACKS]
+            ],
+            "stacks": dict(self.stacks.most_common(TOP_STACKS)),
+        }
+
+
+_current: contextvars.ContextVar[Profile | None] = contextvars.ContextVar("nettools_profile", default=None)
+
+
+def chunk_mode() -> str | None:
+    """How parse chunks of the current request run: None, "sample" or "trace"."""
+    profile = _current.get()
+    if profile is None:
+        return None
+    return "trace" if profile.forced else "sample"
+
+
+def note_inputs(sources, digests: list[str]) -> None:
+    profile = _current.get()
+    if profile is not None:
+        profile.inputs.extend((src.filename, src.size, d) for src, d in zip(sources, digests))
+
+
+class SampledResults(list):
+    """A parse chunk's results plus its samples and timings."""
+
+    stacks: dict[str, int]
+    parse_times: list[tuple[str, float]]
+    pattern_times: list[tuple[str, str, float, int]]
+
+
+class PatternTimer:
+    """``sys.setprofile`` hook summing the time of calls into compiled patterns."""
+
+    def __init__(self):
+        self.seconds: Counter = Counter()
+        self.calls: Counter = Counter()
+        self._pattern: str | None = None
+        self._t0 = 0.0
+
+    def __call__(self, frame, event, arg):
+        if event == "c_call":
+            owner = getattr(arg, "__self__", None)
+            if isinstance(owner, re.Pattern):
+                self._pattern = _pattern_text(owner)
+                self._t0 = time.perf_counter()
+        elif self._pattern is not None and event in ("c_return", "c_exception"):
+            if isinstance(getattr(arg, "__self__", None), re.Pattern):
+                self.seconds[self._pattern] += time.perf_counter() - self._t0
+                self.calls[self._pattern] += 1
+                self._pattern = None
+
+    def drain(self, files: str) -> list[tuple[str, str, float, int]]:
+        rows = [(files, p[:200], sec, self.calls[p]) for p, sec in self.seconds.items()]
+        self.seconds.clear()
+        self.calls.clear()
+        return rows
+
+
+def _label(item) -> str:
+    return getattr(item, "filename", None) or type(item).__name__
+
+
+def sampled_chunk(fn, chunk: list, batched: bool, mode: str) -> SampledResults:
+    """Run a parse chunk under a sampler of this thread ("trace": and a PatternTimer)."""
+    tid = threading.get_ident()
+    current = [""]
+    stacks: Counter = Counter()
+    sampler = StackSampler(SAMPLE_INTERVAL, {tid}, lambda: current[0])
+    timer = PatternTimer() if mode == "trace" else None
+    results = SampledResults()
+    times: list[tuple[str, float]] = []
+    pattern_times: list[tuple[str, str, float, int]] = []
+    # items of a batch are parsed together, so they are timed together
+    groups = [chunk] if batched else [[item] for item in chunk]
+    _claimed.add(tid)
+    sampler.add(stacks)
+    try:
+        for group in groups:
+            names = ", ".join(_label(item) for item in group)
+            current[0] = "file " + names.replace(";", ",")
+            t0 = time.perf_counter()
+            if timer is not None:
+                sys.setprofile(timer)
+            try:
+                results.extend(fn(group) if batched else [fn(group[0])])
+            finally:
+                if timer is not None:
+                    sys.setprofile(None)
+            times.append((names, time.perf_counter() - t0))
+            if timer is not None:
+                pattern_times.extend(timer.drain(names))
+    finally:
+        sampler.stop()
+        _claimed.discard(tid)
+    results.stacks = dict(stacks)
+    results.parse_times = times
+    results.pattern_times = pattern_times
+    return results
+
+
+def merge_chunk(part: list) -> None:
+    """Fold a worker's samples into the current request's profile."""
+    profile = _current.get()
+    stacks = getattr(part, "stacks", None)
+    if profile is None or stacks is None:
+        return
+    profile.stacks.update({"parse-worker;" + stack: n for stack, n in stacks.items()})
+    profile.parse_times.extend(part.parse_times)
+    profile.pattern_times.extend(part.pattern_times)
+
+
+class ProfileStore:
+    def __init__(self, directory: str, keep: int):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str) -> str | None:
+        if not _ID_RE.match(profile_id):
+            return None
+        return os.path.join(self.directory, profile_id + ".json")
+
+    def save(self, profile: Profile) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(profile.id)
+        with open(path + ".part", "w", encoding="utf-8") as fh:
+            json.dump(profile.to_dict(), fh, ensure_ascii=False)
+        os.replace(path + ".part", path)
+        with self._lock:
+            for old in self._files()[self.keep:]:
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass
+
+    def _files(self) -> list[str]:
+        try:
+            entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        return [e.path for e in sorted(entries, key=lambda e: e.name, reverse=True)]
+
+    def load(self, profile_id: str) -> dict | None:
+        path = self._path(profile_id)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (TypeError, OSError, ValueError):
+            return None
+
+    def list(self) -> list[dict]:
+        summaries = []
+        for path in self._files():
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    data = json.load(fh)
+            except (OSError, ValueError):
+                continue
+            data.pop("stacks", None)
+            data.pop("inputs", None)
+            data.pop("parse_times", None)
+            summaries.append(data)
+        return summaries
+
+    def remove(self, profile_id: str) -> bool:
+        path = self._path(profile_id)
+        try:
+            os.remove(path)
+            return True
+        except (TypeError, OSError):
+            return False
+
+
+store = ProfileStore(PROFILE_DIR, PROFILE_KEEP)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not PROFILE or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        forced = headers.get(PROFILE_HEADER.lower().encode(), b"").strip() in (b"1", b"true", b"yes")
+        if not forced and SLOW_SECONDS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], forced)
+        token = _current.set(profile)
+        t0 = time.perf_counter()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                if forced:
+                    message = {
+                        **message,
+                        "headers": [*message.get("headers", []), (PROFILE_ID_HEADER.lower().encode(), profile.id.encode())],
+                    }
+            await send(message)
+
+        _sampler.add(profile.stacks)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _sampler.remove(profile.stacks)
+            _current.reset(token)
+            profile.duration = time.perf_counter() - t0
+            profile.route = getattr(scope.get("route"), "path", "") or ""
+            if forced or profile.duration >= SLOW_SECONDS:
+                spawn_blocking(store.save, profile)
+
+
+@router.get("/profiles")
+async def list_profiles():
+    return {"enabled": PROFILE, "slow_seconds": SLOW_SECONDS, "items": await run_blocking(store.list)}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    data = await run_blocking(store.load, profile_id)
+    if data is None:
+        return JSONResponse(PROFILE_NOT_FOUND, status_code=404)
+    return data
+
+
+@router.get("/profiles/{profile_id}/folded")
+async def get_profile_folded(profile_id: str):
+    data = await run_blocking(store.load, profile_id)
+    if data is None:
+        return JSONResponse(PROFILE_NOT_FOUND, status_code=404)
+    return PlainTextResponse("".join(f"{stack} {n}\n" for stack, n in data["stacks"].items()))
+
+
+@router.delete("/profiles/{profile_id}")
+async def delete_profile(profile_id: str):
+    if not await run_blocking(store.remove, profile_id):
+        return JSONResponse(PROFILE_NOT_FOUND, status_code=404)
+    return {"deleted": profile_id}
@@ -1,69 +1,58 @@
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, UploadFile, File, Form, Response
 from fastapi.responses import StreamingResponse
-import io
-import zipfile
 
-router = APIRouter()
-
-
-def _parse_name_ip_list(text: str):
-    pairs: list[tuple[str, str]] = []
-    for line in text.splitlines():
-        parts = line.strip().split()
-        if len(parts) >= 2:
-            name, ip = parts[0], parts[1]
-            pairs.append((name, ip))
-    return pairs
+from .metrics import timed
+from .offload import iterate_blocking
+from .securecrt_template import SessionTemplate, parse_host_list
+from .sessions import attach_session, session_expired, store
+from .zip_stream import stream_zip
 
-
-def _build_ini_from_template(template_text: str, ip: str) -> str:
-    out_lines = []
-    for line in template_text.splitlines(keepends=True):
-        if line.strip().startswith('S:"Hostname"='):
-            # preserve newline style by using existing line ending
-            ending = "\r\n" if line.endswith("\r\n") else ("\n" if line.endswith("\n") else "")
-            out_lines.append(f'S:"Hostname"={ip}{ending}')
-        else:
-            out_lines.append(line)
-    return "".join(out_lines)
+router = APIRouter()
 
 
 @router.post("/securecrt/hostname/preview")
 async def securecrt_hostname_preview(
+    response: Response,
     template: UploadFile = File(...),
     hostlist: UploadFile = File(...),
 ):
     template_text = (await template.read()).decode("utf-8", errors="ignore")
     host_text = (await hostlist.read()).decode("utf-8", errors="ignore")
-    pairs = _parse_name_ip_list(host_text)
-    results = []
-    for name, ip in pairs:
-        safe_name = name.replace(" ", "_")
-        out_name = f"{ip}_{safe_name}.ini"
-        results.append({"name": name, "ip": ip, "output": out_name})
-    return results
+    try:
+        rows = parse_host_list(host_text)
+    except ValueError as e:
+        return {"error": str(e)}
+    attach_session(response, "securecrt-hostname", (template_text, rows))
+    return [{"name": row.name, "ip": row.ip, "output": row.output} for row in rows]
 
 
 @router.post("/securecrt/hostname/generate")
 async def securecrt_hostname_generate(
-    template: UploadFile = File(...),
-    hostlist: UploadFile = File(...),
+    template: UploadFile | None = File(None),
+    hostlist: UploadFile | None = File(None),
+    session: str | None = Form(None),
 ):
-    template_text = (await template.read()).decode("utf-8", errors="ignore")
-    host_text = (await hostlist.read()).decode("utf-8", errors="ignore")
-    pairs = _parse_name_ip_list(host_text)
-
-    zip_stream = io.BytesIO()
-    with zipfile.ZipFile(zip_stream, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for name, ip in pairs:
-            safe_name = name.replace(" ", "_")
-            out_name = f"{ip}_{safe_name}.ini"
-            ini_text = _build_ini_from_template(template_text, ip)
-            zf.writestr(out_name, ini_text)
+    if session or template is None or hostlist is None:
+        state = store.get("securecrt-hostname", session)
+        if state is None:
+            return session_expired()
+        template_text, rows = state
+    else:
+        template_text = (await template.read()).decode("utf-8", errors="ignore")
+        host_text = (await hostlist.read()).decode("utf-8", errors="ignore")
+        try:
+            rows = parse_host_list(host_text)
+        except ValueError as e:
+            return {"error": str(e)}
+
+    compiled = SessionTemplate(template_text)
+
+    def entries():
+        for row in rows:
+            yield row.output, compiled.render(row.values(compiled))
 
-    zip_stream.seek(0)
     return StreamingResponse(
-        zip_stream,
+        iterate_blocking(timed(stream_zip(entries()), "zip")),
         media_type="application/zip",
         headers={"Content-Disposition": "attachment; filename=securecrt-sessions.zip"},
     )
@@ -1,82 +1,93 @@
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, Response
 from fastapi.responses import StreamingResponse
-import io
-import zipfile
-import ipaddress
-
-router = APIRouter()
 
+from .ip_ranges import address_ranges
+from .metrics import timed
+from .offload import iterate_blocking
+from .securecrt_template import HOSTNAME_KEY, SessionTemplate
+from .sessions import attach_session, session_expired, store
+from .zip_stream import stream_zip
 
-def _ip_range(start_ip: str, end_ip: str) -> list[str]:
-    start = int(ipaddress.IPv4Address(start_ip))
-    end = int(ipaddress.IPv4Address(end_ip))
-    if end < start:
-        start, end = end, start
-    return [str(ipaddress.IPv4Address(i)) for i in range(start, end + 1)]
+router = APIRouter()
 
 
 def _read_labels(file_text: str) -> list[str]:
     return [line.strip() for line in file_text.splitlines() if line.strip()]
 
 
-def _build_ini_from_template(template_text: str, ip: str) -> str:
-    out_lines = []
-    for line in template_text.splitlines(keepends=True):
-        if line.strip().startswith('S:"Hostname"='):
-            ending = "\r\n" if line.endswith("\r\n") else ("\n" if line.endswith("\n") else "")
-            out_lines.append(f'S:"Hostname"={ip}{ending}')
-        else:
-            out_lines.append(line)
-    return "".join(out_lines)
+def _output_name(ip: str, label: str) -> str:
+    # ':' is not allowed in Windows file names, where SecureCRT reads sessions
+    return f"{ip.replace(':', '-')}_{label.replace(' ', '_')}.ini"
 
 
 @router.post("/securecrt/iprange/preview")
 async def securecrt_iprange_preview(
+    response: Response,
     template: UploadFile = File(...),
     labels: UploadFile = File(...),
-    start_ip: str = Form(...),
-    end_ip: str = Form(...),
+    start_ip: str | None = Form(None),
+    end_ip: str | None = Form(None),
+    ranges: str | None = Form(None),
+    exclude: str | None = Form(None),
 ):
     template_text = (await template.read()).decode("utf-8", errors="ignore")
     labels_text = (await labels.read()).decode("utf-8", errors="ignore")
-    ip_list = _ip_range(start_ip, end_ip)
     label_list = _read_labels(labels_text)
-    if len(label_list) < len(ip_list):
+    try:
+        addresses = address_ranges(start_ip, end_ip, ranges, exclude)
+        count = addresses.check_limit()
+    except ValueError as e:
+        return {"error": str(e)}
+    if len(label_list) < count:
         return {"error": "라벨 개수가 IP 개수보다 적습니다."}
 
     results = []
-    for ip, label in zip(ip_list, label_list):
-        safe_label = label.replace(" ", "_")
-        out_name = f"{ip}_{safe_label}.ini"
+    for ip, label in zip(addresses, label_list):
+        out_name = _output_name(ip, label)
         results.append({"ip": ip, "label": label, "output": out_name})
+    attach_session(response, "securecrt-iprange", (template_text, addresses, label_list))
     return results
 
 
 @router.post("/securecrt/iprange/generate")
 async def securecrt_iprange_generate(
-    template: UploadFile = File(...),
-    labels: UploadFile = File(...),
-    start_ip: str = Form(...),
-    end_ip: str = Form(...),
+    template: UploadFile | None = File(None),
+    labels: UploadFile | None = File(None),
+    start_ip: str | None = Form(None),
+    end_ip: str | None = Form(None),
+    ranges: str | None = Form(None),
+    exclude: str | None = Form(None),
+    session: str | None = Form(None),
 ):
-    template_text = (await template.read()).decode("utf-8", errors="ignore")
-    labels_text = (await labels.read()).decode("utf-8", errors="ignore")
-    ip_list = _ip_range(start_ip, end_ip)
-    label_list = _read_labels(labels_text)
-    if len(label_list) < len(ip_list):
+    if session or template is None or labels is None:
+        state = store.get("securecrt-iprange", session)
+        if state is None:
+            return session_expired()
+        template_text, addresses, label_list = state
+    else:
+        template_text = (await template.read()).decode("utf-8", errors="ignore")
+        labels_text = (await labels.read()).decode("utf-8", errors="ignore")
+        label_list = _read_labels(labels_text)
+        try:
+            addresses = address_ranges(start_ip, end_ip, ranges, exclude)
+        except ValueError as e:
+            return {"error": str(e)}
+    try:
+        count = addresses.check_limit()
+    except ValueError as e:
+        return {"error": str(e)}
+    if len(label_list) < count:
         return {"error": "라벨 개수가 IP 개수보다 적습니다."}
 
-    zip_stream = io.BytesIO()
-    with zipfile.ZipFile(zip_stream, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for ip, label in zip(ip_list, label_list):
-            safe_label = label.replace(" ", "_")
-            out_name = f"{ip}_{safe_label}.ini"
-            ini_text = _build_ini_from_template(template_text, ip)
-            zf.writestr(out_name, ini_text)
+    compiled = SessionTemplate(template_text)
+
+    def entries():
+        for ip, label in zip(addresses, label_list):
+            out_name = _output_name(ip, label)
+            yield out_name, compiled.render({HOSTNAME_KEY: ip})
 
-    zip_stream.seek(0)
     return StreamingResponse(
-        zip_stream,
+        iterate_blocking(timed(stream_zip(entries()), "zip")),
         media_type="application/zip",
         headers={"Content-Disposition": "attachment; filename=securecrt-sessions.zip"},
     )
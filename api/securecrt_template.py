@@ -0,0 +1,172 @@
+"""SecureCRT session templates compiled once and rendered per host.
+
+A template is split into static byte segments and ``S:"Key"=`` / ``D:"Key"=``
+slots. Rendering a host copies the segment list, overwrites the slots it has
+values for and joins, so the cost per session no longer depends on re-scanning
+the template; see benchmarks/bench_securecrt.py.
+"""
+import re
+from typing import NamedTuple
+
+HOSTNAME_KEY = 'S:"Hostname"'
+USERNAME_KEY = 'S:"Username"'
+PROTOCOL_KEY = 'S:"Protocol Name"'
+# a "port" column fills whichever of these the template carries
+PORT_KEYS = ('D:"[SSH2] Port"', 'D:"Port"')
+
+# pseudo keys that do not map to a single ini line
+NAME = "name"
+FOLDER = "folder"
+PORT = "port"
+
+COLUMN_ALIASES = {
+    "name": NAME,
+    "session": NAME,
+    "ip": HOSTNAME_KEY,
+    "address": HOSTNAME_KEY,
+    "port": PORT,
+    "user": USERNAME_KEY,
+    "username": USERNAME_KEY,
+    "folder": FOLDER,
+    "protocol": PROTOCOL_KEY,
+}
+
+_KEY_LINE_RE = re.compile(r'([SD]):"([^"]*)"=')
+_KEY_COLUMN_RE = re.compile(r'([SD]):"([^"]*)"$', re.IGNORECASE)
+_HEX_DWORD_RE = re.compile(r"[0-9a-fA-F]{8}$")
+
+
+class SessionTemplate:
+    def __init__(self, template_text: str):
+        self.parts: list[bytes] = []
+        # 'S:"Hostname"' -> [(index into parts, line ending)]
+        self.slots: dict[str, list[tuple[int, bytes]]] = {}
+        self.newline = b"\r\n"
+        for line in template_text.splitlines(keepends=True):
+            stripped = line.strip()
+            m = _KEY_LINE_RE.match(stripped)
+            if m:
+                key = f'{m.group(1)}:"{m.group(2)}"'
+                ending = "\r\n" if line.endswith("\r\n") else ("\n" if line.endswith("\n") else "")
+                self.slots.setdefault(key, []).append((len(self.parts), ending.encode()))
+                if ending:
+                    self.newline = ending.encode()
+            self.parts.append(line.encode("utf-8"))
+        self.port_keys = [key for key in PORT_KEYS if key in self.slots] or [PORT_KEYS[0]]
+
+    def render(self, values: dict[str, str]) -> bytes:
+        """Template bytes with the given keys replaced.
+
+        Keys are full ini keys such as ``S:"Hostname"``; keys the template does
+        not contain are appended as new lines.
+        """
+        parts = self.parts.copy()
+        for key, value in values.items():
+            line = f"{key}={value}".encode("utf-8")
+            slots = self.slots.get(key)
+            if slots is None:
+                if parts and not parts[-1].endswith((b"\n", b"\r")):
+                    parts.append(self.newline)
+                parts.append(line + self.newline)
+                continue
+            for index, ending in slots:
+                parts[index] = line + ending
+        return b"".join(parts)
+
+
+class SessionRow(NamedTuple):
+    name: str
+    ip: str
+    folder: str = ""
+    # extra (ini key, value) pairs taken from the host list columns
+    fields: tuple[tuple[str, str], ...] = ()
+
+    @property
+    def output(self) -> str:
+        out_name = f"{self.ip}_{self.name.replace(' ', '_')}.ini"
+        return f"{self.folder}/{out_name}" if self.folder else out_name
+
+    def values(self, template: SessionTemplate) -> dict[str, str]:
+        values = {HOSTNAME_KEY: self.ip}
+        for key, value in self.fields:
+            if key == PORT:
+                for port_key in template.port_keys:
+                    values[port_key] = value
+            else:
+                values[key] = value
+        return values
+
+
+def _dword(column: str, value: str) -> str:
+    """SecureCRT stores D: values as 8 hex digits; accept decimal or 0x too."""
+    if _HEX_DWORD_RE.match(value):
+        return value.lower()
+    try:
+        number = int(value, 16) if value.lower().startswith("0x") else int(value)
+    except ValueError:
+        raise ValueError(f"{column} 값이 숫자가 아닙니다: {value}") from None
+    if not 0 <= number <= 0xFFFFFFFF:
+        raise ValueError(f"{column} 값이 범위를 벗어났습니다: {value}")
+    return f"{number:08x}"
+
+
+def _column_key(column: str) -> str:
+    key = COLUMN_ALIASES.get(column.lower())
+    if key is not None:
+        return key
+    m = _KEY_COLUMN_RE.match(column)
+    if m is None:
+        raise ValueError(f"알 수 없는 열입니다: {column}")
+    return f'{m.group(1).upper()}:"{m.group(2)}"'
+
+
+def _split_columns(line: str) -> list[str]:
+    # tab separated when pasted from a spreadsheet, so values may contain spaces
+    if "\t" in line:
+        return [part.strip() for part in line.split("\t")]
+    return line.split()
+
+
+def parse_host_list(text: str) -> list[SessionRow]:
+    """Parse ``name ip`` lines, or columns named by a ``#`` header line.
+
+    Without a header only the first two columns are used. A header such as
+    ``# name ip port username folder S:"Emulation"`` maps each column to a
+    session field; raw ``S:"Key"`` / ``D:"Key"`` columns set that ini key.
+    """
+    lines = text.splitlines()
+    header = next((line for line in lines if line.strip()), "")
+    if not header.lstrip().startswith("#"):
+        rows: list[SessionRow] = []
+        for line in lines:
+            parts = line.strip().split()
+            if len(parts) >= 2:
+                rows.append(SessionRow(parts[0], parts[1]))
+        return rows
+
+    keys = [_column_key(col) for col in _split_columns(header.lstrip()[1:]) if col]
+    if NAME not in keys or HOSTNAME_KEY not in keys:
+        raise ValueError("헤더에 name, ip 열이 필요합니다.")
+    name_at, ip_at = keys.index(NAME), keys.index(HOSTNAME_KEY)
+    rows = []
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        parts = _split_columns(line.strip())
+        if len(parts) <= max(name_at, ip_at) or not parts[name_at] or not parts[ip_at]:
+            continue
+        folder = ""
+        fields: list[tuple[str, str]] = []
+        for key, value in zip(keys, parts):
+            if not value or key in (NAME, HOSTNAME_KEY):
+                continue
+            if key == FOLDER:
+                folder = "/".join(p for p in value.replace("\\", "/").split("/") if p not in ("", ".", ".."))
+            elif key == PORT:
+                fields.append((PORT, _dword("port", value)))
+            elif key.startswith("D:"):
+                fields.append((key, _dword(key, value)))
+            else:
+                fields.append((key, value))
+        rows.append(SessionRow(parts[name_at], parts[ip_at], folder, tuple(fields)))
+    return rows
@@ -0,0 +1,97 @@
+"""Logs parsed where they lie on the server, for /extract and /lldp.
+
+Instead of uploading, a request can name a server ``directory`` (walked through
+the /dir/list index; ZIP archives in it are read member by member) and/or
+``paths``: files, archives or directories, e.g. the ``path`` column of a
+/dir/list result, one per form field or per line. They become LogSources
+pointing at the originals, which the parse pool maps into memory in place: no
+multipart upload, no spooled copy. The parse cache keys them by path, size and
+mtime, so unchanged files are not read just to be hashed.
+
+NETTOOLS_LOCAL_ROOTS (``os.pathsep``-separated directories) names what may be
+read; unset, server paths are refused. Unlike /dir/list, which only returns
+names, this sends file contents back (as regex captures), so only ``.log`` and
+``.txt`` files and the ones in ZIP archives are parsed, named explicitly or not.
+"""
+import os
+import zipfile
+
+from .archive import LOG_EXTS, LogSource, zip_sources
+from .dir_index import indexes
+from .metrics import count, span
+from .offload import run_blocking
+
+LOCAL_ROOTS = [os.path.realpath(p) for p in os.getenv("NETTOOLS_LOCAL_ROOTS", "").split(os.pathsep) if p.strip()]
+
+
+def _checked(path: str) -> str:
+    path = os.path.abspath(os.path.expanduser(path.strip()))
+    real = os.path.realpath(path)
+    if not LOCAL_ROOTS:
+        raise ValueError("서버 경로 읽기가 허용되지 않았습니다 (NETTOOLS_LOCAL_ROOTS 미설정)")
+    if not any(os.path.commonpath([root, real]) == root for root in LOCAL_ROOTS):
+        raise ValueError(f"허용되지 않은 경로입니다: {path}")
+    if not os.path.exists(real):
+        raise ValueError(f"경로가 없습니다: {path}")
+    return path
+
+
+def _split_paths(paths: list[str] | None) -> list[str]:
+    return [line.strip() for value in paths or [] for line in value.splitlines() if line.strip()]
+
+
+def _directory_files(directory: str) -> list[str]:
+    index = indexes.get(directory)
+    # incremental: only directories whose mtime moved are listed again
+    index.refresh()
+    return [os.path.join(root, name) for root, names in index.iter_dirs(directory) for name in names]
+
+
+def _collect(directory: str | None, paths: list[str] | None, skip_bad_zip: bool) -> list[LogSource]:
+    files: list[str] = []
+    for path in ([directory] if directory and directory.strip() else []) + _split_paths(paths):
+        path = _checked(path)
+        if os.path.isdir(path):
+            files.extend(_directory_files(path))
+        else:
+            files.append(path)
+
+    sources: list[LogSource] = []
+    seen: set[str] = set()
+    for path in files:
+        real = os.path.realpath(path)
+        if real in seen:
+            continue
+        seen.add(real)
+        name = os.path.basename(path)
+        if name.lower().endswith(".zip"):
+            try:
+                sources.extend(zip_sources(real, LOG_EXTS, in_place=True))
+            except zipfile.BadZipFile:
+                if not skip_bad_zip:
+                    raise
+        elif name.lower().endswith(LOG_EXTS):
+            try:
+                size = os.path.getsize(real)
+            except OSError:
+                continue
+            sources.append(LogSource(name, real, None, size, True))
+    return sources
+
+
+async def server_sources(
+    directory: str | None = None, paths: list[str] | None = None, skip_bad_zip: bool = False
+) -> list[LogSource]:
+    """LogSources for the server files named by ``directory`` and ``paths``.
+
+    Raises ValueError for a path that does not exist or lies outside
+    NETTOOLS_LOCAL_ROOTS, and for any path when that is unset.
+    """
+    with span("walk"):
+        sources = await run_blocking(_collect, directory, paths, skip_bad_zip)
+    count(files=len(sources), bytes=sum(src.size for src in sources))
+    return sources
+
+
+def has_server_paths(directory: str | None, paths: list[str] | None) -> bool:
+    return bool((directory and directory.strip()) or _split_paths(paths))
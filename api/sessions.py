@@ -0,0 +1,105 @@
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import APIRouter, Response
+from fastapi.responses import JSONResponse
+
+router = APIRouter()
+
+# Preview endpoints keep their parsed state here and return a token in the
+# X-NetTools-Session header; the matching export endpoint accepts that token
+# (form field "session") instead of a second upload.
+SESSION_HEADER = "X-NetTools-Session"
+SESSION_TTL = int(os.getenv("NETTOOLS_SESSION_TTL", "900"))
+SESSION_MAX_BYTES = int(os.getenv("NETTOOLS_SESSION_MB", "256")) * 1024 * 1024
+
+SESSION_EXPIRED = {"error": "세션이 만료되었거나 없습니다. 파일을 다시 업로드하세요."}
+
+
+def session_expired() -> JSONResponse:
+    # 410, not 200: clients tell it apart from an export and upload again
+    return JSONResponse(SESSION_EXPIRED, status_code=410)
+
+
+def approx_size(obj) -> int:
+    if isinstance(obj, (str, bytes, bytearray)):
+        return len(obj) + 50
+    if isinstance(obj, dict):
+        return sum(approx_size(k) + approx_size(v) for k, v in obj.items()) + 64
+    if isinstance(obj, (list, tuple)):
+        return sum(approx_size(v) for v in obj) + 8 * len(obj) + 56
+    return 32
+
+
+class SessionStore:
+    def __init__(self, ttl: int, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # token -> (kind, state, size, expires_at); insertion order == expiry order
+        self._items: OrderedDict[str, tuple[str, object, int, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def create(self, kind: str, state, size: int | None = None) -> str | None:
+        size = approx_size(state) if size is None else size
+        if size > self.max_bytes:
+            return None
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            now = time.monotonic()
+            self._purge(now)
+            # memory cap: drop the oldest sessions first
+            while self._items and self._bytes + size > self.max_bytes:
+                self._drop(next(iter(self._items)))
+            self._items[token] = (kind, state, size, now + self.ttl)
+            self._bytes += size
+        return token
+
+    def get(self, kind: str, token: str | None):
+        if not token:
+            return None
+        with self._lock:
+            self._purge(time.monotonic())
+            item = self._items.get(token)
+            if item is None or item[0] != kind:
+                return None
+            return item[1]
+
+    def _drop(self, token: str) -> None:
+        _kind, _state, size, _exp = self._items.pop(token)
+        self._bytes -= size
+
+    def _purge(self, now: float) -> None:
+        while self._items:
+            token, item = next(iter(self._items.items()))
+            if item[3] > now:
+                break
+            self._drop(token)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._purge(time.monotonic())
+            return {
+                "sessions": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+            }
+
+
+store = SessionStore(SESSION_TTL, SESSION_MAX_BYTES)
+
+
+def attach_session(response: Response, kind: str, state, size: int | None = None) -> str | None:
+    token = store.create(kind, state, size)
+    if token:
+        response.headers[SESSION_HEADER] = token
+    return token
+
+
+@router.get("/sessions/stats")
+async def session_stats():
+    return store.stats()
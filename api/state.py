@@ -0,0 +1,46 @@
+"""Where the app keeps state that outlives a restart, and how it is protected.
+
+Files here decide what the app trusts or reports (host keys, the sysName
+inventory, the /dir/list index), so they must not be plantable by another
+local user. NETTOOLS_STATE_DIR (default ~/.nettools) is created 0700 and files
+0600; a file or directory someone else owns or can write to is refused with
+PermissionError, and a symlinked file is not followed. The owner and mode
+checks are POSIX only: Windows reports no owner or group bits.
+"""
+import os
+
+STATE_DIR = os.getenv("NETTOOLS_STATE_DIR") or os.path.join(os.path.expanduser("~"), ".nettools")
+
+
+def state_path(name: str) -> str:
+    return os.path.join(STATE_DIR, name)
+
+
+def check_private(path: str, st: os.stat_result) -> None:
+    # anyone who can replace the file (or its directory) can plant its content
+    if not hasattr(os, "geteuid"):
+        return
+    if st.st_uid != os.geteuid():
+        raise PermissionError(f"{path} is owned by another user")
+    if st.st_mode & 0o022:
+        raise PermissionError(f"{path} is writable by other users")
+
+
+def open_private(path: str, flags: int = os.O_WRONLY | os.O_APPEND) -> int:
+    """``path`` opened with ``flags`` after the checks above; created 0600 in a 0700 directory."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    check_private(directory, os.lstat(directory))
+    fd = os.open(path, flags | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0), 0o600)
+    try:
+        check_private(path, os.fstat(fd))
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def private_file(path: str) -> str:
+    """``path`` created and checked like ``open_private``, for sqlite to open by name."""
+    os.close(open_private(path, os.O_RDONLY))
+    return path
@@ -0,0 +1,934 @@
+"""TFTP server and client for switch config backup and restore.
+
+With NETTOOLS_TFTP=1 the API also listens for TFTP on NETTOOLS_TFTP_PORT
+(69 by default; binding it needs CAP_NET_BIND_SERVICE). Switches can then
+``tftp put`` their configs to it and ``tftp get`` them back. Received files are
+written into NETTOOLS_TFTP_ROOT: first to a hidden ``.part`` file, which
+/dir/list never shows, renamed once the last block arrives. Point /dir/list at
+that directory; every completed upload marks its index stale, so the next
+listing shows the file.
+POST /tftp/fetch and /tftp/push do the opposite: the API is the client and pulls
+configs from, or pushes them to, many devices at once.
+
+Every transfer is a coroutine on the event loop with its own UDP socket (the
+transfer ID of RFC 1350), so a thousand transfers need no thread each. Disk
+reads and writes go through ``run_blocking`` in IO_CHUNK pieces. Supported
+options: blksize (RFC 2348), tsize and timeout (RFC 2349), and windowsize
+(RFC 7440), which sends several blocks per ACK. netascii is transferred like
+octet, because the files are configs, not text to convert. Transfers are
+counted at /metrics (nettools_tftp_*), and /tftp/status lists the running and
+recent ones. benchmarks/bench_tftp.py runs both sides on localhost.
+"""
+import asyncio
+import itertools
+import os
+import socket
+import struct
+import time
+from collections import deque
+
+from fastapi import APIRouter, Form
+
+from .collect import NO_HOSTS, parse_targets
+from .dir_index import indexes, partial_path
+from .metrics import DURATION_BUCKETS, SIZE_BUCKETS, Counter, Gauge, Histogram, register
+from .offload import run_blocking
+
+router = APIRouter()
+
+TFTP_ENABLED = os.getenv("NETTOOLS_TFTP", "0") == "1"
+TFTP_HOST = os.getenv("NETTOOLS_TFTP_HOST", "0.0.0.0")
+TFTP_PORT = int(os.getenv("NETTOOLS_TFTP_PORT", "69"))
+TFTP_ROOT = os.getenv("NETTOOLS_TFTP_ROOT") or None
+READONLY = os.getenv("NETTOOLS_TFTP_READONLY", "0") == "1"
+OVERWRITE = os.getenv("NETTOOLS_TFTP_OVERWRITE", "1") == "1"
+MAX_TRANSFERS = int(os.getenv("NETTOOLS_TFTP_MAX_TRANSFERS", "512"))
+MAX_FILE_BYTES = int(os.getenv("NETTOOLS_TFTP_MAX_MB", "256")) * 1024 * 1024
+TIMEOUT = float(os.getenv("NETTOOLS_TFTP_TIMEOUT", "1"))
+RETRIES = int(os.getenv("NETTOOLS_TFTP_RETRIES", "5"))
+MAX_BLKSIZE = int(os.getenv("NETTOOLS_TFTP_MAX_BLKSIZE", "65464"))
+MAX_WINDOWSIZE = int(os.getenv("NETTOOLS_TFTP_MAX_WINDOWSIZE", "64"))
+# a window larger than the receiver's socket buffer loses its tail, and every
+# lost tail costs a full timeout; windows are cut to this many payload bytes
+MAX_WINDOW_BYTES = int(os.getenv("NETTOOLS_TFTP_MAX_WINDOW_KB", "64")) * 1024
+SOCKET_BUFFER = 1024 * 1024
+# what /tftp/fetch and /tftp/push ask for; devices that ignore options get 512/1
+CLIENT_BLKSIZE = int(os.getenv("NETTOOLS_TFTP_BLKSIZE", "1468"))  # fills a 1500-byte MTU
+CLIENT_WINDOWSIZE = int(os.getenv("NETTOOLS_TFTP_WINDOWSIZE", "4"))
+CLIENT_CONCURRENCY = int(os.getenv("NETTOOLS_TFTP_CLIENT_CONCURRENCY", "64"))
+MAX_DEVICES = int(os.getenv("NETTOOLS_TFTP_MAX_DEVICES", "2000"))
+IO_CHUNK = 256 * 1024
+RECENT = 200
+
+RRQ, WRQ, DATA, ACK, ERROR, OACK = range(1, 7)
+# error codes of RFC 1350 / 2347
+NOT_DEFINED, FILE_NOT_FOUND, ACCESS_VIOLATION, DISK_FULL, ILLEGAL_OPERATION, UNKNOWN_TID, FILE_EXISTS = range(7)
+OPTION_REFUSED = 8
+DEFAULT_BLKSIZE = 512
+
+NO_ROOT = {"error": "TFTP 저장 경로(NETTOOLS_TFTP_ROOT)가 설정되지 않았습니다."}
+TOO_MANY_DEVICES = {"error": f"장비는 한 번에 최대 {MAX_DEVICES}대까지 전송할 수 있습니다."}
+
+TRANSFERS = register(Counter(
+    "nettools_tftp_transfers_total", "TFTP transfers by role, direction and result.", ("role", "direction", "result")
+))
+TRANSFER_BYTES = register(Counter("nettools_tftp_bytes_total", "TFTP payload bytes moved.", ("role", "direction")))
+RETRANSMITS = register(Counter(
+    "nettools_tftp_retransmits_total", "TFTP packets sent again after a timeout.", ("role", "direction")
+))
+ACTIVE = register(Gauge("nettools_tftp_active_transfers", "TFTP transfers in progress."))
+TRANSFER_SECONDS = register(Histogram(
+    "nettools_tftp_transfer_duration_seconds", "Time per completed TFTP transfer.", ("role", "direction"), DURATION_BUCKETS
+))
+THROUGHPUT = register(Histogram(
+    "nettools_tftp_throughput_bytes_per_second", "Payload rate per completed TFTP transfer.", ("role", "direction"),
+    SIZE_BUCKETS,
+))
+
+
+class TftpError(Exception):
+    """A transfer ended by an ERROR packet, sent (``remote=False``) or received."""
+
+    def __init__(self, code: int, message: str, remote: bool = False):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.remote = remote
+
+
+def _request(opcode: int, filename: str, mode: str, options: dict[str, str]) -> bytes:
+    fields = [filename, mode] + [x for kv in options.items() for x in kv]
+    return struct.pack("!H", opcode) + b"".join(f.encode("utf-8") + b"\0" for f in fields)
+
+
+def _fields(payload: bytes) -> list[str]:
+    return [f.decode("utf-8", "replace") for f in payload.split(b"\0")[:-1]]
+
+
+def _options(fields: list[str]) -> dict[str, str]:
+    return {fields[i].lower(): fields[i + 1] for i in range(0, len(fields) - 1, 2)}
+
+
+def _data(block: int, payload: bytes) -> bytes:
+    return struct.pack("!HH", DATA, block & 0xFFFF) + payload
+
+
+def _ack(block: int) -> bytes:
+    return struct.pack("!HH", ACK, block & 0xFFFF)
+
+
+def _oack(options: dict[str, str]) -> bytes:
+    return struct.pack("!H", OACK) + b"".join(f.encode("ascii") + b"\0" for kv in options.items() for f in kv)
+
+
+def _error(code: int, message: str) -> bytes:
+    return struct.pack("!HH", ERROR, code) + message.encode("ascii", "replace") + b"\0"
+
+
+def _opcode(packet: bytes) -> int:
+    return struct.unpack_from("!H", packet)[0] if len(packet) >= 4 else 0
+
+
+def _block(packet: bytes) -> int:
+    return struct.unpack_from("!H", packet, 2)[0]
+
+
+def _raise_error(packet: bytes) -> None:
+    fields = _fields(packet[4:] + b"\0")
+    raise TftpError(_block(packet), fields[0] if fields else "", remote=True)
+
+
+def _int_option(options: dict[str, str], name: str, low: int, high: int) -> int | None:
+    try:
+        value = int(options[name])
+    except (KeyError, ValueError):
+        return None
+    return value if low <= value <= high else None
+
+
+class _Params:
+    """What a transfer runs with once options are settled."""
+
+    def __init__(self, blksize: int = DEFAULT_BLKSIZE, windowsize: int = 1, timeout: float = TIMEOUT):
+        self.blksize = blksize
+        self.windowsize = windowsize
+        self.timeout = timeout
+
+    @classmethod
+    def from_options(cls, options: dict[str, str]) -> "_Params":
+        return cls(
+            _int_option(options, "blksize", 8, 65464) or DEFAULT_BLKSIZE,
+            _int_option(options, "windowsize", 1, 65535) or 1,
+            _int_option(options, "timeout", 1, 255) or TIMEOUT,
+        )
+
+
+def _negotiate(requested: dict[str, str], tsize: int | None) -> dict[str, str]:
+    """The options a server answers in its OACK; unknown or bad ones are left out."""
+    accepted = {}
+    blksize = _int_option(requested, "blksize", 8, 65464)
+    if blksize:
+        accepted["blksize"] = str(min(blksize, MAX_BLKSIZE))
+    timeout = _int_option(requested, "timeout", 1, 255)
+    if timeout:
+        accepted["timeout"] = str(timeout)
+    if "tsize" in requested:
+        # a reader learns the size; a writer's announced size is echoed back
+        accepted["tsize"] = str(tsize) if tsize is not None else requested["tsize"]
+    windowsize = _int_option(requested, "windowsize", 1, 65535)
+    if windowsize:
+        accepted["windowsize"] = str(_window(windowsize, int(accepted.get("blksize", DEFAULT_BLKSIZE))))
+    return accepted
+
+
+def _window(windowsize: int, blksize: int) -> int:
+    return max(1, min(windowsize, MAX_WINDOWSIZE, MAX_WINDOW_BYTES // blksize))
+
+
+class _Endpoint(asyncio.DatagramProtocol):
+    """One UDP socket; received datagrams wait in a queue for the transfer."""
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=1024)
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            self.queue.put_nowait((data, addr))
+        except asyncio.QueueFull:
+            pass  # the sender retransmits
+
+    def error_received(self, exc):
+        # ICMP port unreachable and the like; the retransmit timer gives up in time
+        pass
+
+    def send(self, data: bytes, addr) -> None:
+        self.transport.sendto(data, addr)
+
+    async def recv(self, peer, timeout: float) -> bytes:
+        """The next packet from ``peer``; others are told they have the wrong TID."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError()
+            data, addr = await asyncio.wait_for(self.queue.get(), remaining)
+            if addr[:2] == peer[:2]:
+                return data
+            self.send(_error(UNKNOWN_TID, "Unknown transfer ID"), addr)
+
+    def close(self) -> None:
+        if self.transport is not None:
+            self.transport.close()
+
+
+async def _open_endpoint(family: int = socket.AF_INET) -> _Endpoint:
+    local = ("::", 0) if family == socket.AF_INET6 else ("0.0.0.0", 0)
+    transport, endpoint = await asyncio.get_running_loop().create_datagram_endpoint(_Endpoint, local_addr=local)
+    # room for a whole window even while the loop is busy elsewhere (capped by net.core.rmem_max)
+    transport.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER)
+    return endpoint
+
+
+class Transfer:
+    _ids = itertools.count(1)
+
+    def __init__(self, role: str, direction: str, peer, filename: str, path: str | None):
+        self.id = next(self._ids)
+        self.role = role  # "server" or "client"
+        self.direction = direction  # "receive" (into path) or "send" (from path)
+        self.peer = f"{peer[0]}:{peer[1]}"
+        self.filename = filename
+        self.path = path
+        self.size: int | None = None
+        self.bytes = 0
+        self.blksize = DEFAULT_BLKSIZE
+        self.windowsize = 1
+        self.retransmits = 0
+        self.state = "running"
+        self.error: str | None = None
+        self.created_at = time.time()
+        self._started = time.monotonic()
+        self.seconds = 0.0
+
+    def status(self) -> dict:
+        seconds = self.seconds if self.state != "running" else time.monotonic() - self._started
+        return {
+            "id": self.id,
+            "role": self.role,
+            "direction": self.direction,
+            "peer": self.peer,
+            "filename": self.filename,
+            "path": self.path,
+            "state": self.state,
+            "error": self.error,
+            "size": self.size,
+            "bytes": self.bytes,
+            "blksize": self.blksize,
+            "windowsize": self.windowsize,
+            "retransmits": self.retransmits,
+            "seconds": round(seconds, 3),
+            "created_at": self.created_at,
+        }
+
+
+_active: dict[int, Transfer] = {}
+_recent: deque[Transfer] = deque(maxlen=RECENT)
+
+
+async def _tracked(transfer: Transfer, work) -> Transfer:
+    """Await ``work`` for ``transfer``, recording its outcome; never raises TFTP errors."""
+    _active[transfer.id] = transfer
+    ACTIVE.inc(amount=1)
+    try:
+        await work
+        transfer.state = "done"
+    except TftpError as exc:
+        transfer.state = "failed"
+        prefix = "장비 " if exc.remote else ""
+        transfer.error = f"{prefix}TFTP 오류 {exc.code}: {exc.message}"
+    except (TimeoutError, asyncio.TimeoutError):
+        transfer.state = "failed"
+        transfer.error = "시간 초과"
+    except OSError as exc:
+        transfer.state = "failed"
+        transfer.error = f"전송 실패: {exc.strerror or exc}"
+    finally:
+        if transfer.state == "running":
+            transfer.state = "cancelled"
+        transfer.seconds = time.monotonic() - transfer._started
+        ACTIVE.inc(amount=-1)
+        _active.pop(transfer.id, None)
+        _recent.append(transfer)
+        labels = (transfer.role, transfer.direction)
+        TRANSFERS.inc(*labels, "ok" if transfer.state == "done" else "error")
+        TRANSFER_BYTES.inc(*labels, amount=transfer.bytes)
+        if transfer.retransmits:
+            RETRANSMITS.inc(*labels, amount=transfer.retransmits)
+        if transfer.state == "done":
+            TRANSFER_SECONDS.observe(*labels, value=transfer.seconds)
+            THROUGHPUT.observe(*labels, value=transfer.bytes / max(transfer.seconds, 1e-6))
+    return transfer
+
+
+class _FileSource:
+    """Reads a file in IO_CHUNK pieces on the blocking pool, handing out blocks."""
+
+    def __init__(self, fh, size: int):
+        self.fh = fh
+        self.size = size
+        self._buf = b""
+        self._pos = 0
+        self._eof = False
+
+    @classmethod
+    async def open(cls, path: str) -> "_FileSource":
+        fh = await run_blocking(open, path, "rb")
+        return cls(fh, os.fstat(fh.fileno()).st_size)
+
+    async def read(self, n: int) -> bytes:
+        while len(self._buf) - self._pos < n and not self._eof:
+            chunk = await run_blocking(self.fh.read, max(IO_CHUNK, n))
+            self._eof = not chunk
+            self._buf = self._buf[self._pos:] + chunk
+            self._pos = 0
+        block = self._buf[self._pos:self._pos + n]
+        self._pos += len(block)
+        return block
+
+    def close(self) -> None:
+        self.fh.close()
+
+
+class _FileSink:
+    """Buffers received blocks and writes them to a hidden file renamed on commit."""
+
+    def __init__(self, path: str, limit: int = MAX_FILE_BYTES):
+        self.path = path
+        self.limit = limit
+        self.size = 0
+        self.part = partial_path(path)
+        self._fh = None
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(self.part), exist_ok=True)
+        fd = os.open(self.part, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        self._fh = os.fdopen(fd, "wb")
+
+    async def open(self) -> None:
+        await run_blocking(self._open)
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        if self.size > self.limit:
+            raise TftpError(DISK_FULL, "File too large")
+        self._pending.append(data)
+        self._pending_bytes += len(data)
+        if self._pending_bytes >= IO_CHUNK:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        data = b"".join(self._pending)
+        self._pending.clear()
+        self._pending_bytes = 0
+        await run_blocking(self._fh.write, data)
+
+    def _finish(self) -> None:
+        self._fh.close()
+        os.replace(self.part, self.path)
+
+    async def commit(self) -> None:
+        await self._flush()
+        await run_blocking(self._finish)
+        indexes.invalidate(self.path)
+
+    def abort(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            try:
+                os.remove(self.part)
+            except OSError:
+                pass
+
+
+async def _send_blocks(ep: _Endpoint, peer, source: _FileSource, params: _Params, transfer: Transfer) -> None:
+    """Sender side: DATA blocks in windows of ``params.windowsize``, resent from the last ACK."""
+    acked = 0  # blocks acknowledged so far (absolute, not wrapped)
+    next_block = 1
+    last_block = None  # set once the short (final) block has been read
+    window: dict[int, bytes] = {}
+    tries = 0
+    # the retransmit timer runs from the last window sent; ignored packets don't reset it
+    deadline = None
+    while True:
+        while next_block <= acked + params.windowsize and (last_block is None or next_block <= last_block):
+            payload = window.get(next_block)
+            if payload is None:
+                payload = window[next_block] = await source.read(params.blksize)
+                if len(payload) < params.blksize:
+                    last_block = next_block
+            ep.send(_data(next_block, payload), peer)
+            next_block += 1
+            deadline = None
+        if deadline is None:
+            deadline = time.monotonic() + params.timeout
+        try:
+            packet = await ep.recv(peer, deadline - time.monotonic())
+        except TimeoutError:
+            tries += 1
+            if tries > RETRIES:
+                raise
+            transfer.retransmits += 1
+            next_block = acked + 1
+            continue
+        opcode = _opcode(packet)
+        if opcode == ERROR:
+            _raise_error(packet)
+        if opcode != ACK:
+            continue
+        # 16-bit block numbers wrap; an ACK only ever moves forward within the window
+        delta = (_block(packet) - acked) & 0xFFFF
+        if delta > next_block - 1 - acked:
+            continue
+        if delta == 0:
+            # a duplicate ACK: with one block per ACK, resending would double every
+            # later block (the Sorcerer's Apprentice bug); with windows it asks to resend
+            if params.windowsize > 1 and next_block - 1 > acked:
+                next_block = acked + 1
+            continue
+        for block in range(acked + 1, acked + delta + 1):
+            transfer.bytes += len(window.pop(block))
+        acked += delta
+        tries = 0
+        if last_block is not None and acked >= last_block:
+            return
+        # an ACK short of the window's end means the receiver lost the next block
+        next_block = acked + 1
+
+
+async def _receive_blocks(ep: _Endpoint, peer, sink: _FileSink, params: _Params, transfer: Transfer,
+                          reply: bytes, first: bytes | None = None) -> bytes:
+    """Receiver side: writes DATA blocks to ``sink``; returns the final ACK, unsent.
+
+    The caller sends it once the file is committed, so a finished upload is
+    already in place when the sender hears about it. ``reply`` is resent when
+    nothing new arrives in time (ACK 0, OACK or an RRQ at first); ``first`` is a
+    DATA packet that already came with the handshake.
+    """
+    received = 0
+    since_ack = 0
+    nacked = -1
+    tries = 0
+    # runs from the last block that arrived in order: duplicates of a resent
+    # window must not keep the receiver quiet while the sender waits for an ACK
+    deadline = time.monotonic() + params.timeout
+    while True:
+        if first is not None:
+            packet, first = first, None
+        else:
+            try:
+                packet = await ep.recv(peer, deadline - time.monotonic())
+            except TimeoutError:
+                tries += 1
+                if tries > RETRIES:
+                    raise
+                transfer.retransmits += 1
+                # once blocks have arrived, the ACK of the last one in order
+                # restarts a windowed sender from the right place
+                if received:
+                    reply = _ack(received)
+                ep.send(reply, peer)
+                since_ack = 0
+                deadline = time.monotonic() + params.timeout
+                continue
+        opcode = _opcode(packet)
+        if opcode == ERROR:
+            _raise_error(packet)
+        if opcode != DATA:
+            continue
+        if ((_block(packet) - received) & 0xFFFF) != 1:
+            # out of order: acknowledge what arrived in order (once per gap) so
+            # the sender restarts from there
+            if nacked != received:
+                nacked = received
+                reply = _ack(received)
+                ep.send(reply, peer)
+                since_ack = 0
+            continue
+        payload = packet[4:]
+        if len(payload) > params.blksize:
+            raise TftpError(ILLEGAL_OPERATION, "Block larger than blksize")
+        await sink.write(payload)
+        received += 1
+        transfer.bytes += len(payload)
+        tries = 0
+        since_ack += 1
+        deadline = time.monotonic() + params.timeout
+        if len(payload) < params.blksize:
+            return _ack(received)
+        if since_ack >= params.windowsize:
+            reply = _ack(received)
+            ep.send(reply, peer)
+            since_ack = 0
+
+
+async def _handshake(ep: _Endpoint, peer, packet: bytes, timeout: float, transfer: Transfer) -> None:
+    """Send ``packet`` (an OACK) until the peer acknowledges block 0."""
+    for attempt in range(RETRIES + 1):
+        if attempt:
+            transfer.retransmits += 1
+        ep.send(packet, peer)
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                reply = await ep.recv(peer, remaining)
+            except TimeoutError:
+                break
+            if _opcode(reply) == ERROR:
+                _raise_error(reply)
+            if _opcode(reply) == ACK and _block(reply) == 0:
+                return
+    raise TimeoutError()
+
+
+async def _dally(ep: _Endpoint, peer, final_ack: bytes, timeout: float) -> None:
+    """After the final ACK, answer a resent final block in case that ACK was lost."""
+    try:
+        while True:
+            try:
+                packet = await ep.recv(peer, timeout)
+            except TimeoutError:
+                return
+            if _opcode(packet) == DATA:
+                ep.send(final_ack, peer)
+    finally:
+        ep.close()
+
+
+_background: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    return task
+
+
+def resolve_path(root: str, filename: str) -> str | None:
+    """``filename`` under ``root``, or None when it would leave the root."""
+    name = filename.replace("\\", "/").lstrip("/")
+    real_root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(real_root, name))
+    if not name or not path.startswith(os.path.join(real_root, "")):
+        return None
+    return path
+
+
+class _ServerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, server: "TftpServer"):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server.request(data, addr)
+
+    def error_received(self, exc):
+        pass
+
+
+class TftpServer:
+    def __init__(self, root: str, host: str = TFTP_HOST, port: int = TFTP_PORT, readonly: bool = READONLY):
+        self.root = root
+        self.host = host
+        self.port = port
+        self.readonly = readonly
+        self.family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        self._transport = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        self._transport, _protocol = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: _ServerProtocol(self), local_addr=(self.host, self.port)
+        )
+        # port 0 binds an ephemeral port; report the real one
+        self.port = self._transport.get_extra_info("sockname")[1]
+
+    async def stop(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    @property
+    def running(self) -> bool:
+        return self._transport is not None
+
+    def request(self, packet: bytes, addr) -> None:
+        opcode = _opcode(packet)
+        if opcode not in (RRQ, WRQ):
+            # stray DATA/ACK to the listening port: not a transfer we know
+            if opcode:
+                self._transport.sendto(_error(UNKNOWN_TID, "Unknown transfer ID"), addr)
+            return
+        if len(_active) >= MAX_TRANSFERS:
+            self._transport.sendto(_error(NOT_DEFINED, "Server busy, try again later"), addr)
+            return
+        fields = _fields(packet[2:])
+        if len(fields) < 2:
+            self._transport.sendto(_error(ILLEGAL_OPERATION, "Malformed request"), addr)
+            return
+        task = asyncio.create_task(self._serve(opcode, fields[0], _options(fields[2:]), addr))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _serve(self, opcode: int, filename: str, options: dict[str, str], peer) -> None:
+        ep = await _open_endpoint(self.family)
+        path = resolve_path(self.root, filename)
+        if opcode == RRQ:
+            transfer = Transfer("server", "send", peer, filename, path)
+            work = self._send_file(ep, peer, path, options, transfer)
+        else:
+            transfer = Transfer("server", "receive", peer, filename, path)
+            work = self._receive_file(ep, peer, path, options, transfer)
+        dallying = False
+        try:
+            await _tracked(transfer, work)
+            dallying = transfer.state == "done" and opcode == WRQ
+        finally:
+            if not dallying:
+                ep.close()
+
+    async def _send_file(self, ep: _Endpoint, peer, path: str | None, options: dict[str, str], transfer: Transfer):
+        if path is None:
+            raise self._refuse(ep, peer, ACCESS_VIOLATION, "Access violation")
+        try:
+            source = await _FileSource.open(path)
+        except FileNotFoundError:
+            raise self._refuse(ep, peer, FILE_NOT_FOUND, "File not found")
+        except OSError:
+            raise self._refuse(ep, peer, ACCESS_VIOLATION, "Access violation")
+        try:
+            transfer.size = source.size
+            accepted = _negotiate(options, source.size)
+            params = _Params.from_options(accepted)
+            transfer.blksize, transfer.windowsize = params.blksize, params.windowsize
+            if accepted:
+                await _handshake(ep, peer, _oack(accepted), params.timeout, transfer)
+            await _send_blocks(ep, peer, source, params, transfer)
+        except TftpError as exc:
+            if not exc.remote:
+                ep.send(_error(exc.code, exc.message), peer)
+            raise
+        finally:
+            source.close()
+
+    async def _receive_file(self, ep: _Endpoint, peer, path: str | None, options: dict[str, str], transfer: Transfer):
+        if self.readonly or path is None:
+            raise self._refuse(ep, peer, ACCESS_VIOLATION, "Access violation")
+        if not OVERWRITE and os.path.exists(path):
+            raise self._refuse(ep, peer, FILE_EXISTS, "File already exists")
+        size = _int_option(options, "tsize", 0, 2 ** 63)
+        if size is not None and size > MAX_FILE_BYTES:
+            raise self._refuse(ep, peer, DISK_FULL, "File too large")
+        transfer.size = size or None
+        sink = _FileSink(path)
+        try:
+            await sink.open()
+        except OSError:
+            raise self._refuse(ep, peer, ACCESS_VIOLATION, "Access violation")
+        try:
+            accepted = _negotiate(options, None)
+            params = _Params.from_options(accepted)
+            transfer.blksize, transfer.windowsize = params.blksize, params.windowsize
+            reply = _oack(accepted) if accepted else _ack(0)
+            ep.send(reply, peer)
+            final_ack = await _receive_blocks(ep, peer, sink, params, transfer, reply)
+            await sink.commit()
+            ep.send(final_ack, peer)
+        except TftpError as exc:
+            sink.abort()
+            if not exc.remote:
+                ep.send(_error(exc.code, exc.message), peer)
+            raise
+        except BaseException:
+            sink.abort()
+            raise
+        _spawn(_dally(ep, peer, final_ack, params.timeout))
+
+    @staticmethod
+    def _refuse(ep: _Endpoint, peer, code: int, message: str) -> TftpError:
+        ep.send(_error(code, message), peer)
+        return TftpError(code, message)
+
+
+server: TftpServer | None = None
+
+
+async def start_tftp() -> None:
+    global server
+    if not TFTP_ENABLED or not TFTP_ROOT:
+        return
+    server = TftpServer(TFTP_ROOT)
+    await server.start()
+
+
+async def stop_tftp() -> None:
+    global server
+    if server is not None:
+        await server.stop()
+        server = None
+    for task in list(_background):
+        task.cancel()
+
+
+def _client_options(params: _Params, tsize: int) -> dict[str, str]:
+    options = {"tsize": str(tsize)}
+    if params.blksize != DEFAULT_BLKSIZE:
+        options["blksize"] = str(params.blksize)
+    windowsize = _window(params.windowsize, params.blksize)
+    if windowsize != 1:
+        options["windowsize"] = str(windowsize)
+    return options
+
+
+async def _resolve(host: str, port: int):
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_DGRAM)
+    family, _type, _proto, _name, addr = infos[0]
+    return family, addr
+
+
+async def _first_reply(ep: _Endpoint, request: bytes, server_addr, timeout: float, transfer: Transfer):
+    """Send ``request`` until the server answers; returns the packet and the server's TID."""
+    for attempt in range(RETRIES + 1):
+        if attempt:
+            transfer.retransmits += 1
+        ep.send(request, server_addr)
+        deadline = time.monotonic() + timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                packet, addr = await asyncio.wait_for(ep.queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            # the answer comes from a new port of the same host
+            if addr[0] == server_addr[0]:
+                if _opcode(packet) == ERROR:
+                    _raise_error(packet)
+                return packet, addr
+    raise TimeoutError()
+
+
+async def fetch(host: str, port: int, remote: str, path: str,
+                blksize: int = CLIENT_BLKSIZE, windowsize: int = CLIENT_WINDOWSIZE) -> Transfer:
+    """Download ``remote`` from a TFTP server into ``path``."""
+    transfer = Transfer("client", "receive", (host, port), remote, path)
+    return await _tracked(transfer, _fetch(host, port, remote, path, _Params(blksize, windowsize), transfer))
+
+
+async def _fetch(host: str, port: int, remote: str, path: str, wanted: _Params, transfer: Transfer) -> None:
+    family, server_addr = await _resolve(host, port)
+    ep = await _open_endpoint(family)
+    dallying = False
+    sink = None
+    try:
+        request = _request(RRQ, remote, "octet", _client_options(wanted, 0))
+        packet, peer = await _first_reply(ep, request, server_addr, wanted.timeout, transfer)
+        first = None
+        if _opcode(packet) == OACK:
+            answered = _options(_fields(packet[2:]))
+            params = _Params.from_options(answered)
+            transfer.size = _int_option(answered, "tsize", 0, 2 ** 63)
+            if transfer.size is not None and transfer.size > MAX_FILE_BYTES:
+                ep.send(_error(DISK_FULL, "File too large"), peer)
+                raise TftpError(DISK_FULL, "File too large")
+            reply = _ack(0)
+            ep.send(reply, peer)
+        else:
+            # the server ignored the options: plain RFC 1350
+            params, first, reply = _Params(), packet, request
+        transfer.blksize, transfer.windowsize = params.blksize, params.windowsize
+        sink = _FileSink(path)
+        await sink.open()
+        final_ack = await _receive_blocks(ep, peer, sink, params, transfer, reply, first)
+        await sink.commit()
+        sink = None
+        ep.send(final_ack, peer)
+        _spawn(_dally(ep, peer, final_ack, params.timeout))
+        dallying = True
+    finally:
+        if sink is not None:
+            sink.abort()
+        if not dallying:
+            ep.close()
+
+
+async def push(host: str, port: int, path: str, remote: str,
+               blksize: int = CLIENT_BLKSIZE, windowsize: int = CLIENT_WINDOWSIZE) -> Transfer:
+    """Upload the file at ``path`` to a TFTP server as ``remote``."""
+    transfer = Transfer("client", "send", (host, port), remote, path)
+    return await _tracked(transfer, _push(host, port, path, remote, _Params(blksize, windowsize), transfer))
+
+
+async def _push(host: str, port: int, path: str, remote: str, wanted: _Params, transfer: Transfer) -> None:
+    source = await _FileSource.open(path)
+    try:
+        transfer.size = source.size
+        family, server_addr = await _resolve(host, port)
+        ep = await _open_endpoint(family)
+        try:
+            request = _request(WRQ, remote, "octet", _client_options(wanted, source.size))
+            packet, peer = await _first_reply(ep, request, server_addr, wanted.timeout, transfer)
+            if _opcode(packet) == OACK:
+                params = _Params.from_options(_options(_fields(packet[2:])))
+            elif _opcode(packet) == ACK and _block(packet) == 0:
+                params = _Params()
+            else:
+                raise TftpError(ILLEGAL_OPERATION, "Unexpected reply to WRQ")
+            transfer.blksize, transfer.windowsize = params.blksize, params.windowsize
+            await _send_blocks(ep, peer, source, params, transfer)
+        finally:
+            ep.close()
+    finally:
+        source.close()
+
+
+def _expand(template: str, host: str, name: str = "") -> str:
+    """Fill ``{host}`` and ``{name}`` (the base name of ``name``) into a file name template."""
+    return template.replace("{host}", host).replace("{name}", os.path.basename(name.replace("\\", "/")))
+
+
+async def _bulk(calls) -> list[dict]:
+    limit = asyncio.Semaphore(CLIENT_CONCURRENCY)
+
+    async def run(call):
+        async with limit:
+            transfer = await call()
+        return transfer.status()
+
+    return await asyncio.gather(*(run(call) for call in calls))
+
+
+def _failed(host: str, port: int, direction: str, filename: str, error: str) -> dict:
+    transfer = Transfer("client", direction, (host, port), filename, None)
+    transfer.state, transfer.error = "failed", error
+    return transfer.status()
+
+
+@router.post("/tftp/fetch")
+async def tftp_fetch(
+    hosts: str = Form(...),
+    remote: str = Form(...),
+    save_as: str = Form("{host}_{name}"),
+    port: int = Form(69),
+    blksize: int = Form(CLIENT_BLKSIZE, ge=8, le=65464),
+    windowsize: int = Form(CLIENT_WINDOWSIZE, ge=1, le=65535),
+):
+    # {host} and {name} (the remote file's base name) are filled in per device
+    if not TFTP_ROOT:
+        return NO_ROOT
+    targets = parse_targets(hosts, port)
+    if not targets:
+        return NO_HOSTS
+    if len(targets) > MAX_DEVICES:
+        return TOO_MANY_DEVICES
+    calls, results = [], []
+    for target in targets:
+        name = _expand(remote, target.host)
+        path = resolve_path(TFTP_ROOT, _expand(save_as, target.host, name))
+        if path is None:
+            results.append(_failed(target.host, target.port, "receive", name, "저장 경로가 TFTP 루트 밖을 가리킵니다."))
+            continue
+        calls.append(lambda t=target, n=name, p=path: fetch(t.host, t.port, n, p, blksize, windowsize))
+    results.extend(await _bulk(calls))
+    return {"root": TFTP_ROOT, "ok": sum(r["state"] == "done" for r in results), "transfers": results}
+
+
+@router.post("/tftp/push")
+async def tftp_push(
+    hosts: str = Form(...),
+    local: str = Form(...),
+    remote: str = Form("{name}"),
+    port: int = Form(69),
+    blksize: int = Form(CLIENT_BLKSIZE, ge=8, le=65464),
+    windowsize: int = Form(CLIENT_WINDOWSIZE, ge=1, le=65535),
+):
+    # local is a file under NETTOOLS_TFTP_ROOT; {host} picks a per-device file
+    if not TFTP_ROOT:
+        return NO_ROOT
+    targets = parse_targets(hosts, port)
+    if not targets:
+        return NO_HOSTS
+    if len(targets) > MAX_DEVICES:
+        return TOO_MANY_DEVICES
+    calls, results = [], []
+    for target in targets:
+        name = _expand(local, target.host)
+        path = resolve_path(TFTP_ROOT, name)
+        remote_name = _expand(remote, target.host, name)
+        if path is None or not os.path.isfile(path):
+            results.append(_failed(target.host, target.port, "send", remote_name, f"파일이 없습니다: {name}"))
+            continue
+        calls.append(lambda t=target, p=path, r=remote_name: push(t.host, t.port, p, r, blksize, windowsize))
+    results.extend(await _bulk(calls))
+    return {"root": TFTP_ROOT, "ok": sum(r["state"] == "done" for r in results), "transfers": results}
+
+
+@router.get("/tftp/status")
+async def tftp_status():
+    return {
+        "enabled": TFTP_ENABLED,
+        "running": server is not None and server.running,
+        "host": TFTP_HOST,
+        "port": server.port if server is not None else TFTP_PORT,
+        "root": TFTP_ROOT,
+        "readonly": READONLY,
+        "active": [t.status() for t in list(_active.values())],
+        "recent": [t.status() for t in reversed(_recent)],
+    }
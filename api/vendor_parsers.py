@@ -0,0 +1,225 @@
+"""Vendor parser plugins shared by the extract and LLDP routers.
+
+A plugin names a vendor, the marker strings that identify its logs and the
+fields it supplies. For each extract field it gives an ordered list of
+``(pattern, keyword anchors)`` rules. It may also give its own LLDP sysName
+patterns and neighbor-table regex. ``detect`` looks at the first DETECT_CHARS
+characters of a log. When the markers of exactly one registered vendor show up
+there, that plugin's rules run first, and when they find nothing for a field,
+the rest of the GENERIC rules for it still run. A log that is detected wrongly
+(e.g. one whose head only lists neighbors) therefore still gets a value wherever
+the GENERIC tables find one. Where several rules match, though, a detected log
+takes the plugin's pick rather than the first GENERIC one: a VOSS log with both
+``SysDescr : ... (8.10.1.0)`` and ``Image : VOSS 8.9.0.0`` gives image 8.10.1.0
+(the running release), and an EXOS log's model comes from Chassis/System Type
+before ModelName. Otherwise, and for any field a plugin does not supply, the
+GENERIC tables run; they try every vendor's patterns in their original order. Markers are words a vendor's own output
+prints, never hostname prefixes: those also show up in neighbor tables.
+
+Plugins register at import time, in this module or in one it imports, so the
+spawned parse-pool workers see the same registry.
+
+Patterns are written once, as str patterns. ``as_bytes`` gives the bytes twin
+that the parsers run over raw log buffers (bytes, mmap or memoryview), so only
+the captures get decoded (``text``). Compiled for bytes, ``.`` is any byte but
+a newline, so non-ASCII names still come out whole, but ``\s``, ``\d`` and
+``\w`` are ASCII-only: a non-breaking space is no longer a column separator.
+Switch CLI output pads with plain spaces.
+"""
+import os
+import re
+from functools import lru_cache
+
+DETECT_CHARS = int(os.getenv("NETTOOLS_DETECT_CHARS", "8192"))
+
+EXTRACT_FIELDS = ("sysname", "serial", "model", "image", "image_selected", "image_booted", "ip")
+LLDP_NEIGHBORS = "lldp_neighbors"
+
+# Rules are (pattern, anchors). Anchors are lowercase keywords that every match
+# of the pattern starts with (the "(Primary Release)" pattern instead needs its
+# keyword on the matched line). A pattern is only searched from the first line
+# holding one of its keywords and is skipped when none occurs; None means
+# "always search from 0".
+SYSNAME_STATUS = (re.compile(r"SysName\s*:\s*(.+)"), ("sysname",))
+SYSNAME_CONFIG = (re.compile(r'(?i)sys-?name\s+"([^"]+)"'), ("sys",))
+PROMPT_CONFIG = (re.compile(r'(?i)prompt\s+"([^"]+)"'), ("prompt",))
+
+SERIAL = (re.compile(r"Serial#\s*:\s*(.+)"), ("serial#",))
+CARD_SERIAL = (re.compile(r"CardSerial#\s*:\s*(\S+)"), ("cardserial#",))
+SWITCH_SERIAL = (re.compile(r'Switch\s*:\s*\S+\s+(\S+)'), ("switch",))
+
+MODEL_NAME = (re.compile(r"ModelName\s*:\s*(.+)"), ("modelname",))
+CHASSIS = (re.compile(r"Chassis\s*:\s*(.+)"), ("chassis",))
+SYSTEM_TYPE = (re.compile(r"System Type\s*:\s*(.+)"), ("system type",))
+BOX_TYPE = (re.compile(r"box type\s*:\s*(.+)", re.IGNORECASE), ("box type",))
+
+# Image info (EXOS/FabricEngine) - capture version numbers only
+# From 'Image :' line in 'show version'
+IMAGE_VERSION = (re.compile(r"(?im)Image\s*:\s.*?\b(\d+(?:\.\d+){1,3})\b"), ("image",))
+# Fallback to 'Primary ver:' or 'Secondary ver:' numeric version
+PRIMARY_VER = (re.compile(r"(?im)Primary\s+ver\s*:\s*(\d+(?:\.\d+){1,3})"), ("primary",))
+SECONDARY_VER = (re.compile(r"(?im)Secondary\s+ver\s*:\s*(\d+(?:\.\d+){1,3})"), ("secondary",))
+# FabricEngine/VOSS: SysDescr contains version in parentheses
+SYSDESCR_VERSION = (re.compile(r"(?im)SysDescr\s*:\s.*?\((\d+(?:\.\d+){1,3})\)"), ("sysdescr",))
+# FabricEngine: software releases list like '9.0.5.1.GA (Primary Release)'
+PRIMARY_RELEASE = (re.compile(r"(?im)^\s*(\d+(?:\.\d+){1,3})\.[A-Za-z].*\(Primary Release\)"), ("(primary release)",))
+IMAGE_SELECTED = (re.compile(r"Image\s*Selected\s*:\s*(\S+)"), ("image",))
+IMAGE_BOOTED = (re.compile(r"Image\s*Booted\s*:\s*(\S+)"), ("image",))
+
+# IP 추출: 로그 본문에서 우선 추출, 실패 시 파일명에서 추출
+IP_RULES = [
+    # EXOS 등에서 Mgmt/MGMT/Management가 포함된 라인에서 IP
+    (re.compile(r"(?i)\b(?:mgmt|management)\b.*?((?:\d{1,3}\.){3}\d{1,3})"), ("mgmt", "management")),
+    (re.compile(r"(?i)\bip\s+address\s+((?:\d{1,3}\.){3}\d{1,3})"), ("ip",)),
+    # VLAN 표처럼 'IP/Mask' 형태
+    (re.compile(r"\b((?:\d{1,3}\.){3}\d{1,3})\b\s*/\d{1,2}"), None),
+    # 'IP:' 또는 'Address:' 표기
+    (re.compile(r"(?i)\b(?:ip(?:v4)?|addr(?:ess)?)\b\s*[:=]\s*((?:\d{1,3}\.){3}\d{1,3})"), ("ip", "addr")),
+]
+
+LLDP_SYSNAME_STATUS = re.compile(r"SysName\s*:\s*(.+)")
+LLDP_SYSNAME_CONFIG = re.compile(r'sysName\s+"(\S+)"')
+# e.g., "HOSTNAME # show lldp neighbors"
+LLDP_PROMPT = re.compile(r'^(\w[\w.\-]*)\s*#\s*show\s+lldp\s+neighbors', re.MULTILINE)
+
+# LLDP table line format (flexible):
+# port   mac           port-id      ...  neighbor
+# Optional timestamp prefix like: [YYYY/MM/DD HH:MM:SS]
+# capture: (port_num)(mac)(port_id_raw)(neighbor)
+LLDP_LINE_RE = re.compile(r'^(?:\[[^\]]+\]\s*)?\s*(\d+)\s+(\S+)\s+(\S+)\s+\S+\s+\S+\s+(\S+)', re.MULTILINE)
+
+
+class VendorParser:
+    def __init__(
+        self,
+        name: str,
+        markers: tuple[str, ...] = (),
+        rules: dict[str, list[tuple[re.Pattern, tuple[str, ...] | None]]] | None = None,
+        lldp_sysname: list[re.Pattern] | None = None,
+        lldp_line: re.Pattern | None = None,
+    ):
+        self.name = name
+        self.markers = tuple(m.lower() for m in markers)
+        self.byte_markers = tuple(m.encode("utf-8") for m in self.markers)
+        self.rules = dict(rules or {})
+        self.lldp_sysname = lldp_sysname
+        self.lldp_line = lldp_line
+
+    @property
+    def fields(self) -> list[str]:
+        """The fields this plugin supplies itself (the rest come from GENERIC)."""
+        return list(self.rules) + ([LLDP_NEIGHBORS] if self.lldp_sysname or self.lldp_line else [])
+
+    def field_rules(self, field: str) -> list[tuple[re.Pattern, tuple[str, ...] | None]]:
+        """This plugin's rules for ``field``, then the GENERIC ones it does not have.
+
+        The plugin's rules win over GENERIC order, so this can pick another
+        match than GENERIC would; see the module docstring.
+        """
+        rules = self.rules.get(field)
+        if rules is None:
+            return GENERIC.rules[field]
+        return rules + [rule for rule in GENERIC.rules[field] if rule not in rules]
+
+    def lldp_sysname_patterns(self) -> list[re.Pattern]:
+        if not self.lldp_sysname:
+            return GENERIC.lldp_sysname
+        return self.lldp_sysname + [pat for pat in GENERIC.lldp_sysname if pat not in self.lldp_sysname]
+
+    def lldp_line_re(self) -> re.Pattern:
+        return self.lldp_line or GENERIC.lldp_line
+
+    def __repr__(self) -> str:
+        return f"VendorParser({self.name!r}, fields={self.fields})"
+
+
+GENERIC = VendorParser(
+    "generic",
+    rules={
+        "sysname": [SYSNAME_STATUS, SYSNAME_CONFIG, PROMPT_CONFIG],
+        "serial": [SERIAL, CARD_SERIAL, SWITCH_SERIAL],
+        "model": [MODEL_NAME, CHASSIS, SYSTEM_TYPE, BOX_TYPE],
+        "image": [IMAGE_VERSION, PRIMARY_VER, SECONDARY_VER, SYSDESCR_VERSION, PRIMARY_RELEASE],
+        "image_selected": [IMAGE_SELECTED, PRIMARY_RELEASE],
+        "image_booted": [IMAGE_BOOTED, SYSDESCR_VERSION],
+        "ip": IP_RULES,
+    },
+    lldp_sysname=[LLDP_SYSNAME_STATUS, LLDP_SYSNAME_CONFIG, LLDP_PROMPT],
+    lldp_line=LLDP_LINE_RE,
+)
+
+_vendors: dict[str, VendorParser] = {}
+
+
+def register(parser: VendorParser) -> VendorParser:
+    _vendors[parser.name] = parser
+    return parser
+
+
+def get_vendor(name: str) -> VendorParser:
+    return _vendors.get(name, GENERIC)
+
+
+def vendors() -> list[VendorParser]:
+    return list(_vendors.values())
+
+
+def detect(content) -> VendorParser:
+    """The plugin whose markers, alone, occur near the start of ``content``.
+
+    ``content`` is a str or a bytes-like buffer; of a buffer, the first
+    DETECT_CHARS bytes are looked at.
+    """
+    if isinstance(content, str):
+        head, key = content[:DETECT_CHARS].lower(), "markers"
+    else:
+        head, key = bytes(content[:DETECT_CHARS]).lower(), "byte_markers"
+    found = [v for v in _vendors.values() if any(m in head for m in getattr(v, key))]
+    return found[0] if len(found) == 1 else GENERIC
+
+
+@lru_cache(maxsize=None)
+def as_bytes(pattern: re.Pattern) -> re.Pattern:
+    """``pattern`` compiled for bytes (its flags but ``re.UNICODE``)."""
+    if isinstance(pattern.pattern, bytes):
+        return pattern
+    return re.compile(pattern.pattern.encode("utf-8"), pattern.flags & ~re.UNICODE)
+
+
+def text(value: bytes | str) -> str:
+    """A capture as str; bytes are decoded like whole logs used to be."""
+    return value if isinstance(value, str) else value.decode("utf-8", errors="ignore")
+
+
+def registry_fingerprint() -> str:
+    # part of the parse cache keys: changing a plugin invalidates old results
+    return repr([(v.name, v.markers, v.rules, v.lldp_sysname, v.lldp_line) for v in (GENERIC, *_vendors.values())])
+
+
+register(VendorParser(
+    "exos",
+    markers=("extremexos", "exos", "system type", "image selected", "primary ver"),
+    rules={
+        "sysname": [SYSNAME_STATUS, SYSNAME_CONFIG],
+        "serial": [SERIAL, SWITCH_SERIAL],
+        "model": [CHASSIS, SYSTEM_TYPE],
+        "image": [IMAGE_VERSION, PRIMARY_VER, SECONDARY_VER],
+        "image_selected": [IMAGE_SELECTED],
+        "image_booted": [IMAGE_BOOTED],
+    },
+    lldp_sysname=[LLDP_SYSNAME_STATUS, LLDP_SYSNAME_CONFIG, LLDP_PROMPT],
+))
+
+register(VendorParser(
+    "voss",
+    markers=("voss", "fabric engine", "fabricengine", "sysdescr", "modelname", "cardserial#"),
+    rules={
+        "sysname": [SYSNAME_STATUS, PROMPT_CONFIG],
+        "serial": [SERIAL, CARD_SERIAL],
+        "model": [MODEL_NAME, CHASSIS, BOX_TYPE],
+        "image": [SYSDESCR_VERSION, PRIMARY_RELEASE],
+        "image_selected": [PRIMARY_RELEASE],
+        "image_booted": [SYSDESCR_VERSION],
+    },
+    lldp_sysname=[LLDP_SYSNAME_STATUS, LLDP_PROMPT],
+))
@@ -0,0 +1,266 @@
+"""Streaming XLSX export and row-streaming import shared by the Excel endpoints.
+
+Sheets are written as raw SpreadsheetML straight into a streaming ZIP, one row
+at a time, so no cell objects or DataFrames are built and the client receives
+the first bytes while later rows are still being produced. Strings are stored
+inline (no shared-string table), which keeps the writer single-pass.
+
+Uploaded workbooks are opened in openpyxl's read-only mode, which parses
+worksheet XML lazily row by row instead of building every sheet's cell graph;
+row counts for previews come straight from the raw worksheet parts.
+"""
+import io
+import posixpath
+import re
+import zipfile
+from typing import Iterable, Iterator, Sequence
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from fastapi.responses import StreamingResponse
+from openpyxl import load_workbook
+
+from .metrics import timed
+from .offload import iterate_blocking
+from .zip_stream import stream_zip
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# characters XML 1.0 cannot carry (openpyxl raises IllegalCharacterError on them)
+ILLEGAL_XML_CHARS_RE = re.compile(r"[\000-\010\013\014\016-\037]")
+
+# rows are grouped before being handed to the compressor
+ROWS_PER_CHUNK = 512
+
+_CONTENT_TYPES_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+)
+_SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{0}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+# style 1 = header cell (bold, thin border, centered) like pandas' to_excel
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="2"><border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/>'
+    '<diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="1" xfId="0" applyFont="1" applyBorder="1" '
+    'applyAlignment="1"><alignment horizontal="center" vertical="top"/></xf></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = "</sheetData></worksheet>"
+
+
+def _cell(value, style: str) -> str:
+    if value is None or value == "":
+        return "<c/>" if not style else f"<c{style}/>"
+    if isinstance(value, bool):
+        return f'<c{style} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if value != value or value in (float("inf"), float("-inf")):
+            return "<c/>"
+        return f"<c{style}><v>{value}</v></c>"
+    text = escape(ILLEGAL_XML_CHARS_RE.sub("", str(value)))
+    return f'<c{style} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _sheet_xml(rows: Iterable[Sequence], header: Sequence | None) -> Iterator[bytes]:
+    yield _SHEET_HEAD.encode("utf-8")
+    idx = 0
+    buf: list[str] = []
+    if header is not None:
+        idx = 1
+        buf.append('<row r="1">' + "".join(_cell(v, ' s="1"') for v in header) + "</row>")
+    for row in rows:
+        idx += 1
+        buf.append(f'<row r="{idx}">' + "".join(_cell(v, "") for v in row) + "</row>")
+        if len(buf) >= ROWS_PER_CHUNK:
+            yield "".join(buf).encode("utf-8")
+            buf.clear()
+    if buf:
+        yield "".join(buf).encode("utf-8")
+    yield _SHEET_TAIL.encode("utf-8")
+
+
+def stream_xlsx(sheets: Iterable[tuple[str, Sequence | None, Iterable[Sequence]]]) -> Iterator[bytes]:
+    """Yield an .xlsx file for ``(sheet_name, header_or_None, rows)`` triples.
+
+    Sheet names must already be valid and unique; rows are consumed lazily.
+    """
+    names: list[str] = []
+
+    def entries():
+        for name, header, rows in sheets:
+            names.append(name)
+            yield f"xl/worksheets/sheet{len(names)}.xml", _sheet_xml(rows, header)
+        if not names:
+            # a workbook needs at least one sheet
+            names.append("Sheet")
+            yield "xl/worksheets/sheet1.xml", _sheet_xml((), None)
+        # parts listing the sheets go last, once all names are known
+        yield "[Content_Types].xml", (
+            _CONTENT_TYPES_HEAD
+            + "".join(_SHEET_CONTENT_TYPE.format(i) for i in range(1, len(names) + 1))
+            + "</Types>"
+        ).encode("utf-8")
+        yield "_rels/.rels", _ROOT_RELS.encode("utf-8")
+        yield "xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(
+                f'<sheet name="{escape(n, {chr(34): "&quot;"})}" sheetId="{i}" r:id="rId{i}"/>'
+                for i, n in enumerate(names, 1)
+            )
+            + "</sheets></workbook>"
+        ).encode("utf-8")
+        yield "xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{i}" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{i}.xml"/>'
+                for i in range(1, len(names) + 1)
+            )
+            + f'<Relationship Id="rId{len(names) + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/></Relationships>'
+        ).encode("utf-8")
+        yield "xl/styles.xml", _STYLES.encode("utf-8")
+
+    return stream_zip(entries())
+
+
+def xlsx_response(sheets, filename: str) -> StreamingResponse:
+    return StreamingResponse(
+        iterate_blocking(timed(stream_xlsx(sheets), "xlsx")),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+def open_workbook_readonly(data: bytes):
+    """Row-streaming workbook over ``data``; call ``wb.close()`` when done."""
+    return load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+
+
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_DIMENSION_RE = re.compile(rb'<(?:\w+:)?dimension\s+ref="(?:[A-Z]+\d+:)?[A-Z]+(\d+)"')
+# <row ...> start tags in raw worksheet XML (self-closing rows hold no cells)
+_ROW_TAG_RE = re.compile(rb"<(?:\w+:)?row\b([^>]*)>")
+_ROW_INDEX_RE = re.compile(rb'\br="(\d+)"')
+
+
+def _part_path(base: str, target: str) -> str:
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+
+def _workbook_sheet_parts(zf: zipfile.ZipFile) -> list[tuple[str, str]]:
+    # (sheet name, worksheet part) in workbook order, without loading openpyxl
+    root_rels = ElementTree.fromstring(zf.read("_rels/.rels"))
+    wb_part = next(
+        _part_path("", rel.get("Target"))
+        for rel in root_rels.iter(f"{_PKG_REL_NS}Relationship")
+        if rel.get("Type", "").endswith("/officeDocument")
+    )
+    rels_part = posixpath.join(posixpath.dirname(wb_part), "_rels", posixpath.basename(wb_part) + ".rels")
+    targets = {
+        rel.get("Id"): _part_path(wb_part, rel.get("Target"))
+        for rel in ElementTree.fromstring(zf.read(rels_part)).iter(f"{_PKG_REL_NS}Relationship")
+    }
+    workbook = ElementTree.fromstring(zf.read(wb_part))
+    return [
+        (sheet.get("name"), targets.get(sheet.get(f"{_REL_NS}id"), ""))
+        for sheet in workbook.iter()
+        if sheet.tag.endswith("}sheet")
+    ]
+
+
+def _scan_row_count(src) -> int:
+    # index of the last row element, read from the raw part in 1 MiB chunks
+    last = 0
+    carry = b""
+    while True:
+        chunk = src.read(1024 * 1024)
+        buf = carry + chunk
+        if not last and not carry:
+            dim = _DIMENSION_RE.search(buf, 0, 64 * 1024)
+            # a single-cell dimension may also mean an empty sheet: scan those
+            if dim and int(dim.group(1)) > 1:
+                return int(dim.group(1))
+        # an incomplete tag at the end is carried over to the next chunk
+        cut = buf.rfind(b"<") if chunk else len(buf)
+        for m in _ROW_TAG_RE.finditer(buf, 0, cut):
+            attrs = m.group(1)
+            if attrs.endswith(b"/"):
+                continue
+            idx = _ROW_INDEX_RE.search(attrs)
+            last = int(idx.group(1)) if idx else last + 1
+        if not chunk:
+            return last
+        carry = buf[cut:]
+
+
+def workbook_line_counts(data: bytes) -> list[tuple[str, int]]:
+    """``(sheet name, row count)`` for every sheet without parsing any cell.
+
+    The <dimension> tag is used when present (files whose tag overstates the
+    used range report the declared size); otherwise row tags are counted.
+    """
+    counts: list[tuple[str, int]] = []
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        names = set(zf.namelist())
+        for name, part in _workbook_sheet_parts(zf):
+            if part not in names or "/worksheets/" not in f"/{part}":
+                # chartsheets and the like carry no rows
+                counts.append((name, 0))
+                continue
+            with zf.open(part) as src:
+                counts.append((name, _scan_row_count(src)))
+    return counts
+
+
+def sheet_lines(ws) -> Iterator[str]:
+    """Each row as one line, cells concatenated as-is (empty cells skipped)."""
+    # every row up to the declared dimension, which is what
+    # workbook_line_counts reports for the preview: rows of valueless (e.g.
+    # styled) cells are empty lines, as the normal-mode reader's max_row
+    # counted them, and so are rows the dimension declares past the last one
+    emitted = 0
+    for row in ws.iter_rows(values_only=True):
+        emitted += 1
+        yield "".join(str(cell) for cell in row if cell is not None)
+    for _ in range((ws.max_row or 0) - emitted):
+        yield ""
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, UploadFile, File, Form
 from fastapi.responses import StreamingResponse
 import io
-from openpyxl import load_workbook
 from urllib.parse import quote
 
+from .metrics import span
+from .offload import run_blocking
+from .xlsx_stream import open_workbook_readonly, sheet_lines
+
 router = APIRouter()
 
 
@@ -13,23 +16,10 @@ async def generate_xsf(
     sheet: str | None = Form(None),
     filename: str | None = Form(None),
 ):
-    data = await excel.read()
-    stream = io.BytesIO(data)
-    wb = load_workbook(stream, data_only=True)
-
-    # Choose sheet: specific by name if provided, else first sheet
-    if sheet and sheet in wb.sheetnames:
-        ws = wb[sheet]
-    else:
-        ws = wb[wb.sheetnames[0]]
-
-    # Build XSF content: each row as one line, cells concatenated as-is
-    lines: list[str] = []
-    for row in ws.iter_rows(values_only=True):
-        line = ''.join([str(cell) if cell is not None else '' for cell in row])
-        lines.append(line)
-
-    content = ("\n".join(lines)).encode("utf-8")
+    with span("read"):
+        data = await excel.read()
+    with span("xsf"):
+        content = await run_blocking(_xsf_content, data, sheet)
 
     out_name = (filename or excel.filename or "output").rsplit('.', 1)[0] + ".xsf"
 
@@ -61,3 +51,18 @@ async def generate_xsf(
             "Content-Disposition": cd_value
         },
     )
+
+
+def _xsf_content(data: bytes, sheet: str | None) -> bytes:
+    wb = open_workbook_readonly(data)
+    try:
+        # Choose sheet: specific by name if provided, else first sheet
+        if sheet and sheet in wb.sheetnames:
+            ws = wb[sheet]
+        else:
+            ws = wb[wb.sheetnames[0]]
+
+        # Build XSF content: each row as one line, cells concatenated as-is
+        return ("\n".join(sheet_lines(ws))).encode("utf-8")
+    finally:
+        wb.close()
@@ -0,0 +1,62 @@
+import zipfile
+from typing import Iterable, Iterator
+
+# flush compressed output to the client once this much is buffered
+CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkSink:
+    """Write-only, non-seekable file object that hands out what was written.
+
+    zipfile falls back to data descriptors when it cannot seek, so entries are
+    emitted as they are compressed instead of after the archive is complete.
+    """
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self.buffered = 0
+
+    def write(self, data) -> int:
+        if data:
+            self._parts.append(bytes(data))
+            self.buffered += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        self.buffered = 0
+        return out
+
+
+def stream_zip(
+    entries: Iterable[tuple[str, Iterable[bytes] | bytes]],
+    compression: int = zipfile.ZIP_DEFLATED,
+) -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk.
+
+    ``entries`` yields ``(name, data)`` where data is bytes or an iterable of
+    byte chunks; entries are only pulled when the previous one is written, so
+    memory stays at roughly one chunk plus the compressor state.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, mode="w", compression=compression) as zf:
+        for name, data in entries:
+            if isinstance(data, (bytes, bytearray)):
+                zf.writestr(name, data)
+            else:
+                # size unknown up front: allow entries past 2 GiB
+                with zf.open(name, mode="w", force_zip64=True) as fh:
+                    for part in data:
+                        fh.write(part)
+                        if sink.buffered >= CHUNK_SIZE:
+                            yield sink.drain()
+            if sink.buffered >= CHUNK_SIZE:
+                yield sink.drain()
+    # central directory
+    tail = sink.drain()
+    if tail:
+        yield tail
@@ -0,0 +1,90 @@
+"""Peak Python heap while ingesting ZIP uploads of growing size.
+
+The legacy path buffers the whole upload and keeps every decoded member; the
+spooled path should stay flat at roughly one member regardless of archive size.
+The run fails when the spooled peak of the largest archive exceeds that of the
+smallest by more than ``--tolerance`` (a factor, plus one member of slack).
+``--check`` skips the legacy path and only measures 8 and 128 members, as a
+quick regression check against buffering whole archives again.
+
+Usage: python -m benchmarks.bench_archive [--member-mb 1] [--members 8 32 128]
+       [--tolerance 1.5] [--check]
+"""
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import tracemalloc
+import zipfile
+
+from fastapi import UploadFile
+
+from api.archive import UploadSpool
+from api.extract_model_serial_hostname import CompiledExtractor
+
+
+def make_zip(path: str, members: int, member_mb: int) -> None:
+    line = "  1    up    10G    full    off   00:04:96:aa:bb:cc  v100\n"
+    body = "SysName : sw\n" + line * (member_mb * 1024 * 1024 // len(line))
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i in range(members):
+            zf.writestr(f"logs/10.0.{i // 256}.{i % 256}_sw{i}.log", body)
+
+
+async def legacy(path: str) -> int:
+    with open(path, "rb") as fh:
+        upload = UploadFile(fh, filename="a.zip")
+        data = await upload.read()
+    zf = zipfile.ZipFile(io.BytesIO(data))
+    contents = [zf.read(n).decode("utf-8", errors="ignore") for n in zf.namelist()]
+    extractor = CompiledExtractor()
+    return len([extractor.extract(c) for c in contents])
+
+
+async def spooled(path: str) -> int:
+    extractor = CompiledExtractor()
+    with open(path, "rb") as fh:
+        async with UploadSpool() as spool:
+            sources = await spool.sources(zips=[UploadFile(fh, filename="a.zip")])
+            return len([extractor.extract(src.read_text(), src.filename) for src in sources])
+
+
+def peak_mb(coro_fn, path: str) -> float:
+    tracemalloc.start()
+    asyncio.run(coro_fn(path))
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024
+
+
+def check_flat(peaks: dict[int, float], member_mb: int, tolerance: float) -> None:
+    small, large = min(peaks), max(peaks)
+    limit = peaks[small] * tolerance + member_mb
+    assert peaks[large] <= limit, (
+        f"spooled peak grows with archive size: {peaks[small]:.1f} MB at {small} members, "
+        f"{peaks[large]:.1f} MB at {large} (limit {limit:.1f} MB)"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--member-mb", type=int, default=1)
+    ap.add_argument("--members", type=int, nargs="+", default=[8, 32, 128])
+    ap.add_argument("--tolerance", type=float, default=1.5)
+    ap.add_argument("--check", action="store_true")
+    args = ap.parse_args()
+    members = [8, 128] if args.check else args.members
+    peaks: dict[int, float] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in members:
+            path = os.path.join(tmp, f"{n}.zip")
+            make_zip(path, n, args.member_mb)
+            peaks[n] = peak_mb(spooled, path)
+            legacy_peak = "" if args.check else f"legacy peak {peak_mb(legacy, path):8.1f} MB  "
+            print(f"{n:>5} members x {args.member_mb} MB  {legacy_peak}spooled peak {peaks[n]:6.1f} MB")
+    check_flat(peaks, args.member_mb, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
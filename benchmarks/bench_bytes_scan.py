@@ -0,0 +1,102 @@
+"""Decoded str scans against raw-buffer scans of large logs on disk.
+
+Each log is one corpus device header and LLDP table followed by ``show log``
+noise up to ``--mb`` MB, once plain ASCII and once with a Korean port
+description every few lines (such a str takes two bytes per character). Both
+/extract's per-file work and the LLDP scanner run twice over the spooled file:
+decoding it to str first (``LogSource.read_text``, how they used to read
+logs) and over ``LogSource.buffer`` (an mmap searched with the bytes
+patterns). Reports the best time and the Python heap peak (tracemalloc); the
+mmap's pages are page cache shared with the OS, not heap.
+
+Usage: python -m benchmarks.bench_bytes_scan [--mb 100] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from api.archive import LogSource
+from api.extract_model_serial_hostname import OUTPUT_COLUMNS, _extract_item, _extractor_for
+from api.lldp_hostname import _extract_by_patterns, _extract_ip, _scan_files
+from api.vendor_parsers import detect
+from benchmarks.corpus import device_ip, device_names, exos_header, lldp_table
+
+COLUMNS = tuple(OUTPUT_COLUMNS)
+NOISE = (
+    "vlan.msgs.portLinkStateUp Port 1:{n} link UP at speed 10 Gbps and full-duplex\n",
+    "AAA.authPass Login passed for user admin through ssh (10.9.{n}.7)\n",
+    "lldp.NbrAdded Neighbor added on port 1:{n}\n",
+)
+KOREAN = "ELRP.Report 포트 1:{n} 설명 '본관 3층 배선실 업링크' 루프 감지 없음\n"
+
+
+def write_log(path: str, size_mb: int, korean: bool) -> None:
+    rng = random.Random(0)
+    names = device_names(64)
+    target = size_mb * 1024 * 1024
+    with open(path, "w", encoding="utf-8") as fh:
+        total = fh.write(exos_header(rng, names[0], device_ip(0)))
+        total += fh.write(lldp_table(rng, names[0], f"{names[0]}.3 #", names, 40))
+        while total < target:
+            line = (KOREAN if korean and rng.random() < 0.2 else rng.choice(NOISE)).format(n=rng.randrange(1, 49))
+            total += len(line.encode("utf-8"))
+            fh.write(line)
+
+
+def extract_decoded(source: LogSource) -> dict:
+    content = source.read_text()
+    return _extractor_for(COLUMNS, detect(content).name).extract(content, source.filename)
+
+
+def lldp_decoded(source: LogSource) -> tuple:
+    content = source.read_text()
+    vendor = detect(content)
+    sysname = _extract_by_patterns(vendor.lldp_sysname_patterns(), content)
+    return sysname, _extract_ip(content, source.filename), len(vendor.lldp_line_re().findall(content))
+
+
+def lldp_buffer(source: LogSource) -> tuple:
+    sysname, ip_addr, rows, _raw = _scan_files([], "", False, [source])[0]
+    return sysname, ip_addr, len(rows)
+
+
+def measure(fn, source: LogSource, repeat: int) -> tuple[float, float, object]:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(source)
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn(source)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak / 1e6, result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="nettools-bytes-") as tmp:
+        for label, korean in (("ASCII", False), ("Korean lines", True)):
+            path = os.path.join(tmp, f"{device_ip(0)}_{label[0]}.log")
+            write_log(path, args.mb, korean)
+            source = LogSource(os.path.basename(path), path, None, os.path.getsize(path))
+            for case, decoded, buffer in (
+                ("extract", extract_decoded, lambda s: _extract_item(COLUMNS, s)),
+                ("lldp", lldp_decoded, lldp_buffer),
+            ):
+                old_t, old_mb, old = measure(decoded, source, args.repeat)
+                new_t, new_mb, new = measure(buffer, source, args.repeat)
+                assert old == new, (old, new)
+                print(f"{label:<13} {args.mb} MB {case:<8} str {old_t:7.3f}s {old_mb:8.1f} MB peak   "
+                      f"mmap {new_t:7.3f}s {new_mb:8.1f} MB peak   x{old_t / new_t:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Time /collect's device loop against the local SSH stub devices.
+
+Runs ``api.collect.collect`` (what POST /collect awaits before parsing) three
+times over the same devices: one device at a time with fresh connections, then
+on the collect pool with fresh connections, then again reusing the pooled ones.
+``--delay`` is the stub's time per command, standing in for switch latency.
+
+Usage: python -m benchmarks.bench_collect [--devices 100] [--delay 0.05] [--workers 32]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--devices", type=int, default=100)
+    ap.add_argument("--delay", type=float, default=0.05)
+    ap.add_argument("--workers", type=int, default=32)
+    ap.add_argument("--base-port", type=int, default=24200)
+    args = ap.parse_args()
+    # read when api.collect is imported
+    os.environ["NETTOOLS_COLLECT_WORKERS"] = str(args.workers)
+    # the stub makes a new host key every run; trust it in a throwaway file
+    os.environ["NETTOOLS_COLLECT_TOFU_HOSTS"] = os.path.join(tempfile.mkdtemp(prefix="nettools-bench-"), "known_hosts")
+
+    from api import collect
+    from api.archive import UploadSpool
+    from benchmarks import ssh_stub
+
+    stub_args = ssh_stub.parser().parse_args(
+        ["--devices", str(args.devices), "--base-port", str(args.base_port), "--delay", str(args.delay)]
+    )
+    targets = [collect.Target(host, port) for host, port in ssh_stub.start(stub_args)]
+    commands = collect.COMMAND_SETS["exos"]
+    time.sleep(0.5)
+
+    def serial() -> int:
+        spool = UploadSpool()
+        try:
+            results = [collect.collect_device(t, "admin", "admin", commands, spool.new_path()) for t in targets]
+        finally:
+            spool.close()
+        collect.pool.close_all()
+        return sum(r["ok"] for r in results)
+
+    async def pooled() -> int:
+        async with UploadSpool() as spool:
+            results, _sources = await collect.collect(targets, "admin", "admin", commands, spool)
+        return sum(r["ok"] for r in results)
+
+    for label, run in (
+        ("serial, new connections", serial),
+        (f"{args.workers} workers, new connections", lambda: asyncio.run(pooled())),
+        (f"{args.workers} workers, reused connections", lambda: asyncio.run(pooled())),
+    ):
+        t0 = time.perf_counter()
+        ok = run()
+        print(f"{label:<36} {time.perf_counter() - t0:7.2f}s  {ok}/{len(targets)} devices")
+    collect.shutdown_collect()
+
+
+if __name__ == "__main__":
+    main()
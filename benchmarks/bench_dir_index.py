@@ -0,0 +1,77 @@
+"""Full os.walk listing vs. answering from the incremental directory index.
+
+Builds a synthetic tree of empty files under a temp directory (or --root) and
+times: the old walk, the first index scan, a no-change refresh, a refresh after
+touching a few directories, and listing rows from the index.
+
+Usage: python -m benchmarks.bench_dir_index [--dirs 2000] [--files 100]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from api.dir_index import DirectoryIndex, RACY_NS
+from api.directory_listing import _iter_rows
+
+EXTS = {".log", ".txt"}
+
+
+def build_tree(root: str, dirs: int, files: int) -> None:
+    for d in range(dirs):
+        path = os.path.join(root, f"site{d % 20}", f"rack{d % 7}", f"sw{d}")
+        os.makedirs(path, exist_ok=True)
+        for f in range(files):
+            ext = (".log", ".txt", ".ini")[f % 3]
+            open(os.path.join(path, f"10.{d % 256}.{f % 256}.1_{f}{ext}"), "w").close()
+
+
+def walk_rows(base: str) -> int:
+    count = 0
+    for _root, _dirs, files in os.walk(base):
+        count += sum(1 for name in files if os.path.splitext(name)[1].lower() in EXTS)
+    return count
+
+
+def timed(label: str, fn):
+    t0 = time.perf_counter()
+    result = fn()
+    print(f"{label:<28} {time.perf_counter() - t0:8.3f}s")
+    return result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dirs", type=int, default=2000)
+    ap.add_argument("--files", type=int, default=100)
+    ap.add_argument("--root", default=None, help="existing tree to list instead of a synthetic one")
+    args = ap.parse_args()
+
+    tmp = None
+    root = args.root
+    if root is None:
+        tmp = root = tempfile.mkdtemp(prefix="nettools-bench-")
+        timed(f"build {args.dirs * args.files} files", lambda: build_tree(root, args.dirs, args.files))
+    try:
+        index = DirectoryIndex(root)
+        walked = timed("os.walk listing", lambda: walk_rows(root))
+        timed("index: first scan", index.refresh)
+        # let directory mtimes leave the racy window so refreshes can trust them
+        time.sleep(RACY_NS / 1e9)
+        index.refresh()
+        timed("index: refresh, no change", index.refresh)
+        if tmp is not None:
+            for d in range(0, args.dirs, max(1, args.dirs // 10)):
+                open(os.path.join(root, f"site{d % 20}", f"rack{d % 7}", f"sw{d}", "new.log"), "w").close()
+        timed("index: refresh, 10 changed", index.refresh)
+        print("  ", index.last_scan)
+        rows = timed("index: rows", lambda: list(_iter_rows(index.iter_dirs(root), EXTS)))
+        assert len(rows) == walked + (10 if tmp is not None else 0), (len(rows), walked)
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
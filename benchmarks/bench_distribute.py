@@ -0,0 +1,107 @@
+"""Normal-mode vs. read-only workbook reading for /distribute and /xsf.
+
+Builds a workbook (default 100 sheets x 5,000 rows = 500k rows) once, then runs
+each variant in a fresh subprocess and reports wall time and peak RSS.
+
+Usage: python -m benchmarks.bench_distribute [--sheets 100] [--rows 5000]
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+
+def make_workbook(path: str, sheets: int, rows: int) -> None:
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    for s in range(sheets):
+        ws = wb.create_sheet(title=f"sw{s}")
+        for r in range(rows):
+            ws.append(["configure vlan ", f"v{r % 4094}", " add ports ", f"1:{r % 48}", " tagged"])
+    wb.save(path)
+
+
+def old_preview(data: bytes) -> int:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io.BytesIO(data), data_only=True)
+    total = 0
+    for name in wb.sheetnames:
+        for row in wb[name].iter_rows(values_only=True):
+            ''.join([str(cell) if cell is not None else '' for cell in row])
+            total += 1
+    return total
+
+
+def new_preview(data: bytes) -> int:
+    from api.xlsx_stream import workbook_line_counts
+
+    return sum(lines for _name, lines in workbook_line_counts(data))
+
+
+def old_zip(data: bytes) -> int:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(io.BytesIO(data), data_only=True)
+    out = io.BytesIO()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name in wb.sheetnames:
+            lines = [''.join([str(c) if c is not None else '' for c in row]) for row in wb[name].iter_rows(values_only=True)]
+            zf.writestr(f"{name}.txt", "\n".join(lines).encode("utf-8"))
+    return len(out.getvalue())
+
+
+def new_zip(data: bytes) -> int:
+    from api.log_distribute import _distribute_entries
+    from api.zip_stream import stream_zip
+
+    return sum(len(chunk) for chunk in stream_zip(_distribute_entries(data, "txt")))
+
+
+VARIANTS = {
+    "preview/normal": old_preview,
+    "preview/row-scan": new_preview,
+    "zip/normal": old_zip,
+    "zip/read-only": new_zip,
+}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sheets", type=int, default=100)
+    ap.add_argument("--rows", type=int, default=5000)
+    ap.add_argument("--child", nargs=2, metavar=("VARIANT", "PATH"))
+    args = ap.parse_args()
+    if args.child:
+        variant, path = args.child
+        with open(path, "rb") as fh:
+            data = fh.read()
+        t0 = time.perf_counter()
+        result = VARIANTS[variant](data)
+        elapsed = time.perf_counter() - t0
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(json.dumps({"seconds": elapsed, "rss_mb": rss, "result": result}))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "book.xlsx")
+        make_workbook(path, args.sheets, args.rows)
+        print(f"{args.sheets} sheets x {args.rows} rows ({os.path.getsize(path) / 1e6:.1f} MB xlsx)")
+        for variant in VARIANTS:
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_distribute", "--child", variant, path],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            r = json.loads(out)
+            print(f"{variant:<18} {r['seconds']:7.2f}s  peak RSS {r['rss_mb']:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
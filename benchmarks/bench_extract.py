@@ -0,0 +1,100 @@
+"""Compare the per-field regex scans with CompiledExtractor on large logs.
+
+The compiled extractor runs twice: with the generic tables (every vendor's
+patterns) and with the tables of the vendor plugin that ``detect`` picks.
+
+Usage: python -m benchmarks.bench_extract [--mb 50] [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+from api.extract_model_serial_hostname import (
+    CompiledExtractor,
+    FIELD_PATTERNS,
+    NOT_FOUND,
+    extract_by_patterns,
+    patterns,
+)
+from api.vendor_parsers import detect
+
+NOISE = [
+    "Port   Link  Speed  Duplex  Flow ctrl  Load\n",
+    "  1    up    10G    full    off        0%\n",
+    "Slot-1 Stack.1 # show fdb\n",
+    "00:04:96:aa:bb:cc  v100(0100)  0000  d m  1:17\n",
+    "Event log: link state changed on port 1:23\n",
+]
+HEADER = (
+    "SysName          : core-sw-01\n"
+    "System Type      : X690-48x-2q-4c\n"
+    "Switch           : 800745-00-10 1234N-56789 Rev 10.0 BootROM: 2.0.1.7\n"
+    "Image   : ExtremeXOS version 31.7.1.4 by release-manager\n"
+    "Image Selected   : primary\n"
+    "Image Booted     : primary\n"
+    "Primary ver      : 31.7.1.4\n"
+)
+VOSS_HEADER = (
+    "SysDescr     : VSP-4900-48P (8.10.1.0)\n"
+    "SysName      : dist-sw-02\n"
+    "ModelName    : 4900-48P\n"
+    "Serial#      : 18JP1234A5B6\n"
+    "  8.10.1.0.GA (Primary Release)\n"
+)
+
+
+def make_log(size_mb: int, header: str | None = HEADER) -> str:
+    rnd = random.Random(0)
+    parts = [header] if header else []
+    total = 0
+    target = size_mb * 1024 * 1024
+    while total < target:
+        line = rnd.choice(NOISE)
+        parts.append(line)
+        total += len(line)
+    # management address only shows up at the end of 'show tech'
+    parts.append("Mgmt  VR-Mgmt 192.168.10.5 /24 up\n")
+    return "".join(parts)
+
+
+def legacy_extract(content: str, filename: str) -> dict:
+    row = {col: extract_by_patterns(patterns[key], content) for col, key in FIELD_PATTERNS.items()}
+    if row["ip"] == NOT_FOUND:
+        row["ip"] = extract_by_patterns(patterns["filename"], filename)
+    return row
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    extractor = CompiledExtractor()
+    for label, content in (
+        ("EXOS show tech", make_log(args.mb)),
+        ("VOSS show tech", make_log(args.mb, VOSS_HEADER)),
+        ("no version block", make_log(args.mb, None)),
+    ):
+        fname = "10.0.0.1_core.log"
+        vendor = detect(content)
+        by_vendor = CompiledExtractor(vendor=vendor)
+        assert legacy_extract(content, fname) == extractor.extract(content, fname) == by_vendor.extract(content, fname)
+        old = best_of(lambda: legacy_extract(content, fname), args.repeat)
+        new = best_of(lambda: extractor.extract(content, fname), args.repeat)
+        plug = best_of(lambda: (detect(content), by_vendor.extract(content, fname)), args.repeat)
+        print(f"{label:<18} {args.mb} MB  legacy {old:7.3f}s  compiled {new:7.3f}s  "
+              f"{vendor.name:>7} {plug:7.3f}s  x{old / plug:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
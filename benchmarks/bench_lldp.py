@@ -0,0 +1,123 @@
+"""LLDP neighbor rows: the old row-at-a-time loop vs. the batched column parser.
+
+Generates EXOS-style ``show lldp neighbors`` tables (with timestamps, noise
+names, month words and ports with and without a slot) and checks that both
+parsers return identical rows for several filter settings before timing them.
+Then times neighbor name filters (name_filter) against the regexes they used
+to be compiled to (``*`` -> ``.*``): a backtracking glob on one long name, and
+a list of 500 host names over every distinct neighbor name.
+
+Usage: python -m benchmarks.bench_lldp [--files 200] [--rows 2000] [--repeat 3]
+"""
+import argparse
+import random
+import re
+import time
+
+from api.lldp_hostname import (
+    MONTH_WORD_RE,
+    _compile_patterns,
+    _match_any,
+    _neighbor_tables,
+    _normalize_name,
+)
+from api.vendor_parsers import LLDP_LINE_RE
+
+
+def legacy_neighbor_rows(content, sysname_out, ip_addr, neighbor_patterns, strip_prefix, host_ip_map=None, exact_match=False):
+    rows = []
+    lldp_lines = re.findall(
+        r'^(?:\[[^\]]+\]\s*)?\s*(\d+)\s+(\S+)\s+(\S+)\s+\S+\s+\S+\s+(\S+)',
+        content,
+        re.MULTILINE,
+    )
+    for port_num, mac, port_id_raw, neighbor_full in lldp_lines:
+        if not _match_any(neighbor_full, neighbor_patterns, exact=exact_match):
+            continue
+        neighbor_name = _normalize_name(neighbor_full, strip_prefix)
+        low = neighbor_name.strip().lower()
+        if low in {"not-advertised", "sep", "up"}:
+            continue
+        if MONTH_WORD_RE.search(neighbor_name):
+            continue
+        c_match = re.search(r'/(\d+)', port_id_raw)
+        c = c_match.group(1) if c_match else port_id_raw
+        neighbor_ip = (host_ip_map or {}).get(neighbor_name, "")
+        rows.append([sysname_out, f'P{port_num}', neighbor_name, f'P{c}', neighbor_ip, ip_addr])
+    return rows
+
+
+NAMES = ["core-sw{}", "dist-{}", "acc-sw{}", "UP", "Sep", "not-advertised", "Jan-sw{}", "sw-may{}", "pre-edge{}"]
+
+
+def make_content(rng: random.Random, rows: int) -> str:
+    lines = ["SysName : sw\n", "Port  Neighbor Chassis ID   Port ID   TTL  Age  Neighbor System Name\n"]
+    for _ in range(rows):
+        stamp = "[2024/05/01 12:00:00] " if rng.random() < 0.2 else ""
+        port_id = f"1:{rng.randint(1, 48)}" if rng.random() < 0.5 else f"{rng.randint(1, 4)}/{rng.randint(1, 48)}"
+        name = rng.choice(NAMES).format(rng.randint(1, 500))
+        lines.append(f"{stamp}{rng.randint(1, 64)}   00:04:96:{rng.randint(10, 99)}:aa:bb   {port_id}   120  11  {name}\n")
+        if rng.random() < 0.05:
+            lines.append("  === unrelated output 1 2 ===\n")
+    return "".join(lines)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--rows", type=int, default=2000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rng = random.Random(7)
+    contents = [make_content(rng, args.rows) for _ in range(args.files)]
+    sysnames = [f"sw{i}" for i in range(args.files)]
+    ips = [f"10.0.{i // 256}.{i % 256}" for i in range(args.files)]
+    host_ip_map = {f"core-sw{i}": f"10.1.0.{i % 256}" for i in range(0, 500, 3)}
+
+    cases = [
+        ("no filter", _compile_patterns(""), "", None, False),
+        ("contains + prefix", _compile_patterns("core*, dist-1"), "pre-", host_ip_map, False),
+        ("exact", _compile_patterns("core-sw1*\nacc-sw4"), "", host_ip_map, True),
+    ]
+    for label, patterns, prefix, ip_map, exact in cases:
+        tables = [LLDP_LINE_RE.findall(c) for c in contents]
+        new = _neighbor_tables(tables, sysnames, ips, patterns, prefix, ip_map, exact)
+        old = [
+            legacy_neighbor_rows(c, s, ip, patterns, prefix, ip_map, exact)
+            for c, s, ip in zip(contents, sysnames, ips)
+        ]
+        assert new == old, label
+        print(f"{label:<18} identical, {sum(map(len, new))} rows")
+
+    patterns = _compile_patterns("core*, dist*")
+    for label, fn in (
+        ("row loop", lambda: [legacy_neighbor_rows(c, s, ip, patterns, "pre-") for c, s, ip in zip(contents, sysnames, ips)]),
+        ("batched", lambda: _neighbor_tables([LLDP_LINE_RE.findall(c) for c in contents], sysnames, ips, patterns, "pre-")),
+    ):
+        best = float("inf")
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        print(f"{label:<18} {best:8.3f}s for {args.files * args.rows} table rows")
+
+    names = sorted({row[3] for c in contents for row in LLDP_LINE_RE.findall(c)})
+    hosts = ", ".join(f"core-sw{i}" for i in range(0, 1000, 2))
+    for label, text, sample in (
+        ("glob a*a*...*b", "a*a*a*a*a*a*b", ["a" * 56]),
+        ("500 host names", hosts, names),
+    ):
+        regexes = [re.compile(item.strip().replace("*", ".*")) for item in text.split(",")]
+        name_filter = _compile_patterns(text)
+        t0 = time.perf_counter()
+        old = [any(r.search(n) for r in regexes) for n in sample]
+        t1 = time.perf_counter()
+        new = [name_filter.match(n) for n in sample]
+        t2 = time.perf_counter()
+        assert old == new, label
+        print(f"{label:<18} {len(sample)} names  regex {t1 - t0:8.4f}s  name_filter {t2 - t1:8.4f}s")
+
+
+if __name__ == "__main__":
+    main()
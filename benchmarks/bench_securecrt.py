@@ -0,0 +1,80 @@
+"""Render N SecureCRT sessions with the old per-host line scan vs. SessionTemplate.
+
+Usage: python -m benchmarks.bench_securecrt [--sessions 65536] [--repeat 3]
+"""
+import argparse
+import time
+
+from api.securecrt_template import HOSTNAME_KEY, SessionTemplate, parse_host_list
+from api.zip_stream import stream_zip
+
+# a trimmed SecureCRT 9.x SSH2 session; real ones are ~300 lines
+TEMPLATE_HEAD = (
+    'S:"Username"=admin\r\n'
+    'S:"Protocol Name"=SSH2\r\n'
+    'D:"[SSH2] Port"=00000016\r\n'
+    'S:"Hostname"=0.0.0.0\r\n'
+    'S:"Emulation"=Xterm\r\n'
+)
+
+
+def make_template(lines: int) -> str:
+    filler = "".join(f'D:"Option {i}"=00000000\r\n' for i in range(lines))
+    return TEMPLATE_HEAD + filler
+
+
+def legacy_render(template_text: str, ip: str) -> bytes:
+    out_lines = []
+    for line in template_text.splitlines(keepends=True):
+        if line.strip().startswith('S:"Hostname"='):
+            ending = "\r\n" if line.endswith("\r\n") else ("\n" if line.endswith("\n") else "")
+            out_lines.append(f'S:"Hostname"={ip}{ending}')
+        else:
+            out_lines.append(line)
+    return "".join(out_lines).encode("utf-8")
+
+
+def ips(n: int) -> list[str]:
+    return [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(n)]
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=65536)
+    ap.add_argument("--template-lines", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    template_text = make_template(args.template_lines)
+    addrs = ips(args.sessions)
+    compiled = SessionTemplate(template_text)
+    assert legacy_render(template_text, addrs[-1]) == compiled.render({HOSTNAME_KEY: addrs[-1]})
+
+    old = best_of(lambda: [legacy_render(template_text, ip) for ip in addrs], args.repeat)
+    new = best_of(lambda: [compiled.render({HOSTNAME_KEY: ip}) for ip in addrs], args.repeat)
+    print(f"render  {args.sessions} sessions  legacy {old:7.3f}s  compiled {new:7.3f}s  x{old / new:5.1f}")
+
+    host_text = "# name ip port username folder\n" + "".join(
+        f"sw{i}\t{ip}\t{2200 + i % 100}\tops\tsite{i % 16}\n" for i, ip in enumerate(addrs)
+    )
+    t0 = time.perf_counter()
+    rows = parse_host_list(host_text)
+    parse = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    size = 0
+    for chunk in stream_zip((row.output, compiled.render(row.values(compiled))) for row in rows):
+        size += len(chunk)
+    print(f"columns {len(rows)} sessions  parse {parse:7.3f}s  render+zip {time.perf_counter() - t0:7.3f}s  {size / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Uploading logs against naming them by server path, through a real server.
+
+Writes the corpus to a temporary directory and starts ``uvicorn api.main:app``.
+Each of /extract/any/json and /lldp/hostname/preview then runs three ways:
+with the logs uploaded as multipart files (the browser's way), with the
+``directory`` form field so the server maps the files in place, and with
+``directory`` again while the parse cache still holds them (found by path,
+size and mtime, nothing is read). The parse cache is cleared before the first
+two. Results must be identical.
+
+Usage: python -m benchmarks.bench_server_files [--files 200] [--kb 256]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.corpus import make_corpus, write_corpus
+from benchmarks.load_healthz import free_port
+
+ROUTES = (("extract", "/extract/any/json"), ("lldp", "/lldp/hostname/preview"))
+
+
+def _sorted(result) -> list:
+    return sorted(map(repr, result))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--kb", type=int, default=256)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="nettools-server-files-") as tmp:
+        paths = write_corpus(tmp, make_corpus(args.files, args.kb))
+        uploads = []
+        for path in paths:
+            with open(path, "rb") as fh:
+                uploads.append(("files", (os.path.basename(path), fh.read())))
+        total = sum(len(f[1][1]) for f in uploads) / 1e6
+
+        port = free_port()
+        base = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+            env={**os.environ, "NETTOOLS_LOCAL_ROOTS": tmp},
+        )
+        try:
+            with httpx.Client(base_url=base, timeout=600) as client:
+                for _ in range(100):
+                    try:
+                        client.get("/healthz")
+                        break
+                    except httpx.TransportError:
+                        time.sleep(0.1)
+                for label, route in ROUTES:
+                    timings = []
+                    results = []
+                    for mode, kwargs, clear in (
+                        ("upload", {"files": uploads}, True),
+                        ("in place", {"data": {"directory": tmp}}, True),
+                        ("in place, cached", {"data": {"directory": tmp}}, False),
+                    ):
+                        if clear:
+                            client.post("/cache/clear")
+                        t0 = time.perf_counter()
+                        r = client.post(route, **kwargs)
+                        timings.append((mode, time.perf_counter() - t0))
+                        r.raise_for_status()
+                        results.append(_sorted(r.json()))
+                    assert results[0] == results[1] == results[2], f"{label}: results differ"
+                    print(f"{label:<8} {args.files} logs, {total:.1f} MB   "
+                          + "   ".join(f"{mode} {sec:6.2f}s" for mode, sec in timings)
+                          + f"   x{timings[0][1] / timings[1][1]:4.1f}")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Concurrent TFTP backups and restores on localhost.
+
+Starts ``api.tftp.TftpServer`` on an ephemeral port, then ``--devices`` clients
+at once ``push`` a config of ``--kb`` KiB to it (a backup from a switch) and
+``fetch`` it back (a restore). Runs once per option set: plain RFC 1350 (512
+byte blocks, one ACK per block), blksize for a 1500-byte MTU, and blksize with
+windowsize. Everything runs on one event loop thread.
+
+Usage: python -m benchmarks.bench_tftp [--devices 200] [--kb 256]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+from api import tftp
+
+OPTION_SETS = (("rfc1350", 512, 1), ("blksize 1468", 1468, 1), ("blksize 1468, window 8", 1468, 8),
+               ("blksize 8192, window 8", 8192, 8))
+
+
+async def run(args, root: str, upload: str) -> None:
+    server = tftp.TftpServer(root, "127.0.0.1", 0)
+    await server.start()
+    size = os.path.getsize(upload)
+    try:
+        for n, (label, blksize, windowsize) in enumerate(OPTION_SETS):
+            t0 = time.perf_counter()
+            pushed = await asyncio.gather(*(
+                tftp.push("127.0.0.1", server.port, upload, f"set{n}/sw{i}.cfg", blksize, windowsize)
+                for i in range(args.devices)
+            ))
+            t1 = time.perf_counter()
+            fetched = await asyncio.gather(*(
+                tftp.fetch("127.0.0.1", server.port, f"set{n}/sw{i}.cfg", os.path.join(root, "restore", f"sw{i}.cfg"),
+                           blksize, windowsize)
+                for i in range(args.devices)
+            ))
+            t2 = time.perf_counter()
+            ok = sum(t.state == "done" for t in pushed + fetched)
+            total = size * args.devices / 1e6
+            print(f"{label:<24} backup {t1 - t0:6.2f}s {total / (t1 - t0):7.1f} MB/s   "
+                  f"restore {t2 - t1:6.2f}s {total / (t2 - t1):7.1f} MB/s   {ok}/{2 * args.devices} ok, "
+                  f"{sum(t.retransmits for t in pushed + fetched)} retransmits")
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--devices", type=int, default=200)
+    ap.add_argument("--kb", type=int, default=256)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="nettools-tftp-") as tmp:
+        root = os.path.join(tmp, "root")
+        upload = os.path.join(tmp, "config.cfg")
+        with open(upload, "wb") as fh:
+            fh.write(os.urandom(args.kb * 1024))
+        threads = threading.active_count()
+        asyncio.run(run(args, root, upload))
+        print(f"threads: {threads} before, {threading.active_count()} after (blocking pool only)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Time and peak RSS of the old openpyxl merge path vs. the streaming writer.
+
+Each variant runs in a fresh subprocess so ru_maxrss is not shared.
+
+Usage: python -m benchmarks.bench_xlsx [--files 40] [--lines 25000]
+"""
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+
+def make_entries(files: int, lines: int) -> list[tuple[str, str]]:
+    line = "2024-05-01 12:00:{:02d} sw-core-01 kernel: port 1:{} link up 10Gbps full duplex"
+    return [
+        (f"sw{i}.log", "\n".join(line.format(n % 60, n % 48) for n in range(lines)))
+        for i in range(files)
+    ]
+
+
+def run_openpyxl(entries) -> int:
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, content in entries:
+        ws = wb.create_sheet(title=name[:-4])
+        for idx, line in enumerate(content.splitlines(), 1):
+            ws.cell(row=idx, column=1, value=line)
+    stream = io.BytesIO()
+    wb.save(stream)
+    return len(stream.getvalue())
+
+
+def run_stream(entries) -> int:
+    from api.log_merge import _merge_sheets
+    from api.xlsx_stream import stream_xlsx
+
+    return sum(len(chunk) for chunk in stream_xlsx(_merge_sheets(entries)))
+
+
+def child(variant: str, files: int, lines: int) -> None:
+    entries = make_entries(files, lines)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    t0 = time.perf_counter()
+    size = {"openpyxl": run_openpyxl, "stream": run_stream}[variant](entries)
+    elapsed = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": elapsed, "rss_mb": peak / 1024, "rss_delta_mb": (peak - base) / 1024, "bytes": size}))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=40)
+    ap.add_argument("--lines", type=int, default=25000)
+    ap.add_argument("--child")
+    args = ap.parse_args()
+    if args.child:
+        child(args.child, args.files, args.lines)
+        return
+    print(f"{args.files} files x {args.lines} lines")
+    for variant in ("openpyxl", "stream"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_xlsx", "--child", variant,
+             "--files", str(args.files), "--lines", str(args.lines)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        r = json.loads(out)
+        print(f"{variant:<9} {r['seconds']:7.2f}s  peak RSS {r['rss_mb']:7.1f} MB "
+              f"(+{r['rss_delta_mb']:.1f} MB over input)  {r['bytes'] / 1e6:.1f} MB xlsx")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Synthetic EXOS and VOSS/FabricEngine device logs for the benchmarks.
+
+Each log holds a ``show version``/``show switch`` (EXOS) or ``show sys-info``/
+``show software`` (VOSS) block, a ``show lldp neighbors`` table whose
+neighbors are other devices of the same corpus, and ``show log`` noise up to
+the requested size. Neighbor rows use the column layout LLDP_LINE_RE reads
+for both vendors. Files are named ``<ip>_<sysname>.log`` like collected logs,
+and the same seed always yields the same corpus.
+
+Usage: python -m benchmarks.corpus OUT_DIR [--files 200] [--kb 256] [--vendors exos voss] [--seed 0]
+"""
+import argparse
+import os
+import random
+
+from api.xlsx_stream import stream_xlsx
+
+EXOS_MODELS = ("X690-48x-2q-4c", "X465-48W", "X440-G2-24p-10GE4", "X870-32c")
+VOSS_MODELS = ("4900-48P", "5520-48T-VOSS", "7432CQ", "5420F-24P")
+EXOS_VERSIONS = ("31.7.1.4", "32.2.1.6", "30.7.2.1")
+VOSS_VERSIONS = ("8.10.1.0", "8.8.3.0", "9.0.5.1")
+LOG_EVENTS = (
+    "vlan.msgs.portLinkStateUp Port {port} link UP at speed 10 Gbps and full-duplex",
+    "vlan.msgs.portLinkStateDown Port {port} link down",
+    "AAA.authPass Login passed for user admin through ssh (10.9.{a}.{b})",
+    "DM.Notice Node State[3] = MASTER",
+    "lldp.NbrAdded Neighbor added on port {port}",
+)
+
+
+def device_names(files: int) -> list[str]:
+    return [f"{('core', 'dist', 'acc')[i % 3]}-sw{i:04d}" for i in range(files)]
+
+
+def device_ip(i: int) -> str:
+    n = i + 1
+    return f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+def _mac(rng: random.Random) -> str:
+    return "00:04:96:" + ":".join(f"{rng.randrange(256):02x}" for _ in range(3))
+
+
+def exos_header(rng: random.Random, name: str, ip: str) -> str:
+    version = rng.choice(EXOS_VERSIONS)
+    serial = f"{rng.randrange(10**3, 10**4)}G-{rng.randrange(10**4, 10**5)}"
+    return (
+        f"{name}.1 # show version\n"
+        f"Switch      : 800745-00-06 {serial} Rev 6.0 BootROM: 3.4.2.1    IMG: {version}\n"
+        f"PSU-1       : Internal PSU-1 800749-00-04 1848A-41111\n"
+        f"Image   : ExtremeXOS version {version} by release-manager\n"
+        f"BootROM : Default 3.4.2.1  Alternate 3.4.2.1\n"
+        f"\n{name}.2 # show switch\n"
+        f"SysName:          {name}\n"
+        f"SysLocation:      IDC-{rng.randrange(1, 9)}F\n"
+        f"System Type:      {rng.choice(EXOS_MODELS)}\n"
+        f"Mgmt IP:          {ip} / 24\n"
+        f"Image Selected:   primary\n"
+        f"Image Booted:     primary\n"
+        f"Primary ver:      {version}\n"
+        f"Secondary ver:    {rng.choice(EXOS_VERSIONS)}\n"
+        f'configure snmp sysName "{name}"\n'
+    )
+
+
+def voss_header(rng: random.Random, name: str, ip: str) -> str:
+    version = rng.choice(VOSS_VERSIONS)
+    model = rng.choice(VOSS_MODELS)
+    return (
+        f"{name}:1# show sys-info\n"
+        f"General Info :\n\n"
+        f"        SysDescr     : VSP-{model} ({version})\n"
+        f"        SysName      : {name}\n"
+        f"        SysUpTime    : {rng.randrange(400)} day(s), 03:14:22\n"
+        f"Chassis Info:\n\n"
+        f"        ModelName          : {model}\n"
+        f"        BrandName          : Extreme Networks.\n"
+        f"        Serial#            : {rng.randrange(10**11, 10**12):X}\n"
+        f"        Mgmt Address       : {ip}/24\n"
+        f"\n{name}:1# show software\n"
+        f"        {version}.GA (Primary Release)\n"
+        f"        {rng.choice(VOSS_VERSIONS)}.GA (Backup Release)\n"
+    )
+
+
+def lldp_table(rng: random.Random, name: str, prompt: str, names: list[str], rows: int) -> str:
+    lines = [
+        f"\n{prompt} show lldp neighbors\n\n",
+        "Port  Neighbor Chassis ID   Port ID    TTL  Age  Neighbor System Name\n",
+        "=" * 72 + "\n",
+    ]
+    for port in range(1, rows + 1):
+        neighbor = rng.choice(names)
+        if neighbor == name and len(names) > 1:
+            neighbor = names[names.index(name) - 1]
+        port_id = f"1:{rng.randrange(1, 53)}" if rng.random() < 0.5 else f"{rng.randrange(1, 5)}/{rng.randrange(1, 49)}"
+        lines.append(f"{port:<5} {_mac(rng)}     {port_id:<10} 120  {rng.randrange(1, 120):<4} {neighbor}\n")
+    lines.append("=" * 72 + "\n")
+    return "".join(lines)
+
+
+def device_log(rng: random.Random, vendor: str, index: int, names: list[str], size: int) -> str:
+    name, ip = names[index], device_ip(index)
+    if vendor == "exos":
+        head, prompt = exos_header(rng, name, ip), f"{name}.3 #"
+    else:
+        head, prompt = voss_header(rng, name, ip), f"{name}:1#"
+    parts = [head, lldp_table(rng, name, prompt, names, rng.randrange(8, 48))]
+    length = sum(map(len, parts))
+    while length < size:
+        line = (
+            f"05/{rng.randrange(1, 29):02d}/2024 {rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}.00 "
+            + rng.choice(LOG_EVENTS).format(port=f"1:{rng.randrange(1, 53)}", a=rng.randrange(256), b=rng.randrange(256))
+            + "\n"
+        )
+        parts.append(line)
+        length += len(line)
+    return "".join(parts)
+
+
+def make_corpus(files: int, kb: int, vendors=("exos", "voss"), seed: int = 0) -> list[tuple[str, str]]:
+    """``files`` (filename, text) logs of about ``kb`` KiB, vendors taken in turn."""
+    rng = random.Random(seed)
+    names = device_names(files)
+    return [
+        (f"{device_ip(i)}_{names[i]}.log", device_log(rng, vendors[i % len(vendors)], i, names, kb * 1024))
+        for i in range(files)
+    ]
+
+
+def write_corpus(directory: str, corpus: list[tuple[str, str]]) -> list[str]:
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for filename, text in corpus:
+        path = os.path.join(directory, filename)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        paths.append(path)
+    return paths
+
+
+def make_workbook(corpus: list[tuple[str, str]]) -> bytes:
+    """One sheet per log, one line per row: what /merge/excel produces."""
+    sheets = ((os.path.splitext(name)[0][:31], None, ((line,) for line in text.splitlines())) for name, text in corpus)
+    return b"".join(stream_xlsx(sheets))
+
+
+def make_host_list(sessions: int) -> str:
+    names = device_names(sessions)
+    return "# name ip port username folder\n" + "".join(
+        f"{names[i]}\t{device_ip(i)}\t{22 if i % 4 else 2222}\tops\tsite{i % 16}\n" for i in range(sessions)
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("out_dir")
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--kb", type=int, default=256)
+    ap.add_argument("--vendors", nargs="+", default=["exos", "voss"], choices=["exos", "voss"])
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    corpus = make_corpus(args.files, args.kb, tuple(args.vendors), args.seed)
+    paths = write_corpus(args.out_dir, corpus)
+    total = sum(os.path.getsize(p) for p in paths)
+    print(f"{len(paths)} logs, {total / 1e6:.1f} MB in {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
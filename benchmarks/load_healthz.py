@@ -0,0 +1,127 @@
+"""/healthz latency while heavy exports run against a real uvicorn server.
+
+Starts ``uvicorn api.main:app`` on a free port and measures /healthz when idle.
+Then it fires --exports concurrent /merge/excel and /extract/any/excel
+requests in a loop and keeps measuring. Exits non-zero if the p99 under load
+exceeds --budget-ms.
+
+Usage: python -m benchmarks.load_healthz [--seconds 10] [--exports 4] [--budget-ms 10]
+"""
+import argparse
+import io
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+
+import httpx
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_merge_files(files: int, lines: int) -> list[tuple[str, bytes]]:
+    line = "2024-05-01 12:00:{:02d} sw-core-01 kernel: port 1:{} link up 10Gbps full duplex"
+    body = "\n".join(line.format(n % 60, n % 48) for n in range(lines)).encode()
+    return [(f"sw{i}.log", body) for i in range(files)]
+
+
+def make_log_zip(files: int) -> bytes:
+    buf = io.BytesIO()
+    noise = "".join(f"Port 1:{n % 48} up 10G full   {n}\n" for n in range(20000))
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(files):
+            zf.writestr(f"logs/10.0.{i // 256}.{i % 256}_sw{i}.log", f"SysName : sw{i}\nSystem Type : X690\n{noise}")
+    return buf.getvalue()
+
+
+def probe(base: str, seconds: float, interval: float = 0.02) -> list[float]:
+    samples: list[float] = []
+    with httpx.Client(base_url=base, timeout=5) as client:
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            client.get("/healthz").raise_for_status()
+            samples.append((time.perf_counter() - t0) * 1000)
+            time.sleep(interval)
+    return samples
+
+
+def summary(samples: list[float]) -> dict:
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))]  # noqa: E731
+    return {"n": len(s), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": s[-1]}
+
+
+def export_loop(base: str, stop: threading.Event, kind: str, payload, counts: dict) -> None:
+    with httpx.Client(base_url=base, timeout=300) as client:
+        while not stop.is_set():
+            if kind == "merge":
+                r = client.post("/merge/excel", files=[("files", f) for f in payload])
+            else:
+                r = client.post("/extract/any/excel", files=[("zips", ("logs.zip", payload))])
+            counts[r.status_code] = counts.get(r.status_code, 0) + 1
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=10)
+    ap.add_argument("--exports", type=int, default=4)
+    ap.add_argument("--budget-ms", type=float, default=10)
+    args = ap.parse_args()
+
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "NETTOOLS_CACHE_MEM_MB": "0"},
+    )
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"{base}/healthz", timeout=1)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        idle = summary(probe(base, 2))
+
+        merge_files = make_merge_files(20, 20000)
+        log_zip = make_log_zip(200)
+        stop = threading.Event()
+        counts: dict[int, int] = {}
+        workers = [
+            threading.Thread(
+                target=export_loop,
+                args=(base, stop, "merge" if i % 2 == 0 else "extract", merge_files if i % 2 == 0 else log_zip, counts),
+            )
+            for i in range(args.exports)
+        ]
+        for w in workers:
+            w.start()
+        time.sleep(1)  # let the exports get going
+        loaded = summary(probe(base, args.seconds))
+        stop.set()
+        for w in workers:
+            w.join()
+        print(f"limits: {httpx.get(f'{base}/limits/stats').json()['groups']['export']}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    for label, stats in (("idle", idle), ("under load", loaded)):
+        print(f"/healthz {label:<11} n={stats['n']:<4} p50 {stats['p50']:6.2f}ms  p95 {stats['p95']:6.2f}ms  "
+              f"p99 {stats['p99']:6.2f}ms  max {stats['max']:6.2f}ms")
+    print(f"export responses: {counts}")
+    if loaded["p99"] > args.budget_ms:
+        print(f"FAIL: p99 {loaded['p99']:.2f}ms over the {args.budget_ms}ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
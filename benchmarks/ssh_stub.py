@@ -0,0 +1,155 @@
+"""Local SSH servers that answer like EXOS/VOSS switches, for trying /collect.
+
+Device ``i`` listens on ``--base-port + i`` and answers exec requests with the
+matching block of a benchmarks/corpus.py device: the version/switch or
+sys-info/software header for the show commands /collect sends by default, the
+LLDP neighbor table for ``show lldp neighbor(s)``, and an empty output for any
+other command. Any username/password is accepted (or only ``--password`` if
+given). ``--delay`` slows every command down. ``--hang N`` makes every Nth
+device never answer, so per-device timeouts can be seen.
+
+Usage: python -m benchmarks.ssh_stub [--devices 50] [--base-port 2200] [--delay 0.05] [--hang 0]
+"""
+import argparse
+import random
+import socket
+import threading
+import time
+
+import paramiko
+
+from benchmarks.corpus import device_ip, device_names, exos_header, lldp_table, voss_header
+
+HOST_KEY = paramiko.RSAKey.generate(2048)
+# paramiko sends the exec reply after check_channel_exec_request returns;
+# output sent (and the channel closed) before it makes the client fail
+EXEC_REPLY_GRACE = 0.01
+
+
+class Device:
+    def __init__(self, index: int, names: list[str], vendor: str, seed: int = 0):
+        rng = random.Random(seed * 100003 + index)
+        name, ip = names[index], device_ip(index)
+        if vendor == "exos":
+            head, prompt = exos_header(rng, name, ip), f"{name}.3 #"
+        else:
+            head, prompt = voss_header(rng, name, ip), f"{name}:1#"
+        self.name = name
+        self.head = head
+        self.lldp = lldp_table(rng, name, prompt, names, rng.randrange(8, 48))
+
+    def output(self, command: str) -> str:
+        command = command.strip().lower()
+        if command.startswith("show lldp"):
+            return self.lldp
+        if command in ("show version", "show sys-info"):
+            # the whole header holds every field the extractor reads
+            return self.head
+        return ""
+
+
+class StubServer(paramiko.ServerInterface):
+    def __init__(self, device: Device, password: str | None, delay: float):
+        self.device = device
+        self.password = password
+        self.delay = delay
+
+    def check_auth_password(self, username, password):
+        if self.password is None or password == self.password:
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED if kind == "session" else paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_exec_request(self, channel, command):
+        command = command.decode("utf-8", "replace")
+        threading.Thread(target=answer, args=(channel, self.device, command, self.delay), daemon=True).start()
+        return True
+
+
+def serve_connection(sock: socket.socket, device: Device, args) -> None:
+    transport = paramiko.Transport(sock)
+    transport.add_server_key(HOST_KEY)
+    try:
+        transport.start_server(server=StubServer(device, args.password, args.delay))
+        # channels are answered from check_channel_exec_request; they are only
+        # held here, since paramiko closes a channel once nothing references it
+        channels = []
+        while transport.is_active():
+            channel = transport.accept(timeout=1)
+            channels = [c for c in channels if not c.closed]
+            if channel is not None:
+                channels.append(channel)
+    except (paramiko.SSHException, EOFError, OSError):
+        pass
+    finally:
+        transport.close()
+
+
+def answer(channel, device: Device, command: str, delay: float) -> None:
+    try:
+        time.sleep(max(delay, EXEC_REPLY_GRACE))
+        channel.sendall(device.output(command).encode("utf-8"))
+        channel.send_exit_status(0)
+    except (paramiko.SSHException, EOFError, OSError):
+        pass
+    finally:
+        channel.close()
+
+
+def listen(port: int, device: Device, args, hang: bool) -> None:
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((args.host, port))
+    server.listen(64)
+    while True:
+        sock, _addr = server.accept()
+        if hang:
+            # accept the TCP connection but never start SSH
+            continue
+        threading.Thread(target=serve_connection, args=(sock, device, args), daemon=True).start()
+
+
+def start(args) -> list[tuple[str, int]]:
+    names = device_names(args.devices)
+    targets = []
+    for i in range(args.devices):
+        device = Device(i, names, args.vendors[i % len(args.vendors)], args.seed)
+        port = args.base_port + i
+        hang = bool(args.hang) and (i + 1) % args.hang == 0
+        threading.Thread(target=listen, args=(port, device, args, hang), daemon=True).start()
+        targets.append((args.host, port))
+    return targets
+
+
+def parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--devices", type=int, default=50)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--base-port", type=int, default=2200)
+    ap.add_argument("--vendors", nargs="+", default=["exos", "voss"], choices=["exos", "voss"])
+    ap.add_argument("--password")
+    ap.add_argument("--delay", type=float, default=0.0)
+    ap.add_argument("--hang", type=int, default=0)
+    ap.add_argument("--seed", type=int, default=0)
+    return ap
+
+
+def main() -> None:
+    args = parser().parse_args()
+    targets = start(args)
+    print(f"{len(targets)} devices on {args.host}:{args.base_port}-{args.base_port + args.devices - 1}")
+    print("hosts: " + " ".join(f"{host}:{port}" for host, port in targets[:5]) + (" ..." if len(targets) > 5 else ""))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Repeatable timings of each endpoint's core function on a synthetic corpus.
+
+Cases (see CASES) call what the routers call, without HTTP or the parse pool:
+the extractor and LLDP scanner per file, the Excel/ZIP writers, workbook
+reading for /distribute and /xsf, and SecureCRT session rendering. Every case
+runs on the same seeded corpus from benchmarks/corpus.py, ``--rounds`` times
+after one warm-up, and the results are saved as JSON. Pass ``--compare`` an
+earlier result file to print the change per case.
+
+Usage: python -m benchmarks.suite [--files 200] [--kb 256] [--rounds 5]
+       [--only extract lldp ...] [--out results.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from api.archive import LogSource
+from api.extract_model_serial_hostname import OUTPUT_COLUMNS, _excel_sheets, _extract_item
+from api.ip_ranges import address_ranges
+from api.lldp_hostname import LLDP_COLUMNS, _compile_patterns, _excel_rows, _resolve_rows, _scan_files
+from api.log_distribute import _distribute_entries
+from api.log_merge import _merge_sheets
+from api.securecrt_template import HOSTNAME_KEY, SessionTemplate, parse_host_list
+from api.xlsx_stream import stream_xlsx
+from api.xsf_generate import _xsf_content
+from api.zip_stream import stream_zip
+from benchmarks.bench_securecrt import make_template
+from benchmarks.corpus import device_ip, make_corpus, make_host_list, make_workbook, write_corpus
+
+
+def _drain(chunks) -> int:
+    return sum(len(chunk) for chunk in chunks)
+
+
+class Fixture:
+    def __init__(self, args, directory: str):
+        self.corpus = make_corpus(args.files, args.kb, tuple(args.vendors), args.seed)
+        paths = write_corpus(directory, self.corpus)
+        self.sources = [LogSource(os.path.basename(p), p, None, os.path.getsize(p)) for p in paths]
+        self.bytes = sum(s.size for s in self.sources)
+        self.columns = tuple(OUTPUT_COLUMNS)
+        self.extracted = [_extract_item(self.columns, s) for s in self.sources]
+        self.patterns = _compile_patterns("core*, dist*")
+        self.workbook = make_workbook(self.corpus)
+        self.template = make_template(300)
+        self.sessions = args.sessions
+        self.host_list = make_host_list(args.sessions)
+
+
+def extract(fx: Fixture) -> int:
+    for source in fx.sources:
+        _extract_item(fx.columns, source)
+    return fx.bytes
+
+
+def extract_excel(fx: Fixture) -> int:
+    return _drain(stream_xlsx(_excel_sheets(fx.extracted, list(fx.columns))))
+
+
+def lldp(fx: Fixture) -> int:
+    # _resolve_rows fills the rows in place, so each round scans afresh
+    _resolve_rows(_scan_files(fx.patterns, "", False, fx.sources))
+    return fx.bytes
+
+
+def lldp_excel(fx: Fixture) -> int:
+    rows = _resolve_rows(_scan_files(fx.patterns, "", False, fx.sources))
+    return _drain(stream_xlsx([("Sheet1", LLDP_COLUMNS, _excel_rows(rows))]))
+
+
+def merge(fx: Fixture) -> int:
+    return _drain(stream_xlsx(_merge_sheets(fx.corpus)))
+
+
+def distribute(fx: Fixture) -> int:
+    return _drain(stream_zip(_distribute_entries(fx.workbook, "txt")))
+
+
+def xsf(fx: Fixture) -> int:
+    return len(_xsf_content(fx.workbook, None))
+
+
+def securecrt_hostname(fx: Fixture) -> int:
+    compiled = SessionTemplate(fx.template)
+    rows = parse_host_list(fx.host_list)
+    return _drain(stream_zip((row.output, compiled.render(row.values(compiled))) for row in rows))
+
+
+def securecrt_iprange(fx: Fixture) -> int:
+    compiled = SessionTemplate(fx.template)
+    addresses = address_ranges(device_ip(0), device_ip(fx.sessions - 1))
+    return _drain(stream_zip((f"{ip}_sw.ini", compiled.render({HOSTNAME_KEY: ip})) for ip in addresses))
+
+
+CASES = {
+    "extract": extract,
+    "extract_excel": extract_excel,
+    "lldp": lldp,
+    "lldp_excel": lldp_excel,
+    "merge": merge,
+    "distribute": distribute,
+    "xsf": xsf,
+    "securecrt_hostname": securecrt_hostname,
+    "securecrt_iprange": securecrt_iprange,
+}
+
+
+def run_case(fn, fx: Fixture, rounds: int) -> dict:
+    # "bytes" is the input parsed or the output written, whichever the case is about
+    nbytes = fn(fx)  # warm-up: regex and extractor caches, page cache
+    times = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn(fx)
+        times.append(time.perf_counter() - t0)
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": rounds,
+        "bytes": nbytes,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip()
+    except OSError:
+        return ""
+
+
+def compare(results: dict, baseline_path: str) -> None:
+    with open(baseline_path, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    if baseline.get("params") != results["params"]:
+        print(f"note: {baseline_path} was run with {baseline.get('params')}")
+    print(f"\n{'case':<20} {'before':>9} {'after':>9} {'change':>8}")
+    for name, case in results["cases"].items():
+        old = baseline.get("cases", {}).get(name)
+        if old is None:
+            print(f"{name:<20} {'-':>9} {case['median']:9.3f}")
+            continue
+        change = (case["median"] - old["median"]) / old["median"] * 100 if old["median"] else 0.0
+        print(f"{name:<20} {old['median']:9.3f} {case['median']:9.3f} {change:+7.1f}%")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--kb", type=int, default=256)
+    ap.add_argument("--vendors", nargs="+", default=["exos", "voss"], choices=["exos", "voss"])
+    ap.add_argument("--sessions", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--only", nargs="+", choices=list(CASES))
+    ap.add_argument("--out", default="benchmark-results.json")
+    ap.add_argument("--compare")
+    args = ap.parse_args()
+
+    params = {k: getattr(args, k) for k in ("files", "kb", "vendors", "sessions", "seed", "rounds")}
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": params,
+        "cases": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="nettools-bench-") as tmp:
+        t0 = time.perf_counter()
+        fx = Fixture(args, tmp)
+        print(f"corpus: {len(fx.sources)} logs, {fx.bytes / 1e6:.1f} MB ({time.perf_counter() - t0:.1f}s to build)")
+        for name in args.only or CASES:
+            case = run_case(CASES[name], fx, args.rounds)
+            results["cases"][name] = case
+            print(f"{name:<20} median {case['median']:8.3f}s  min {case['min']:8.3f}s  {case['bytes'] / 1e6:8.1f} MB")
+
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"saved {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,8 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
   const [ipLabels, setIpLabels] = useState<File | null>(null)
   const [startIp, setStartIp] = useState("")
   const [endIp, setEndIp] = useState("")
+  const [ipRanges, setIpRanges] = useState("")
+  const [ipExclude, setIpExclude] = useState("")
   // merge files (tool-3)
   const [mergeFiles, setMergeFiles] = useState<FileList | null>(null)
   const [mergeOutputName, setMergeOutputName] = useState("merged_logs.xlsx")
@@ -66,6 +68,31 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
   const [xsfExcel, setXsfExcel] = useState<File | null>(null)
   const [xsfSheet, setXsfSheet] = useState<string>("")
   const [xsfFilename, setXsfFilename] = useState<string>("")
+  // preview session tokens (X-NetTools-Session) and the inputs each one was made from
+  const [sessions, setSessions] = useState<Record<string, { token: string; inputs: unknown[] }>>({})
+
+  const rememberSession = (key: string, res: Response, inputs: unknown[]) => {
+    const token = res.headers.get("X-NetTools-Session")
+    setSessions((prev) => {
+      const next = { ...prev }
+      if (token) next[key] = { token, inputs }
+      else delete next[key]
+      return next
+    })
+  }
+
+  // export by the preview's session token while its inputs are unchanged, so
+  // the files are not uploaded twice; upload again when the server lost it (410)
+  const postExport = async (url: string, key: string, inputs: unknown[], buildForm: (upload: boolean) => FormData) => {
+    const saved = sessions[key]
+    if (saved && saved.inputs.length === inputs.length && saved.inputs.every((v, i) => v === inputs[i])) {
+      const form = buildForm(false)
+      form.append("session", saved.token)
+      const res = await fetch(url, { method: "POST", body: form })
+      if (res.status !== 410) return res
+    }
+    return fetch(url, { method: "POST", body: buildForm(true) })
+  }
 
   const runXsf = async () => {
     if (!xsfExcel) {
@@ -103,19 +130,24 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
       setResults(null)
       setTableJson(null)
       try {
-        const form = new FormData()
-        form.append("zip", dirZip)
-        form.append("include_ini", String(dirIncludeIni))
-        form.append("include_log", String(dirIncludeLog))
-        form.append("include_txt", String(dirIncludeTxt))
+        const inputs = [dirZip, dirIncludeIni, dirIncludeLog, dirIncludeTxt]
+        const buildForm = (upload: boolean) => {
+          const form = new FormData()
+          if (upload) form.append("zip", dirZip)
+          form.append("include_ini", String(dirIncludeIni))
+          form.append("include_log", String(dirIncludeLog))
+          form.append("include_txt", String(dirIncludeTxt))
+          return form
+        }
         if (mode === "json") {
-          const res = await fetch(`${API_BASE}/dir/zip/list`, { method: "POST", body: form })
+          const res = await fetch(`${API_BASE}/dir/zip/list`, { method: "POST", body: buildForm(true) })
           if (!res.ok) throw new Error("목록 조회 실패")
+          rememberSession("dir-zip", res, inputs)
           const data = await res.json()
           setTableJson(data)
           setResults("목록 로드 완료")
         } else {
-          const res = await fetch(`${API_BASE}/dir/zip/list/excel`, { method: "POST", body: form })
+          const res = await postExport(`${API_BASE}/dir/zip/list/excel`, "dir-zip", inputs, buildForm)
           if (!res.ok) throw new Error("엑셀 생성 실패")
           const blob = await res.blob()
           const url = URL.createObjectURL(blob)
@@ -140,17 +172,24 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
         setResults(null)
         setTableJson(null)
         try {
-          const form = new FormData()
-          form.append("template", crtTemplate)
-          form.append("hostlist", crtHostList)
+          const inputs = [crtTemplate, crtHostList]
+          const buildForm = (upload: boolean) => {
+            const form = new FormData()
+            if (upload) {
+              form.append("template", crtTemplate)
+              form.append("hostlist", crtHostList)
+            }
+            return form
+          }
           if (mode === "json") {
-            const res = await fetch(`${API_BASE}/securecrt/hostname/preview`, { method: "POST", body: form })
+            const res = await fetch(`${API_BASE}/securecrt/hostname/preview`, { method: "POST", body: buildForm(true) })
             if (!res.ok) throw new Error("미리보기 생성 실패")
+            rememberSession("securecrt-hostname", res, inputs)
             const data = await res.json()
             setTableJson(data)
             setResults("미리보기 로드 완료")
           } else {
-            const res = await fetch(`${API_BASE}/securecrt/hostname/generate`, { method: "POST", body: form })
+            const res = await postExport(`${API_BASE}/securecrt/hostname/generate`, "securecrt-hostname", inputs, buildForm)
             if (!res.ok) throw new Error("ZIP 생성 실패")
             const blob = await res.blob()
             const url = URL.createObjectURL(blob)
@@ -162,22 +201,31 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
           setIsRunning(false)
         }
       {
-        if (!ipTemplate || !ipLabels || !startIp || !endIp) {
-          setResults("템플릿 INI, 라벨 TXT, 시작/종료 IP를 입력해주세요.")
+        if (!ipTemplate || !ipLabels || (!(startIp && endIp) && !ipRanges.trim())) {
+          setResults("템플릿 INI, 라벨 TXT, 시작/종료 IP 또는 IP 대역을 입력해주세요.")
           return
         }
         setIsRunning(true)
         setResults(null)
         setTableJson(null)
         try {
-          const form = new FormData()
-          form.append("template", ipTemplate)
-          form.append("labels", ipLabels)
-          form.append("start_ip", startIp)
-          form.append("end_ip", endIp)
+          const inputs = [ipTemplate, ipLabels, startIp, endIp, ipRanges, ipExclude]
+          const buildForm = (upload: boolean) => {
+            const form = new FormData()
+            if (upload) {
+              form.append("template", ipTemplate)
+              form.append("labels", ipLabels)
+            }
+            form.append("start_ip", startIp)
+            form.append("end_ip", endIp)
+            form.append("ranges", ipRanges)
+            form.append("exclude", ipExclude)
+            return form
+          }
           if (mode === "json") {
-            const res = await fetch(`${API_BASE}/securecrt/iprange/preview`, { method: "POST", body: form })
+            const res = await fetch(`${API_BASE}/securecrt/iprange/preview`, { method: "POST", body: buildForm(true) })
             if (!res.ok) throw new Error("미리보기 생성 실패")
+            rememberSession("securecrt-iprange", res, inputs)
             const data = await res.json()
             if (Array.isArray(data)) {
               setTableJson(data)
@@ -188,7 +236,7 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
               setResults("알 수 없는 응답")
             }
           } else {
-            const res = await fetch(`${API_BASE}/securecrt/iprange/generate`, { method: "POST", body: form })
+            const res = await postExport(`${API_BASE}/securecrt/iprange/generate`, "securecrt-iprange", inputs, buildForm)
             if (!res.ok) throw new Error("ZIP 생성 실패")
             const blob = await res.blob()
             const url = URL.createObjectURL(blob)
@@ -214,17 +262,25 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
       setResults(null)
       setTableJson(null)
       try {
-        const form = new FormData()
-        Array.from(mergeFiles).forEach((f) => form.append("files", f))
+        const inputs = [mergeFiles]
+        const buildForm = (upload: boolean) => {
+          const form = new FormData()
+          if (upload) Array.from(mergeFiles).forEach((f) => form.append("files", f))
+          return form
+        }
         if (mode === "json") {
-          const res = await fetch(`${API_BASE}/merge/preview`, { method: "POST", body: form })
+          const res = await fetch(`${API_BASE}/merge/preview`, { method: "POST", body: buildForm(true) })
           if (!res.ok) throw new Error("미리보기 생성 실패")
+          rememberSession("merge", res, inputs)
           const data = await res.json()
           setTableJson(data)
           setResults("미리보기 로드 완료")
         } else {
-          form.append("output_name", mergeOutputName || "merged_logs.xlsx")
-          const res = await fetch(`${API_BASE}/merge/excel`, { method: "POST", body: form })
+          const res = await postExport(`${API_BASE}/merge/excel`, "merge", inputs, (upload) => {
+            const form = buildForm(upload)
+            form.append("output_name", mergeOutputName || "merged_logs.xlsx")
+            return form
+          })
           if (!res.ok) throw new Error("엑셀 생성 실패")
           const blob = await res.blob()
           const url = URL.createObjectURL(blob)
@@ -248,17 +304,25 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
       setResults(null)
       setTableJson(null)
       try {
-        const form = new FormData()
-        form.append("excel", distExcel)
+        const inputs = [distExcel]
+        const buildForm = (upload: boolean) => {
+          const form = new FormData()
+          if (upload) form.append("excel", distExcel)
+          return form
+        }
         if (mode === "json") {
-          const res = await fetch(`${API_BASE}/distribute/preview`, { method: "POST", body: form })
+          const res = await fetch(`${API_BASE}/distribute/preview`, { method: "POST", body: buildForm(true) })
           if (!res.ok) throw new Error("미리보기 생성 실패")
+          rememberSession("distribute", res, inputs)
           const data = await res.json()
           setTableJson(data)
           setResults("미리보기 로드 완료")
         } else {
-          form.append("format", distFormat)
-          const res = await fetch(`${API_BASE}/distribute/zip`, { method: "POST", body: form })
+          const res = await postExport(`${API_BASE}/distribute/zip`, "distribute", inputs, (upload) => {
+            const form = buildForm(upload)
+            form.append("format", distFormat)
+            return form
+          })
           if (!res.ok) throw new Error("ZIP 생성 실패")
           const blob = await res.blob()
           const url = URL.createObjectURL(blob)
@@ -282,22 +346,30 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
         setResults(null)
         setTableJson(null)
         try {
-          const form = new FormData()
           const lldpAll = Array.from(lldpFiles)
           const lldpLogs = lldpAll.filter((f) => /\.(log|txt)$/i.test(f.name))
           const lldpZips = lldpAll.filter((f) => /\.(zip)$/i.test(f.name))
-          lldpLogs.forEach((f) => form.append("files", f))
-          lldpZips.forEach((f) => form.append("zips", f))
-          form.append("pattern", lldpPattern)
-          form.append("include_description", String(lldpIncludeDesc))
+          // the stored rows are already filtered, so the filter is part of the inputs
+          const inputs = [lldpFiles, lldpPattern, lldpIncludeDesc]
+          const buildForm = (upload: boolean) => {
+            const form = new FormData()
+            if (upload) {
+              lldpLogs.forEach((f) => form.append("files", f))
+              lldpZips.forEach((f) => form.append("zips", f))
+            }
+            form.append("pattern", lldpPattern)
+            form.append("include_description", String(lldpIncludeDesc))
+            return form
+          }
           if (mode === "json") {
-            const res = await fetch(`${API_BASE}/lldp/hostname/preview`, { method: "POST", body: form })
+            const res = await fetch(`${API_BASE}/lldp/hostname/preview`, { method: "POST", body: buildForm(true) })
             if (!res.ok) throw new Error("미리보기 생성 실패")
+            rememberSession("lldp", res, inputs)
             const data = await res.json()
             setTableJson(data)
             setResults("미리보기 로드 완료")
           } else {
-            const res = await fetch(`${API_BASE}/lldp/hostname/excel`, { method: "POST", body: form })
+            const res = await postExport(`${API_BASE}/lldp/hostname/excel`, "lldp", inputs, buildForm)
             if (!res.ok) throw new Error("엑셀 생성 실패")
             const blob = await res.blob()
             const url = URL.createObjectURL(blob)
@@ -443,7 +515,6 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
       return
     }
     try {
-      const form = new FormData()
       const all = Array.from(files)
       const selected = all.filter((f) => /\.(log|txt)$/i.test(f.name))
       const zips = all.filter((f) => /\.(zip)$/i.test(f.name))
@@ -451,24 +522,33 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
         setResults("폴더 내 log/txt 파일이 없습니다.")
         return
       }
-      selected.forEach((f) => form.append("files", f))
-      zips.forEach((f) => form.append("zips", f))
-      form.append("include_ip", String(includeIp))
-      form.append("include_model", String(includeModel))
-      form.append("include_serial", String(includeSerial))
-      form.append("include_hostname", String(includeHostname))
-      form.append("include_image", String(includeImage))
-      form.append("include_image_selected", String(includeImageSelected))
-      form.append("include_image_booted", String(includeImageBooted))
+      // the session only holds the columns selected for the preview
+      const inputs = [files, includeIp, includeModel, includeSerial, includeHostname, includeImage, includeImageSelected, includeImageBooted]
+      const buildForm = (upload: boolean) => {
+        const form = new FormData()
+        if (upload) {
+          selected.forEach((f) => form.append("files", f))
+          zips.forEach((f) => form.append("zips", f))
+        }
+        form.append("include_ip", String(includeIp))
+        form.append("include_model", String(includeModel))
+        form.append("include_serial", String(includeSerial))
+        form.append("include_hostname", String(includeHostname))
+        form.append("include_image", String(includeImage))
+        form.append("include_image_selected", String(includeImageSelected))
+        form.append("include_image_booted", String(includeImageBooted))
+        return form
+      }
 
       if (mode === "json") {
-        const res = await fetch(`${API_BASE}/extract/any/json`, { method: "POST", body: form })
+        const res = await fetch(`${API_BASE}/extract/any/json`, { method: "POST", body: buildForm(true) })
         if (!res.ok) throw new Error("JSON 추출 실패")
+        rememberSession("extract", res, inputs)
         const data = await res.json()
         setTableJson(data)
         setResults("JSON 미리보기 로드 완료")
       } else {
-        const res = await fetch(`${API_BASE}/extract/any/excel`, { method: "POST", body: form })
+        const res = await postExport(`${API_BASE}/extract/any/excel`, "extract", inputs, buildForm)
         if (!res.ok) throw new Error("엑셀 추출 실패")
         const blob = await res.blob()
         const url = URL.createObjectURL(blob)
@@ -626,6 +706,15 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
                       <Input id="end-ip" placeholder="192.168.1.100" value={endIp} onChange={(e) => setEndIp(e.target.value)} />
                     </div>
                   </div>
+                  <div>
+                    <Label htmlFor="ip-ranges">IP 대역 (선택)</Label>
+                    <Input id="ip-ranges" placeholder="10.0.0.0/24, 10.0.1.10-10.0.1.20" value={ipRanges} onChange={(e) => setIpRanges(e.target.value)} />
+                  </div>
+                  <div>
+                    <Label htmlFor="ip-exclude">제외 IP (선택)</Label>
+                    <Input id="ip-exclude" placeholder="10.0.0.0/30, 10.0.0.255" value={ipExclude} onChange={(e) => setIpExclude(e.target.value)} />
+                    <p className="text-xs text-muted-foreground mt-1">CIDR, 범위(a-b), 단일 IP를 쉼표로 구분합니다. IPv6도 지원합니다.</p>
+                  </div>
                 </div>
               </TabsContent>
               <TabsContent value="hostname">
@@ -650,6 +739,9 @@ export function ToolInterface({ toolId, onBack }: ToolInterfaceProps) {
                         <Upload className="w-4 h-4" />
                       </Button>
                     </div>
+                    <p className="text-xs text-muted-foreground mt-1">
+                      한 줄에 <code>이름 IP</code>. 첫 줄에 <code># name ip port username folder S:"키"</code> 형식의 헤더를 두면 추가 열도 반영합니다.
+                    </p>
                   </div>
                 </div>
               </TabsContent>